@@ -0,0 +1,182 @@
+"""
+Aggregate every user's results into global artifacts the app serves as-is.
+
+Scans know-your-bible-results in parallel segments, folding each page into
+running per-verse and per-user totals (no records are kept), then writes:
+
+    data/aggregates/verse_difficulty.json  reviews, mean score, mean distance
+                                           and rating counts per verse
+    data/aggregates/leaderboard.json       top signed-in users all-time and over
+                                           the last 30 days, plus each one's rank
+
+Ranks are keyed by an HMAC of the user id; set KYB_USER_KEY_SECRET to the
+same secret the app runs with.
+
+Usage (from the repository root):
+    python -m app.jobs.aggregate_results --segments 8
+    python -m app.jobs.aggregate_results --top 100 --output-dir /tmp/aggregates
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import boto3
+
+from app.utils.aggregates import AGGREGATES_DIR, USER_KEY_SECRET_ENV, user_key, display_name
+
+RESULTS_TABLE = "know-your-bible-results"
+RECENT_DAYS = 30
+TOP_N = 50
+
+SCAN_ATTRIBUTES = ["user_id", "reference", "score", "distance", "rating", "stars", "timestamp"]
+
+
+def new_totals() -> dict:
+    return {"verses": {}, "users": {}, "records": 0}
+
+
+def add_result(totals: dict, item: dict, recent_since: str):
+    """Fold one result into the running totals."""
+    score = float(item.get("score", 0))
+    rating = int(item.get("rating", 0))
+
+    verse = totals["verses"].get(item["reference"])
+    if verse is None:
+        verse = totals["verses"][item["reference"]] = {"reviews": 0, "score": 0.0, "distance": 0.0, "ratings": [0, 0, 0, 0]}
+    verse["reviews"] += 1
+    verse["score"] += score
+    verse["distance"] += float(item.get("distance", 0))
+    if 1 <= rating <= 4:
+        verse["ratings"][rating - 1] += 1
+
+    totals["records"] += 1
+
+    ## Only signed-in accounts are ranked; anonymous ids still count towards verse difficulty
+    if "@" not in item["user_id"]:
+        return
+    user = totals["users"].get(item["user_id"])
+    if user is None:
+        user = totals["users"][item["user_id"]] = {"points": 0.0, "recent_points": 0.0, "reviews": 0, "stars": 0}
+    user["points"] += score
+    user["reviews"] += 1
+    user["stars"] += int(item.get("stars", 0))
+    if item.get("timestamp", "") >= recent_since:
+        user["recent_points"] += score
+
+
+def merge_totals(into: dict, other: dict):
+    for ref, v in other["verses"].items():
+        verse = into["verses"].setdefault(ref, {"reviews": 0, "score": 0.0, "distance": 0.0, "ratings": [0, 0, 0, 0]})
+        verse["reviews"] += v["reviews"]
+        verse["score"] += v["score"]
+        verse["distance"] += v["distance"]
+        verse["ratings"] = [a + b for a, b in zip(verse["ratings"], v["ratings"])]
+    for user_id, u in other["users"].items():
+        user = into["users"].setdefault(user_id, {"points": 0.0, "recent_points": 0.0, "reviews": 0, "stars": 0})
+        for key in user:
+            user[key] += u[key]
+    into["records"] += other["records"]
+
+
+def scan_segment(region: str, segment: int, total_segments: int, recent_since: str) -> dict:
+    ## boto3 resources aren't thread-safe; one session per segment
+    table = boto3.session.Session().resource("dynamodb", region_name=region).Table(RESULTS_TABLE)
+    totals = new_totals()
+    kwargs = {
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "ProjectionExpression": ", ".join(f"#{name}" for name in SCAN_ATTRIBUTES),
+        "ExpressionAttributeNames": {f"#{name}": name for name in SCAN_ATTRIBUTES},  # Several are reserved words
+    }
+    while True:
+        page = table.scan(**kwargs)
+        for item in page.get("Items", []):
+            if item.get("reference") and item.get("user_id"):
+                add_result(totals, item, recent_since)
+        if "LastEvaluatedKey" not in page:
+            return totals
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def build_verse_difficulty(totals: dict, generated_at: str) -> dict:
+    return {
+        "generated_at": generated_at,
+        "verses": {
+            ref: {
+                "reviews": v["reviews"],
+                "mean_score": round(v["score"] / v["reviews"], 2),
+                "mean_distance": round(v["distance"] / v["reviews"], 2),
+                "ratings": v["ratings"],
+            }
+            for ref, v in sorted(totals["verses"].items())
+        },
+    }
+
+
+def build_leaderboard(totals: dict, generated_at: str, top_n: int) -> dict:
+    def board(key):
+        ranked = sorted(totals["users"].items(), key=lambda kv: kv[1][key], reverse=True)
+        return ranked, [
+            {"rank": i + 1, "name": display_name(user_id), "points": int(u[key]), "reviews": u["reviews"], "stars": u["stars"]}
+            for i, (user_id, u) in enumerate(ranked[:top_n])
+            if u[key] > 0
+        ]
+
+    all_time_ranked, all_time = board("points")
+    _, recent = board("recent_points")
+    return {
+        "generated_at": generated_at,
+        "users": len(totals["users"]),
+        "all_time": all_time,
+        "recent": recent,
+        ## Hashed user_id -> [all-time rank, points], so the app can show anyone's rank
+        "ranks": {user_key(user_id): [i + 1, int(u["points"])] for i, (user_id, u) in enumerate(all_time_ranked)},
+    }
+
+
+def write_artifact(path: Path, data: dict):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)  # The app never reads a half-written artifact
+    print(f"[INFO] Wrote {path} ({path.stat().st_size / 1e3:.1f} KB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--segments", type=int, default=8, help="Parallel scan segments (one thread each)")
+    parser.add_argument("--top", type=int, default=TOP_N, help="Users per leaderboard")
+    parser.add_argument("--output-dir", type=Path, default=Path(AGGREGATES_DIR))
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION"))
+    args = parser.parse_args()
+    if not os.environ.get(USER_KEY_SECRET_ENV):
+        parser.error(f"{USER_KEY_SECRET_ENV} must be set (the same secret as the app's) to key the leaderboard ranks")
+
+    now = datetime.now(timezone.utc)
+    recent_since = (now - timedelta(days=RECENT_DAYS)).isoformat()
+
+    start = time.perf_counter()
+    totals = new_totals()
+    with ThreadPoolExecutor(max_workers=args.segments) as pool:
+        for partial in pool.map(lambda s: scan_segment(args.region, s, args.segments, recent_since), range(args.segments)):
+            merge_totals(totals, partial)
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] Scanned {totals['records']} results ({len(totals['users'])} signed-in users) in {elapsed:.2f}s "
+          f"({totals['records'] / elapsed if elapsed else 0:.0f} records/s)")
+
+    generated_at = now.isoformat()
+    write_artifact(args.output_dir / "verse_difficulty.json", build_verse_difficulty(totals, generated_at))
+    write_artifact(args.output_dir / "leaderboard.json", build_leaderboard(totals, generated_at, args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Fit personalized FSRS parameters for every user from their review history.
+
+Rebuilds each user's ReviewLog sequences from know-your-bible-results, fits
+parameters with fsrs's Optimizer in a process pool, and writes the fitted
+scheduler back to scheduler_dict in know-your-bible-settings. Users whose
+review count has not changed since their last fit are skipped, and finished
+users are appended to a checkpoint file so an interrupted run can --resume.
+
+Usage (from the repository root; requires `pip install "fsrs[optimizer]"`):
+    python -m app.jobs.optimize_schedulers --workers 4
+    python -m app.jobs.optimize_schedulers --resume --checkpoint optimize.jsonl
+    python -m app.jobs.optimize_schedulers --users a@b.c --force
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from decimal import Decimal
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import boto3
+from boto3.dynamodb.conditions import Key
+from fsrs import Scheduler, ReviewLog, Rating
+
+RESULTS_TABLE = "know-your-bible-results"
+SETTINGS_TABLE = "know-your-bible-settings"
+
+## Fewer reviews than this can't move the parameters meaningfully
+MIN_REVIEWS = 100
+
+DEFAULT_CHECKPOINT = Path("data/jobs/optimize_schedulers.jsonl")
+
+## Per-process DynamoDB tables, created by the pool initializer
+_tables = {}
+
+
+def init_worker(region: str):
+    dynamodb = boto3.resource("dynamodb", region_name=region)
+    _tables["results"] = dynamodb.Table(RESULTS_TABLE)
+    _tables["settings"] = dynamodb.Table(SETTINGS_TABLE)
+
+
+def to_decimal(data):
+    """DynamoDB rejects floats; round-trip through JSON to get Decimals."""
+    return json.loads(json.dumps(data), parse_float=Decimal)
+
+
+def list_user_ids(settings_table) -> list:
+    user_ids = []
+    kwargs = {"ProjectionExpression": "user_id"}
+    while True:
+        page = settings_table.scan(**kwargs)
+        user_ids.extend(item["user_id"] for item in page.get("Items", []))
+        if "LastEvaluatedKey" not in page:
+            return user_ids
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def load_results(results_table, user_id: str) -> list:
+    paginator = results_table.meta.client.get_paginator("query")
+    results = []
+    for page in paginator.paginate(
+        TableName=results_table.name,
+        KeyConditionExpression=Key("user_id").eq(user_id),
+        ProjectionExpression="#ref, #ts, #rating, #timer",  # All reserved words
+        ExpressionAttributeNames={"#ref": "reference", "#ts": "timestamp", "#rating": "rating", "#timer": "timer"},
+    ):
+        results.extend(page.get("Items", []))
+    return results
+
+
+def build_review_logs(results: list) -> list:
+    """One card per reference; each result is one review of that card."""
+    card_ids = {}
+    review_logs = []
+    for result in results:
+        try:
+            card_id = card_ids.setdefault(result["reference"], len(card_ids) + 1)
+            review_logs.append(ReviewLog(
+                card_id=card_id,
+                rating=Rating(int(result["rating"])),
+                review_datetime=datetime.fromisoformat(result["timestamp"]),
+                review_duration=int(float(result.get("timer", 0)) * 1000) or None,
+            ))
+        except (KeyError, ValueError) as e:
+            print(f"[WARNING] Skipping malformed result {result}: {e}")
+    return review_logs
+
+
+def optimize_user(user_id: str, force: bool = False) -> dict:
+    """Fit and store one user's scheduler; returns a summary row for the report."""
+    from fsrs import Optimizer
+
+    start = time.perf_counter()
+    settings = _tables["settings"].get_item(Key={"user_id": user_id}).get("Item", {})
+    results = load_results(_tables["results"], user_id)
+    summary = {"user_id": user_id, "reviews": len(results)}
+
+    last_fit = settings.get("optimizer", {})
+    if len(results) < MIN_REVIEWS:
+        return summary | {"status": "too_few_reviews", "secs": time.perf_counter() - start}
+    if not force and int(last_fit.get("reviews", -1)) == len(results):
+        return summary | {"status": "unchanged", "secs": time.perf_counter() - start}
+
+    review_logs = build_review_logs(results)
+    parameters = Optimizer(review_logs).compute_optimal_parameters()
+
+    ## Keep the user's other scheduler options (retention, steps, ...)
+    scheduler_dict = json.loads(json.dumps(settings.get("scheduler_dict") or Scheduler().to_dict(), default=float))
+    scheduler_dict["parameters"] = list(parameters)
+    scheduler = Scheduler.from_dict(scheduler_dict)
+
+    _tables["settings"].update_item(
+        Key={"user_id": user_id},
+        UpdateExpression="SET scheduler_dict = :s, optimizer = :o",
+        ExpressionAttributeValues=to_decimal({
+            ":s": scheduler.to_dict(),
+            ":o": {"reviews": len(results), "fitted_at": datetime.now(timezone.utc).isoformat()},
+        }),
+    )
+    return summary | {"status": "fitted", "secs": time.perf_counter() - start}
+
+
+def read_checkpoint(path: Path) -> set:
+    if not path.exists():
+        return set()
+    with open(path, "r", encoding="utf-8") as f:
+        return {json.loads(line)["user_id"] for line in f if line.strip()}
+
+
+def run(user_ids: list, workers: int, region: str, checkpoint: Path, force: bool) -> dict:
+    counts = {}
+    reviews = 0
+    start = time.perf_counter()
+
+    checkpoint.parent.mkdir(parents=True, exist_ok=True)
+    with open(checkpoint, "a", encoding="utf-8") as log, \
+            ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(region,)) as pool:
+        futures = {pool.submit(optimize_user, user_id, force): user_id for user_id in user_ids}
+        for i, future in enumerate(as_completed(futures), 1):
+            try:
+                summary = future.result()
+            except Exception as e:
+                ## Not checkpointed, so a resumed run retries it
+                summary = {"user_id": futures[future], "status": "error", "error": repr(e)}
+                print(f"[ERROR] {futures[future]}: {e}")
+            else:
+                log.write(json.dumps(summary) + "\n")
+                log.flush()
+
+            counts[summary["status"]] = counts.get(summary["status"], 0) + 1
+            reviews += summary.get("reviews", 0)
+            elapsed = time.perf_counter() - start
+            print(f"[INFO] {i}/{len(user_ids)} {summary['user_id']}: {summary['status']} "
+                  f"({i / elapsed:.2f} users/s, {reviews / elapsed:.0f} reviews/s)")
+
+    elapsed = time.perf_counter() - start
+    return {
+        "users": len(user_ids),
+        "elapsed_secs": round(elapsed, 3),
+        "users_per_sec": round(len(user_ids) / elapsed, 3) if elapsed else 0.0,
+        "reviews_per_sec": round(reviews / elapsed, 1) if elapsed else 0.0,
+        "statuses": counts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--users", nargs="+", help="Only these user_ids (default: every user with settings)")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT, help="Finished users, one JSON line each")
+    parser.add_argument("--resume", action="store_true", help="Skip users already in the checkpoint")
+    parser.add_argument("--force", action="store_true", help="Refit even if no new reviews since the last fit")
+    parser.add_argument("--region", default=os.environ.get("AWS_REGION"))
+    args = parser.parse_args()
+
+    try:
+        from fsrs import Optimizer
+        Optimizer([])
+    except ImportError as e:
+        sys.exit(f"[ERROR] {e}")
+
+    if args.resume:
+        done = read_checkpoint(args.checkpoint)
+    else:
+        done = set()
+        args.checkpoint.unlink(missing_ok=True)
+
+    init_worker(args.region)
+    user_ids = [u for u in (args.users or list_user_ids(_tables["settings"])) if u not in done]
+    print(f"[INFO] Optimizing {len(user_ids)} users ({len(done)} already done) with {args.workers} workers")
+
+    report = run(user_ids, args.workers, args.region, args.checkpoint, args.force)
+    print(f"[INFO] Done: {json.dumps(report)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,39 @@ import logging
 import boto3
 import random
 import json
+import time
+import io
+import heapq
+from bisect import bisect_left
 import app.utils.cache as cache
+import app.utils.warmup as warmup
+import app.utils.corpus as corpus
+import app.utils.metrics as metrics
 from boto3.dynamodb.conditions import Key
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import FastAPI, Request, Form, File, UploadFile, BackgroundTasks
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from datetime import datetime, timezone, timedelta
 from uuid6 import uuid6
 from decimal import Decimal
-from math import floor, log10
+from math import floor, log, log10
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 from starlette.middleware.sessions import SessionMiddleware
+from pydantic import BaseModel
 from fsrs import Scheduler, Card, Rating, ReviewLog
 from word2number import w2n
-from app.utils.bible import get_bible_translation, OT_BOOKS, NT_BOOKS, CHAPTER_COUNTS, AVAIL_TRANSLATIONS
-from app.utils.tsk import parse_standard_ref, get_tsk_for_ref
-from app.utils.harmony import get_harmony_entries_for_verse
+from app.utils.bible import get_bible_translation, get_chapter_counts, storage_item, OT_BOOKS, NT_BOOKS, AVAIL_TRANSLATIONS
+from app.utils.tsk import parse_standard_ref
+from app.utils.ordinals import get_eligible_verses, get_eligible_cache_stats, get_ordinal_table, compile_verse_selection, EligibleVerses
+from app.utils.reschedule import reschedule_user_cards
+from app.utils.export import iter_user_results, iter_ndjson, iter_arrow, import_user_results
+from app.utils.aggregates import get_leaderboard, get_verse_difficulty
+from app.utils.forecast import build_forecast, move_card, get_forecast, FORECAST_DAYS
+from app.utils.enrichment import get_verse_enrichment
+from app.utils.stats import build_user_stats, update_user_stats, summarize_user_stats
+from app.utils.review_index import build_review_index, update_review_index, get_review_page, SORT_KEYS
 from data.references.get_resource_references import extract_references
 
 DEBUG_MODE = True  # Global debug mode flag
@@ -38,17 +53,29 @@ config = Config(".env")
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
 
-try:
-    region = config("AWS_REGION")
-    dynamodb = boto3.resource("dynamodb", region_name=region)
-    logger.debug("Connected to DynamoDB.")
-except Exception as e:
-    logger.error("Failed to connect to DynamoDB", exc_info=True)
-    raise
+def connect_dynamodb():
+    try:
+        region = config("AWS_REGION")
+        dynamodb = boto3.resource("dynamodb", region_name=region)
+        logger.debug("Connected to DynamoDB.")
+    except Exception as e:
+        logger.error("Failed to connect to DynamoDB", exc_info=True)
+        raise
+
+    debug("Connecting to DynamoDB tables...")
+    return {
+        "results": dynamodb.Table("know-your-bible-results"),
+        "settings": dynamodb.Table("know-your-bible-settings"),
+    }
 
-debug("Connecting to DynamoDB tables...")
-results_table = dynamodb.Table("know-your-bible-results")
-settings_table = dynamodb.Table("know-your-bible-settings")
+## Connected lazily or during warmup
+warmup.register("dynamodb", connect_dynamodb)
+
+def get_results_table():
+    return warmup.get("dynamodb")["results"]
+
+def get_settings_table():
+    return warmup.get("dynamodb")["settings"]
 
 ## FastAPI app setup
 debug("Initializing FastAPI app...")
@@ -64,6 +91,34 @@ else:
 templates = Jinja2Templates(directory="app/templates")
 debug("Templates loaded from: app/templates")
 
+## Load datasets in parallel in the background; /ready reports when done
+WARMUP_WORKERS = int(os.environ.get("WARMUP_WORKERS", "0")) or None
+
+@app.on_event("startup")
+def start_warmup():
+    corpus.attach_shared_corpus()  # No-op unless started via app/serve.py
+    warmup.start_warmup(max_workers=WARMUP_WORKERS)
+
+## Paths that must not load user settings (e.g. health checks during warmup)
+SKIP_SETTINGS_PATHS = {"/ready", "/metrics", "/verse_stats"}
+
+## Metrics exported on /metrics
+metrics.describe("kyb_request_duration_seconds", "histogram", "HTTP request latency by route.")
+metrics.describe("kyb_phase_duration_seconds", "histogram", "Time spent in request phases.")
+metrics.describe("kyb_dynamodb_duration_seconds", "histogram", "DynamoDB round-trip latency by operation.")
+metrics.describe("kyb_prefetch_total", "counter", "Next-verse prefetches served (hit) or discarded (stale, miss).")
+metrics.register_callback("kyb_user_cache_size", "gauge", "Users in the settings cache.", lambda: len(cache.user_cache))
+metrics.register_callback("kyb_verse_cache_hits_total", "counter", "Verse enrichment cache hits.", lambda: cache.get_verse_cache_stats()["hits"])
+metrics.register_callback("kyb_verse_cache_misses_total", "counter", "Verse enrichment cache misses.", lambda: cache.get_verse_cache_stats()["misses"])
+metrics.register_callback("kyb_verse_cache_size", "gauge", "Verses in the enrichment cache.", lambda: cache.get_verse_cache_stats()["size"])
+metrics.register_callback("kyb_eligible_cache_hits_total", "counter", "Eligible verse sets reused from another load.", lambda: get_eligible_cache_stats()["hits"])
+metrics.register_callback("kyb_eligible_cache_size", "gauge", "Distinct eligible verse sets in memory.", lambda: get_eligible_cache_stats()["size"])
+metrics.register_callback("kyb_warmup_ready", "gauge", "1 once dataset warmup has finished.", lambda: int(warmup.is_ready()))
+
+def render_template(name, context):
+    with metrics.timer("kyb_phase_duration_seconds", phase="template_render"):
+        return templates.TemplateResponse(name, context)
+
 ## Set up Google login
 app.add_middleware(SessionMiddleware, secret_key="YOUR_RANDOM_SECRET")
 
@@ -84,6 +139,22 @@ RATING_MAP = {
     4: "Easy"
 }
 
+## Review table pagination
+REVIEW_PAGE_SIZE = 25
+REVIEW_PAGE_MAX = 1000
+
+## Review decks (batched JSON API)
+DECK_SIZE = 10
+DECK_SIZE_MAX = 50
+
+class DeckAnswer(BaseModel):
+    reference: str  # e.g. "John 3:16", as handed out by /api/deck
+    submitted_ref: str
+    timer: float = 0.0
+
+class DeckSubmission(BaseModel):
+    answers: list[DeckAnswer]
+
 ORDINAL_MAP = {
     "first": "1", "1st": "1", "one": "1",
     "second": "2", "2nd": "2", "two": "2",
@@ -110,7 +181,9 @@ def convert_types(data, to="float"):
         return data
 
 def load_user_settings_from_db(user_id: str):
-    response = settings_table.get_item(Key={"user_id": user_id})
+    settings_table = get_settings_table()
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="get_item"):
+        response = settings_table.get_item(Key={"user_id": user_id})
     settings = convert_types(response.get("Item", {}), "float")
     
     testaments = set(settings.get("testaments", []))
@@ -128,13 +201,17 @@ def load_user_settings_from_db(user_id: str):
     ## Load user data (results)
     user_data = []
     try:
+        results_table = get_results_table()
         paginator = results_table.meta.client.get_paginator("query")
         page_iterator = paginator.paginate(
             TableName=results_table.name,
             KeyConditionExpression=Key("user_id").eq(user_id)
         )
+        page_start = time.perf_counter()
         for page in page_iterator:
+            metrics.observe("kyb_dynamodb_duration_seconds", time.perf_counter() - page_start, operation="query")
             user_data.extend(page.get("Items", []))
+            page_start = time.perf_counter()
         user_data = convert_types(user_data, "float")
     except Exception as e:
         debug(f"⚠️ Error loading user data for {user_id}: {e}")
@@ -143,11 +220,11 @@ def load_user_settings_from_db(user_id: str):
     ## Load derived data
     bible = get_bible_translation(translation=translation, bool_counts=bool(priority=="weighted"), user_data=user_data)
     eligible_references = get_eligible_references(
-        bible,
+        translation,
         testaments,
         books,
         chapters,
-        selected_verses if verse_selection else "",
+        get_verse_ranges(settings) if verse_selection else None,
     )
 
     ## Cache full user config
@@ -157,56 +234,75 @@ def load_user_settings_from_db(user_id: str):
         "eligible_references": eligible_references,
         "user_data": user_data,
         "scheduler": scheduler,
+        "stats": build_user_stats(bible, user_data),
+        "review_index": build_review_index(bible),
     }
+    full_settings["forecast"] = build_forecast(full_settings["review_index"])
+
+    ## Cards were scheduled under older parameters (e.g. before the nightly optimizer ran)
+    if settings.get("optimizer", {}).get("fitted_at", "") > settings.get("rescheduled_at", ""):
+        reschedule_user(user_id, full_settings)
 
     cache.set_cached_user_settings(user_id, full_settings)
 
     return full_settings
 
-def get_eligible_references(bible, selected_testaments, selected_books, selected_chapters, selected_verses):
-    ## Add entire testament(s)
-    selected_books |= set(OT_BOOKS if "old" in selected_testaments else [])
-    selected_books |= set(NT_BOOKS if "new" in selected_testaments else [])
-    selected_verses = set(
-        [
-            verse 
-            for item in extract_references(selected_verses) 
-            for verse in item["verses"]
-        ]
-    ) if selected_verses else ""
-    
-    eligible_references = []
-
-    for book in bible:
-        chapters = bible[book]
-        if book in selected_books:
-            for chapter in chapters:
-                for verse in chapters[chapter]:
-                    if not selected_verses or f"{book} {chapter}:{verse}" in selected_verses:
-                        eligible_references.append((book, chapter, verse, 1))
-        elif book in selected_chapters:
-            for ch in selected_chapters[book]:
-                ch_str = str(ch)
-                if ch_str in chapters:
-                    for verse in chapters[ch_str]:
-                        if not selected_verses or f"{book} {ch_str}:{verse}" in selected_verses:
-                            eligible_references.append((book, chapter, verse, 1))
-                else:
-                    debug(f"⚠️ Chapter {ch_str} not found in {book}")
-
-    if not eligible_references:
-        debug("⚠️ No eligible references found, falling back to full bible")
-        for book in bible:
-            for chapter in bible[book]:
-                for verse in bible[book][chapter]:
-                    if not selected_verses or f"{book} {chapter}:{verse}" in selected_verses:
-                        eligible_references.append((book, chapter, verse, 1))
-
-    # debug(f"eligible_references: {json.dumps(eligible_references, indent=2)}")
-    
+def get_verse_ranges(settings):
+    """
+    Ordinal ranges compiled from the verse selection when settings were saved;
+    settings saved before ranges existed (or for a changed translation) are compiled here.
+    """
+    translation = settings.get("translation", "esv")
+    compiled = settings.get("verse_ranges")
+    if not compiled or int(compiled.get("size", -1)) != get_ordinal_table(translation)["size"]:
+        compiled = compile_verse_selection(translation, settings.get("selected_verses", ""))
+    return compiled["ranges"]
+
+def mark_cards_changed(settings):
+    """Bump the card state version, so a verse prefetched before the change is stale."""
+    settings["card_version"] = settings.get("card_version", 0) + 1
+    settings.pop("prefetch", None)
+
+def reschedule_user(user_id, settings):
+    """Recompute every card under the user's current scheduler and persist the new due dates."""
+    with metrics.timer("kyb_phase_duration_seconds", phase="reschedule"):
+        updated = reschedule_user_cards(settings)
+    mark_cards_changed(settings)
+
+    ## The new cards go in each latest result's "rescheduled" attribute (read back on
+    ## the next cold start); the reviewed card_dict/due_str are written back unchanged
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="batch_write"):
+        with get_results_table().batch_writer() as batch:
+            for result in updated:
+                batch.put_item(Item=convert_types(storage_item(result), "Decimal"))
+    settings["forecast"] = build_forecast(settings["review_index"])
+
+    rescheduled_at = datetime.now(timezone.utc).isoformat()
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="update_item"):
+        get_settings_table().update_item(
+            Key={"user_id": user_id},
+            UpdateExpression="SET rescheduled_at = :t",
+            ExpressionAttributeValues={":t": rescheduled_at},
+        )
+    settings["settings"]["rescheduled_at"] = rescheduled_at
+    debug(f"Rescheduled {len(updated)} cards for user_id={user_id}")
+
+def get_eligible_references(translation, selected_testaments, selected_books, selected_chapters, verse_ranges):
+    """Shared EligibleVerses for a selection (memoized across users by selection key)."""
+    eligible_references = get_eligible_verses(
+        translation, selected_testaments, selected_books, selected_chapters, verse_ranges
+    )
+    debug(f"{len(eligible_references)} eligible references (selection {eligible_references.key[:8]})")
     return eligible_references
 
-def get_weight(bible, book, chapter, verse, now=datetime.now(timezone.utc), upweight=["John MacArthur", "John Piper"]):
+## Authors whose references add to a verse's weight
+UPWEIGHT_AUTHORS = ["John MacArthur", "John Piper"]
+
+def get_weight(bible, book, chapter, verse, now=None, upweight=UPWEIGHT_AUTHORS):
+    """now is epoch seconds (default: the current time)."""
+    if now is None:
+        now = time.time()
+
     ## Initial weight "prior"
     verse_dict = bible[book][chapter][verse]
     weight = verse_dict.get("weight", 1)
@@ -216,8 +312,7 @@ def get_weight(bible, book, chapter, verse, now=datetime.now(timezone.utc), upwe
         weight += verse_dict.get(upweight_key, 0)
 
     ## Adjust by due date, if any
-    due = datetime.fromisoformat(verse_dict.get("user_data", {}).get("due_str", now.isoformat()))
-    secs2due = (due - now).total_seconds()
+    secs2due = verse_dict.get("user_data", {}).get("due_epoch", now) - now
     # interval_secs = max(1, verse_dict.get("user_data", {}).get("interval_secs", 1))
 
     ## Adjust weight by factor
@@ -235,11 +330,25 @@ def get_weight(bible, book, chapter, verse, now=datetime.now(timezone.utc), upwe
     return weight
 
 def update_weights(bible, eligible_references):
-    now = datetime.now(timezone.utc)
-    
+    now = time.time()
+
+    ## Shared corpus: unreviewed verses weigh their per-process base weight, so
+    ## only the verses this user has written to go through get_weight
+    if isinstance(bible, corpus.BibleView) and bible.writable and isinstance(eligible_references, EligibleVerses):
+        weights = bible.base_weights(UPWEIGHT_AUTHORS)
+        refs, ordinals = eligible_references.refs, eligible_references.ordinals
+        if len(refs) == len(weights):
+            weighted = [(*refs[o], weights[o]) for o in ordinals.tolist()]
+            for o in bible.written_ordinals():
+                pos = bisect_left(ordinals, o)
+                if pos < len(ordinals) and ordinals[pos] == o:
+                    book, chapter, verse = refs[o]
+                    weighted[pos] = (book, chapter, verse, get_weight(bible, book, chapter, verse, now))
+            return weighted
+
     eligible_references = [
-        (book, chapter, verse, get_weight(bible, book, chapter, verse, now)) 
-        for (book, chapter, verse, _) in eligible_references
+        (book, chapter, verse, get_weight(bible, book, chapter, verse, now))
+        for (book, chapter, verse) in eligible_references
     ]
     return eligible_references
 
@@ -255,6 +364,18 @@ def weighted_sample(choices):
     ## Fallback to last item in case of rounding issues
     return choices[-1]
 
+def weighted_sample_without_replacement(choices, k):
+    """
+    Draw up to k distinct references with probability proportional to weight, in
+    one pass: each reference with a positive weight gets the key log(u) / weight
+    (u uniform in (0, 1]) and the k largest keys are kept (Efraimidis-Spirakis).
+    """
+    keyed = (
+        (log(1.0 - random.random()) / choice[3], choice)
+        for choice in choices if choice[3] > 0
+    )
+    return [choice for _, choice in heapq.nlargest(k, keyed, key=lambda x: x[0])]
+
 def get_top_n(eligible_references, n):
     """
     Prints and returns the top n references based on weight.
@@ -280,23 +401,41 @@ def get_top_n(eligible_references, n):
 ## Get random verse reference using weights
 def get_random_reference(settings):
     ## Refresh weights before sampling
-    eligible_references = update_weights(settings["bible"], settings["eligible_references"])
+    with metrics.timer("kyb_phase_duration_seconds", phase="update_weights"):
+        eligible_references = update_weights(settings["bible"], settings["eligible_references"])
 
     if False:  # Optional debugging
         get_top_n(eligible_references, 20)
 
     selector = settings.get("settings", {}).get("selector", "random")
-    if selector == "random":
-        book, chapter, verse, weight = weighted_sample(eligible_references)
-        debug(f"Random reference selected: {book} {chapter}:{verse} with weight={weight}")
-    else:  # elif selector == "greedy":
-        max_weight = max(w for _, _, _, w in eligible_references)
-        top_refs = [ref for ref in eligible_references if ref[3] == max_weight]
-        book, chapter, verse, weight = random.choice(top_refs)
-        debug(f"Randomly selected from top-weighted references: {book} {chapter}:{verse} with weight={weight}")
+    with metrics.timer("kyb_phase_duration_seconds", phase="sampling"):
+        if selector == "random":
+            book, chapter, verse, weight = weighted_sample(eligible_references)
+            debug(f"Random reference selected: {book} {chapter}:{verse} with weight={weight}")
+        else:  # elif selector == "greedy":
+            max_weight = max(w for _, _, _, w in eligible_references)
+            top_refs = [ref for ref in eligible_references if ref[3] == max_weight]
+            book, chapter, verse, weight = random.choice(top_refs)
+            debug(f"Randomly selected from top-weighted references: {book} {chapter}:{verse} with weight={weight}")
     
     return book, chapter, verse
 
+## Get a deck of distinct verse references using weights
+def get_random_references(settings, k):
+    with metrics.timer("kyb_phase_duration_seconds", phase="update_weights"):
+        eligible_references = update_weights(settings["bible"], settings["eligible_references"])
+
+    selector = settings.get("settings", {}).get("selector", "random")
+    with metrics.timer("kyb_phase_duration_seconds", phase="sampling"):
+        if selector == "random":
+            picks = weighted_sample_without_replacement(eligible_references, k)
+        else:  # elif selector == "greedy":
+            shuffled = random.sample(eligible_references, len(eligible_references))
+            picks = sorted(shuffled, key=lambda ref: ref[3], reverse=True)[:k]  # Random tie-breaking
+
+    debug(f"Selected deck of {len(picks)} references")
+    return [(book, chapter, verse) for book, chapter, verse, _ in picks]
+
 def get_surrounding_verses(bible, book, chapter, verse):
     debug(f"Getting verses surrounding: {book} {chapter}:{verse}")
     chapters = bible[book]
@@ -514,7 +653,11 @@ def get_user_id(request: Request) -> str:
 
 def get_user_id_settings(request: Request) -> str:
     user_id = get_user_id(request)
-    settings = cache.get_cached_user_settings(user_id) or load_user_settings_from_db(user_id)
+    with metrics.timer("kyb_phase_duration_seconds", phase="cache_lookup"):
+        settings = cache.get_cached_user_settings(user_id)
+    if not settings:
+        with metrics.timer("kyb_phase_duration_seconds", phase="dynamodb_load"):
+            settings = load_user_settings_from_db(user_id)
     return user_id, settings
 
 def get_user_stats(settings):
@@ -532,58 +675,12 @@ def get_user_stats(settings):
             "points_30days": 0,
         }
         return user_stats
-    
-    ## Reviewed and total score
-    verses_reviewed = 0
-    total_stars = 0
-    total_score = 0
-    bible = settings["bible"]
-    for book in bible:
-        for chapter in bible[book]:
-            for verse in bible[book][chapter]:
-                verse_data = bible[book][chapter][verse].get("user_data", {})
-                verse_score = verse_data.get("score", -1)
-                if verse_score >= 0:
-                    verses_reviewed += 1
-                    total_score += verse_score
-
-                    ## Compute stars if necessary
-                    verse_stars = verse_data.get("stars", None)
-                    if not verse_stars:
-                        submitted_book, submitted_ch, submitted_v = parse_standard_ref(verse_data["submitted"])
-                        verse_stars = int(
-                            (book==submitted_book) + 
-                            (book==submitted_book and chapter==str(submitted_ch)) +
-                            (book==submitted_book and chapter==str(submitted_ch) and verse==str(submitted_v))
-                        )
-                        # if False:  # Optional debugging
-                        #     debug(f"actual={book} {chapter}:{verse}, submitted={verse_data["submitted"]}, parsed={submitted_book} {submitted_ch}:{submitted_v}, stars={verse_stars}")
-                    total_stars += verse_stars
-
-    ## Total points
-    total_points = sum(item.get("score", 0) for item in user_data)
-
-    ## Total points in the last 30 days
-    thirty_days_ago = now - timedelta(days=30)
-    points_30days = sum(
-        item.get("score", 0)
-        for item in user_data
-        if "timestamp" in item
-        and isinstance(item["timestamp"], str)
-        and datetime.fromisoformat(item["timestamp"]).replace(tzinfo=timezone.utc) >= thirty_days_ago
-    )
 
-    ## Return
-    user_stats = {
-        "date_time": now,
-        "verses_reviewed": verses_reviewed,
-        "total_stars": total_stars,
-        "total_score": total_score,
-        "total_points": total_points,
-        "points_30days": points_30days,
-    }
+    ## Running aggregates are built on load and updated by /submit
+    if "stats" not in settings:
+        settings["stats"] = build_user_stats(settings["bible"], user_data)
 
-    return user_stats
+    return summarize_user_stats(settings["stats"], now)
 
 def pretty_sec(secs):
     bool_overdue = bool(secs < 0)
@@ -605,49 +702,74 @@ def pretty_sec(secs):
 
     return ("-" if bool_overdue else "") + " ".join(parts)
 
-def get_review_data(settings):
+def get_review_data(settings, sort="due", descending=False, page=1, per_page=None):
+    """
+    Returns (rows, total) for one sorted page of the user's reviewed cards.
+    Only the requested page is formatted.
+    """
     user_id = settings.get("settings", {}).get("user_id", "")
     translation = settings.get("settings", {}).get("translation", "esv")
     scheduler = settings.get("scheduler", None)
     now = datetime.now(timezone.utc)
 
     if "@" not in user_id or not scheduler:
-        return []
-    
-    ## Reviewed and total score
+        return [], 0
+
+    if "review_index" not in settings:
+        settings["review_index"] = build_review_index(settings["bible"])
+    index = settings["review_index"]
+
+    order, retrievability, total = get_review_page(index, scheduler, now, sort, descending, page, per_page)
+
     review_data = []
-    bible = settings["bible"]
-    for book in bible:
-        for chapter in bible[book]:
-            for verse in bible[book][chapter]:
-                verse_dict = bible[book][chapter][verse]
-                card = verse_dict.get("user_data", {}).get("card", None)
-                if not card:
-                    card_dict = verse_dict.get("user_data", {}).get("card_dict", {})
-                    card = Card.from_dict(card_dict) if card_dict else None
-                if card:
-                    due_str = verse_dict.get("user_data", {}).get("due_str", now.isoformat())
-                    due_in = (datetime.fromisoformat(due_str) - now).total_seconds()
-                    review_data.append({
-                        "verse": f"{book} {chapter}:{verse}",
-                        "score": verse_dict["user_data"]["score"],
-                        "time": verse_dict["user_data"]["timer"],
-                        "distance": verse_dict["user_data"]["distance"],
-                        "due": due_str,
-                        "due_in_days": due_in / 60 / 60 / 24,
-                        "due_in_str": pretty_sec(due_in),
-                        "retrievability": scheduler.get_card_retrievability(card),
-                        "url": f"https://ref.ly/{book} {chapter}:{verse};{translation}?t=biblia",
-                    })
-
-    return review_data
+    for pos in order:
+        ref = index["refs"][pos]
+        due = datetime.fromtimestamp(index["due"][pos], timezone.utc)
+        due_in = index["due"][pos] - now.timestamp()
+        review_data.append({
+            "verse": ref,
+            "score": float(index["score"][pos]),
+            "time": float(index["timer"][pos]),
+            "distance": float(index["distance"][pos]),
+            "due": due.isoformat(),
+            "due_in_days": due_in / 60 / 60 / 24,
+            "due_in_str": pretty_sec(due_in),
+            "retrievability": float(retrievability[pos]),
+            "url": f"https://ref.ly/{ref};{translation}?t=biblia",
+        })
+
+    return review_data, total
 
 @app.middleware("http")
 async def add_user_settings(request: Request, call_next):
-    user_id, settings = get_user_id_settings(request)
-    request.state.settings = settings
+    if request.url.path not in SKIP_SETTINGS_PATHS:
+        user_id, settings = get_user_id_settings(request)
+        request.state.settings = settings
     return await call_next(request)
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.observe(
+        "kyb_request_duration_seconds",
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route else "unmatched",
+        status=response.status_code,
+    )
+    return response
+
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+def ready():
+    report = warmup.get_startup_report()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
 @app.get("/login")
 async def login(request: Request):
     redirect_uri = request.url_for('auth')
@@ -689,19 +811,19 @@ def get_settings(request: Request):
     selected_chapters = settings.get("settings", {}).get("chapters", {})
     selected_verses = settings.get("settings", {}).get("selected_verses", "")
     verse_selection = settings.get("settings", {}).get("verse_selection", "")
+    verse_selection_errors = settings.get("settings", {}).get("verse_ranges", {}).get("errors", []) if verse_selection else []
     selected_translation = settings.get("settings", {}).get("translation", "esv")
     selected_selector = settings.get("settings", {}).get("selector", "random")
     selected_priority = settings.get("settings", {}).get("priority", "weighted")
 
     user_stats = get_user_stats(settings)
-    review_data = get_review_data(settings)
 
-    return templates.TemplateResponse("settings.html", {
+    return render_template("settings.html", {
         "request": request,
         "user_id": user_id,
         "ot_books": OT_BOOKS,
         "nt_books": NT_BOOKS,
-        "chapter_counts": CHAPTER_COUNTS,
+        "chapter_counts": get_chapter_counts(),
         "avail_translations": AVAIL_TRANSLATIONS,
         "selected_translation": selected_translation,
         "selector": selected_selector,
@@ -711,10 +833,102 @@ def get_settings(request: Request):
         "selected_chapters": selected_chapters,
         "selected_verses": selected_verses,
         "verse_selection": verse_selection,
+        "verse_selection_errors": verse_selection_errors,
         "stats": user_stats,
-        "review_data": review_data,
+        "forecast": get_forecast(settings["forecast"], datetime.now(timezone.utc)),
+        "leaderboard": get_leaderboard(user_id),
+        "review_page_size": REVIEW_PAGE_SIZE,
+        "review_page_max": REVIEW_PAGE_MAX,
     })
 
+@app.get("/review_data")
+def review_data(request: Request, sort: str = "due", order: str = "asc", page: int = 1, per_page: int = REVIEW_PAGE_SIZE):
+    user_id, settings = get_user_id_settings(request)
+    per_page = max(1, min(per_page, REVIEW_PAGE_MAX))
+
+    debug(f"[GET] /review_data for user_id={user_id} (sort={sort}, order={order}, page={page})")
+
+    ## Reject what get_review_page would silently treat as the defaults
+    if sort not in SORT_KEYS or order not in ("asc", "desc"):
+        return JSONResponse({
+            "detail": f"Unsupported sort={sort!r} or order={order!r}; "
+                      f"sort must be one of {sorted(SORT_KEYS)} and order 'asc' or 'desc'.",
+        }, status_code=422)
+
+    rows, total = get_review_data(settings, sort=sort, descending=(order == "desc"), page=page, per_page=per_page)
+
+    return JSONResponse({
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "sort": sort,
+        "order": order,
+        "rows": rows,
+    })
+
+@app.get("/forecast")
+def forecast(request: Request, days: int = FORECAST_DAYS):
+    user_id, settings = get_user_id_settings(request)
+    days = max(1, min(days, 365))
+
+    debug(f"[GET] /forecast for user_id={user_id} (days={days})")
+
+    return JSONResponse({
+        "days": days,
+        "forecast": get_forecast(settings["forecast"], datetime.now(timezone.utc), days),
+    })
+
+@app.get("/leaderboard")
+def leaderboard(request: Request):
+    """Precomputed by app/jobs/aggregate_results.py; empty until the job has run."""
+    user_id, _ = get_user_id_settings(request)
+    return JSONResponse(get_leaderboard(user_id))
+
+@app.get("/verse_stats")
+def verse_stats(request: Request, ref: str):
+    """Cross-user difficulty of one verse, e.g. /verse_stats?ref=John 3:16."""
+    return JSONResponse({"reference": ref, "stats": get_verse_difficulty(ref)})
+
+@app.get("/export")
+def export_results(request: Request, format: str = "ndjson"):
+    """Stream the user's full review history as NDJSON (default) or an Arrow IPC stream."""
+    user_id = get_user_id(request)
+    debug(f"[GET] /export for user_id={user_id} (format={format})")
+
+    items = iter_user_results(get_results_table(), user_id)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d")
+    if format == "arrow":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return PlainTextResponse("Arrow export requires pyarrow", status_code=501)
+        body, media_type, ext = iter_arrow(items), "application/vnd.apache.arrow.stream", "arrows"
+    else:
+        body, media_type, ext = iter_ndjson(items), "application/x-ndjson", "ndjson"
+
+    return StreamingResponse(body, media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="know-your-bible-{stamp}.{ext}"',
+    })
+
+@app.post("/import")
+def import_results(request: Request, file: UploadFile = File(...)):
+    """Restore results from an NDJSON export; records are upserted by id."""
+    user_id = get_user_id(request)
+    debug(f"[POST] /import for user_id={user_id} ({file.filename})")
+
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="batch_write"):
+        counts = import_user_results(get_results_table(), user_id, io.TextIOWrapper(file.file, encoding="utf-8"))
+    debug(f"Imported {counts['imported']} results ({counts['skipped']} skipped)")
+
+    ## Rebuild the cached Bible, stats and indexes from the merged history
+    if counts["imported"]:
+        cached = cache.get_cached_user_settings(user_id)
+        if cached:
+            mark_cards_changed(cached)  # In case a prefetch still holds the old settings
+        load_user_settings_from_db(user_id)
+
+    return JSONResponse(counts, status_code=200 if counts["imported"] or not counts["skipped"] else 400)
+
 @app.post("/settings", response_class=HTMLResponse)
 def save_settings(
     request: Request,
@@ -747,22 +961,42 @@ def save_settings(
         ch = int(ch)
         chapter_map.setdefault(book, []).append(ch)
 
-    new_settings = {
-        "user_id": user_id,
+    ## Parse the verse selection once; loads only apply the stored ranges
+    verse_ranges = compile_verse_selection(translation, selected_verses) if verse_selection else None
+    if verse_ranges and verse_ranges["errors"]:
+        debug(f"⚠️ Unrecognized verse selection pieces: {verse_ranges['errors']}")
+
+    form_settings = {
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "testaments": selected_testaments,
         "books": selected_books,
         "chapters": chapter_map,
         "selected_verses": selected_verses.strip(),
         "verse_selection": verse_selection,
+        "verse_ranges": verse_ranges,
         "translation": translation,
         "selector": selector,
         "priority": priority,
-        "scheduler_dict": scheduler.to_dict(),
     }
+    new_settings = {**settings.get("settings", {}), **form_settings, "user_id": user_id}
+    new_settings.setdefault("scheduler_dict", scheduler.to_dict())
 
     if True or "@" in user_id:  # TODO:
-        settings_table.put_item(Item=convert_types(new_settings, "Decimal"))
+        ## Only the form's attributes: the optimizer job owns scheduler_dict and optimizer,
+        ## reschedules own rescheduled_at, and any of them may be newer than this process's cache
+        values = {f":{key}": value for key, value in form_settings.items()}
+        values[":scheduler_dict"] = scheduler.to_dict()
+        with metrics.timer("kyb_dynamodb_duration_seconds", operation="update_item"):
+            response = get_settings_table().update_item(
+                Key={"user_id": user_id},
+                UpdateExpression="SET " + ", ".join(f"#{key} = :{key}" for key in form_settings)
+                    + ", scheduler_dict = if_not_exists(scheduler_dict, :scheduler_dict)",
+                ExpressionAttributeNames={f"#{key}": key for key in form_settings},
+                ExpressionAttributeValues=convert_types(values, "Decimal"),
+                ReturnValues="ALL_NEW",
+            )
+        new_settings = convert_types(response["Attributes"], "float")
+        scheduler = Scheduler.from_dict(new_settings["scheduler_dict"])
         debug(f"Settings saved to DynamoDB for user_id={user_id}")
 
     bible = get_bible_translation(
@@ -770,61 +1004,105 @@ def save_settings(
         bool_counts=bool(priority=="weighted"),
         user_data=user_data
     )
-    cache.set_cached_user_settings(user_id, {
+    review_index = settings.get("review_index") or build_review_index(bible)
+    full_settings = {
         "settings": new_settings,
         "bible": bible,
         "eligible_references": get_eligible_references(
-            bible,
+            translation,
             selected_testaments,
             set(selected_books),
             chapter_map,
-            selected_verses if verse_selection else "",
+            verse_ranges["ranges"] if verse_ranges else None,
         ),
         "user_data": user_data,
         "scheduler": scheduler,
-    })
+        "stats": settings.get("stats") or build_user_stats(bible, user_data),
+        "review_index": review_index,
+        "forecast": settings.get("forecast") or build_forecast(review_index),
+    }
+
+    ## The optimizer may have fitted new parameters since this user's cards were scheduled
+    if new_settings.get("optimizer", {}).get("fitted_at", "") > new_settings.get("rescheduled_at", ""):
+        reschedule_user(user_id, full_settings)
+
+    cache.set_cached_user_settings(user_id, full_settings)
     debug(f"Settings saved for user_id={user_id}")
 
-    response = RedirectResponse(url="/", status_code=303)
+    ## Show unrecognized verse selection pieces on the settings page
+    response = RedirectResponse(url="/settings" if verse_ranges and verse_ranges["errors"] else "/", status_code=303)
     response.set_cookie("user_id", user_id)
     return response
 
 @app.post("/delete_user_data")
 async def delete_user_data(request: Request, user_id: str = Form(...)):
     debug("Deleting user settings")
+    settings_table = get_settings_table()
+    results_table = get_results_table()
     
     ## Delete from settings_table (no sort key)
-    settings_items = settings_table.query(
-        KeyConditionExpression=Key("user_id").eq(user_id)
-    ).get("Items", [])
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="query"):
+        settings_items = settings_table.query(
+            KeyConditionExpression=Key("user_id").eq(user_id)
+        ).get("Items", [])
 
-    with settings_table.batch_writer() as batch:
-        for item in settings_items:
-            batch.delete_item(Key={"user_id": item["user_id"]})
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="batch_write"):
+        with settings_table.batch_writer() as batch:
+            for item in settings_items:
+                batch.delete_item(Key={"user_id": item["user_id"]})
             
     debug("Deleting user results")
 
     ## Delete from results_table (has sort key "id")
-    results_items = results_table.query(
-        KeyConditionExpression=Key("user_id").eq(user_id)
-    ).get("Items", [])
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="query"):
+        results_items = results_table.query(
+            KeyConditionExpression=Key("user_id").eq(user_id)
+        ).get("Items", [])
 
-    with results_table.batch_writer() as batch:
-        for item in results_items:
-            batch.delete_item(Key={"user_id": item["user_id"], "id": item["id"]})
+    with metrics.timer("kyb_dynamodb_duration_seconds", operation="batch_write"):
+        with results_table.batch_writer() as batch:
+            for item in results_items:
+                batch.delete_item(Key={"user_id": item["user_id"], "id": item["id"]})
 
     return RedirectResponse(url="/settings", status_code=303)
 
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
     debug("[GET] /")
-    return templates.TemplateResponse("home.html", {"request": request})
+    return render_template("home.html", {"request": request})
 
-def render_review(request, user_id, book, chapter, verse, start_timer=0, error=None):
+def prefetch_next_review(settings):
+    """
+    Select the next verse and its context while the user reads the result page.
+    Stamped with the card state version so /review can tell if it went stale.
+    """
+    stamp = settings.get("card_version", 0)
+    book, chapter, verse = get_random_reference(settings)
+    settings["prefetch"] = {
+        "stamp": stamp,
+        "reference": (book, chapter, verse),
+        "texts": get_surrounding_verses(settings["bible"], book, chapter, verse),
+    }
+    debug(f"Prefetched next review: {book} {chapter}:{verse}")
+
+def pop_prefetched_review(settings):
+    """
+    Consume the prefetched verse if it is still current. Saving settings replaces
+    the cached settings (dropping it); a newer result, reschedule or import makes
+    the stamp stale.
+    """
+    prefetch = settings.pop("prefetch", None)
+    if prefetch and prefetch["stamp"] == settings.get("card_version", 0):
+        metrics.inc("kyb_prefetch_total", result="hit")
+        return prefetch
+    metrics.inc("kyb_prefetch_total", result="stale" if prefetch else "miss")
+    return None
+
+def render_review(request, user_id, book, chapter, verse, start_timer=0, error=None, texts=None):
     user_id, settings = get_user_id_settings(request)
     bible = settings["bible"]
 
-    prev_text, curr_text, next_text = get_surrounding_verses(bible, book, chapter, verse)
+    prev_text, curr_text, next_text = texts or get_surrounding_verses(bible, book, chapter, verse)
     reference = f"{book} {chapter}:{verse}"
 
     context = {
@@ -841,49 +1119,22 @@ def render_review(request, user_id, book, chapter, verse, start_timer=0, error=N
         "error": error,
     }
 
-    response = templates.TemplateResponse("review.html", context)
+    response = render_template("review.html", context)
     response.set_cookie(key="user_id", value=user_id)
     return response
 
-@app.get("/review", response_class=HTMLResponse)
-def review(request: Request):
-    user_id, settings = get_user_id_settings(request)
-
-    debug(f"[GET] /review - user_id={user_id}")
-
-    book, chapter, verse = get_random_reference(settings)
-
-    return render_review(request, user_id, book, chapter, verse)
-
-@app.post("/submit", response_class=HTMLResponse)
-def submit(
-    request: Request,
-    submitted_ref: str = Form(...),
-    actual_ref: str = Form(...),
-    book: str = Form(...),
-    chapter: str = Form(...),
-    verse: str = Form(...),
-    timer: float = Form(0.0)
-):
-    user_id, settings = get_user_id_settings(request)
-    bible = settings["bible"]
-
-    debug(f"[POST] /submit - user_id={user_id}")
-    debug(f"Submitted: {submitted_ref}, Actual: {actual_ref}")
-
-    ## Convert chapter and verse back to integers
-    actual_ch = chapter
-    actual_v = verse
+def resolve_submitted_ref(bible, submitted_ref):
+    """
+    Parse a user's answer into an existing reference.
 
-    ## Parse submitted reference
+    Returns:
+        tuple: (book, chapter, verse, error), with error set to a message for the user if parsing failed.
+    """
     matched_book, submitted_ch, submitted_v, ambiguous_candidates = parse_natural_reference(bible, submitted_ref)
 
     if matched_book == "AMBIGUOUS":
         debug(f"❌ Ambiguous book name: candidates={ambiguous_candidates or []}")
-        return render_review(
-            request, user_id, book, actual_ch, actual_v, timer,
-            error=f"Ambiguous book name: '{submitted_ref}'. Did you mean {', '.join(ambiguous_candidates or [])}?"
-        )
+        return None, None, None, f"Ambiguous book name: '{submitted_ref}'. Did you mean {', '.join(ambiguous_candidates or [])}?"
 
     ## Fallback to strict Book 1:1 parsing
     if not matched_book:
@@ -892,15 +1143,11 @@ def submit(
             submitted_book_raw, submitted_ch, submitted_v = match.groups()
             matched_book, candidates = match_book_name(bible, submitted_book_raw)
             if candidates:
-                return render_review(
-                    request, user_id, book, actual_ch, actual_v, timer,
-                    error=f"Ambiguous book name: '{submitted_book_raw}'. Did you mean {', '.join(candidates or [])}?"
-                )
+                return None, None, None, f"Ambiguous book name: '{submitted_book_raw}'. Did you mean {', '.join(candidates or [])}?"
 
     if not matched_book:
         debug("❌ Could not parse natural reference")
-        return render_review(request, user_id, book, actual_ch, actual_v, timer,
-                            error=f"Could not understand reference: '{submitted_ref}'. Try 'Genesis 1:1' or 'First John one verse two'.")
+        return None, None, None, f"Could not understand reference: '{submitted_ref}'. Try 'Genesis 1:1' or 'First John one verse two'."
 
     ## Check if book, chapter, and verse exist in bible
     if (
@@ -909,21 +1156,28 @@ def submit(
         or int(submitted_v) < 1 or int(submitted_v) > len(bible[matched_book][submitted_ch])
     ):
         debug("❌ Reference does not exist in bible data")
-        return render_review(request, user_id, book, actual_ch, actual_v, timer,
-                             error=f"Reference not found: '{matched_book} {submitted_ch}:{submitted_v}'.")
+        return None, None, None, f"Reference not found: '{matched_book} {submitted_ch}:{submitted_v}'."
 
-    normalized_submitted_ref = f"{matched_book} {submitted_ch}:{submitted_v}"
-    debug(f"Submitted: {normalized_submitted_ref}")
-    debug(f"Actual: {book} {actual_ch}:{actual_v}")
-    debug(f"Timer: {timer}s")
+    return matched_book, submitted_ch, submitted_v, None
+
+def review_verse(settings, user_id, book, chapter, verse, actual_ref, matched_book, submitted_ch, submitted_v, timer):
+    """
+    Score an answer, schedule the verse's card, and apply the result to the cached user state.
+    Does not write to DynamoDB.
+
+    Returns:
+        tuple: (result, card), where result is the record to store in the results table.
+    """
+    bible = settings["bible"]
 
     ## Calculate score based on verse distance
-    stars, distance, score, rating = calculate_score(bible, matched_book, submitted_ch, submitted_v, book, actual_ch, actual_v, timer)
+    with metrics.timer("kyb_phase_duration_seconds", phase="calculate_score"):
+        stars, distance, score, rating = calculate_score(bible, matched_book, submitted_ch, submitted_v, book, chapter, verse, timer)
 
     ## Retrieve scheduler and card
     scheduler = settings["scheduler"]
 
-    verse_user_data = settings["bible"][book][chapter][verse].get("user_data", {})
+    verse_user_data = bible[book][chapter][verse].get("user_data", {})
     card = verse_user_data.get("card")
     if not card:
         ## Attempt to retrieve from dict; otherwise initialize
@@ -935,15 +1189,15 @@ def submit(
         card.step = int(card.step)  # Ensure type
     card, review_log = scheduler.review_card(card, rating)
 
-    ## Write to DynamoDB if logged in to email
     interval_secs = (card.due - card.last_review).total_seconds()
+    reviewed_at = datetime.now(timezone.utc)
 
     result = {
         "user_id": user_id,
         "id": str(uuid6()),
-        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "timestamp": reviewed_at.isoformat(),
         "reference": actual_ref,
-        "submitted": normalized_submitted_ref,
+        "submitted": f"{matched_book} {submitted_ch}:{submitted_v}",
         "stars": stars,
         "score": score,
         "distance": distance,
@@ -952,37 +1206,184 @@ def submit(
         "card_dict": card.to_dict(),
         "due_str": card.due.isoformat(),
         "interval_secs": interval_secs,
+        ## In-memory only; dropped by storage_item before writing
+        "timestamp_epoch": reviewed_at.timestamp(),
+        "due_epoch": card.due.timestamp(),
     }
-    if True or "@" in user_id:  # TODO:
-        results_table.put_item(Item=convert_types(result, "Decimal"))
-        debug("✅ Result saved to DynamoDB")
     
     ## Update user data for verse
+    update_user_stats(settings["stats"], book, chapter, verse, result, verse_user_data)
     settings["user_data"].append(result)
-    settings["bible"][book][chapter][verse]["user_data"] = result | {"card": card}
+    bible[book][chapter][verse]["user_data"] = result | {"card": card}
+    mark_cards_changed(settings)
+    ## Move the card between due-day buckets using its previous due date
+    ref = f"{book} {chapter}:{verse}"
+    index = settings["review_index"]
+    pos = index["positions"].get(ref)
+    move_card(settings["forecast"], index["due"][pos] if pos is not None else None, result["due_epoch"])
+    update_review_index(index, ref, result, card)
+
+    return result, card
+
+@app.get("/review", response_class=HTMLResponse)
+def review(request: Request):
+    user_id, settings = get_user_id_settings(request)
+
+    debug(f"[GET] /review - user_id={user_id}")
+
+    ## Serve the verse prefetched after /submit, if any; otherwise select now
+    prefetch = pop_prefetched_review(settings)
+    if prefetch:
+        book, chapter, verse = prefetch["reference"]
+        return render_review(request, user_id, book, chapter, verse, texts=prefetch["texts"])
+
+    book, chapter, verse = get_random_reference(settings)
+
+    return render_review(request, user_id, book, chapter, verse)
+
+@app.post("/submit", response_class=HTMLResponse)
+def submit(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    submitted_ref: str = Form(...),
+    actual_ref: str = Form(...),
+    book: str = Form(...),
+    chapter: str = Form(...),
+    verse: str = Form(...),
+    timer: float = Form(0.0)
+):
+    user_id, settings = get_user_id_settings(request)
+    bible = settings["bible"]
+
+    debug(f"[POST] /submit - user_id={user_id}")
+    debug(f"Submitted: {submitted_ref}, Actual: {actual_ref}")
+
+    ## Convert chapter and verse back to integers
+    actual_ch = chapter
+    actual_v = verse
+
+    ## Parse submitted reference
+    matched_book, submitted_ch, submitted_v, error = resolve_submitted_ref(bible, submitted_ref)
+    if error:
+        return render_review(request, user_id, book, actual_ch, actual_v, timer, error=error)
+
+    normalized_submitted_ref = f"{matched_book} {submitted_ch}:{submitted_v}"
+    debug(f"Submitted: {normalized_submitted_ref}")
+    debug(f"Actual: {book} {actual_ch}:{actual_v}")
+    debug(f"Timer: {timer}s")
+
+    result, card = review_verse(settings, user_id, book, chapter, verse, actual_ref, matched_book, submitted_ch, submitted_v, timer)
+    stars, score, rating, interval_secs = result["stars"], result["score"], result["rating"], result["interval_secs"]
+
+    ## Write to DynamoDB if logged in to email
+    if True or "@" in user_id:  # TODO:
+        with metrics.timer("kyb_dynamodb_duration_seconds", operation="put_item"):
+            get_results_table().put_item(Item=convert_types(storage_item(result), "Decimal"))
+        debug("✅ Result saved to DynamoDB")
+
     cache.set_cached_user_settings(user_id, settings)
     
-    ## Prepare context
-    tsk_data = get_tsk_for_ref(actual_ref)
-    harmony_data = get_harmony_entries_for_verse(actual_ref)
-    ch_verses = len(settings["bible"][book][chapter])
+    ## Prepare context (enrichment is cached per verse across users)
+    translation = settings.get("settings", {}).get("translation", "esv")
+    with metrics.timer("kyb_phase_duration_seconds", phase="enrichment"):
+        enrichment = get_verse_enrichment(bible, book, actual_ch, actual_v, translation)
 
     context = {
         "request": request,
         "submitted_ref": normalized_submitted_ref,
         "actual_ref": actual_ref,
-        "actual_ch": f"{book} {actual_ch}:1-{ch_verses}",
+        "actual_ch": f"{book} {actual_ch}:1-{enrichment['ch_verses']}",
         "actual_text": bible[book][str(actual_ch)][str(actual_v)]["text"],
         "stars": stars,
         "score": score,
         "timer": round(float(timer), 1),
         "rating": RATING_MAP.get(rating, "Unknown"),
         "due_in": pretty_sec(interval_secs),
-        "tsk_data": tsk_data,
-        "harmony_data": harmony_data,
+        "tsk_data": enrichment["tsk_data"],
+        "harmony_data": enrichment["harmony_data"],
     }
 
-    return templates.TemplateResponse("result.html", context)
+    ## Select the next verse after the response is sent
+    background_tasks.add_task(prefetch_next_review, settings)
+
+    return render_template("result.html", context)
+
+@app.get("/api/deck")
+def get_deck(request: Request, size: int = DECK_SIZE):
+    """Hand out a deck of distinct weighted-sampled verses with their context."""
+    user_id, settings = get_user_id_settings(request)
+    bible = settings["bible"]
+    size = max(1, min(size, DECK_SIZE_MAX))
+
+    debug(f"[GET] /api/deck - user_id={user_id}, size={size}")
+
+    deck = []
+    for book, chapter, verse in get_random_references(settings, size):
+        prev_text, curr_text, next_text = get_surrounding_verses(bible, book, chapter, verse)
+        deck.append({
+            "reference": f"{book} {chapter}:{verse}",
+            "book": book,
+            "chapter": chapter,
+            "verse": verse,
+            "prev_text": prev_text,
+            "curr_text": curr_text,
+            "next_text": next_text,
+        })
+
+    response = JSONResponse({"user_id": user_id, "deck": deck})
+    response.set_cookie(key="user_id", value=user_id)
+    return response
+
+@app.post("/api/deck/submit")
+def submit_deck(request: Request, submission: DeckSubmission):
+    """Score and schedule a batch of answers, writing the results in one batch."""
+    user_id, settings = get_user_id_settings(request)
+    bible = settings["bible"]
+
+    debug(f"[POST] /api/deck/submit - user_id={user_id}, answers={len(submission.answers)}")
+
+    outcomes = []
+    results = []
+    for answer in submission.answers:
+        try:
+            book, chapter, verse = parse_standard_ref(answer.reference)
+            chapter, verse = str(chapter), str(verse)
+            bible[book][chapter][verse]
+        except (ValueError, IndexError, KeyError):
+            outcomes.append({"reference": answer.reference, "error": f"Unknown reference: '{answer.reference}'."})
+            continue
+
+        matched_book, submitted_ch, submitted_v, error = resolve_submitted_ref(bible, answer.submitted_ref)
+        if error:
+            outcomes.append({"reference": answer.reference, "error": error})
+            continue
+
+        result, card = review_verse(
+            settings, user_id, book, chapter, verse, f"{book} {chapter}:{verse}",
+            matched_book, submitted_ch, submitted_v, answer.timer,
+        )
+        results.append(result)
+        outcomes.append({
+            "reference": result["reference"],
+            "submitted": result["submitted"],
+            "stars": result["stars"],
+            "score": result["score"],
+            "rating": RATING_MAP.get(result["rating"], "Unknown"),
+            "due": result["due_str"],
+            "due_in": pretty_sec(result["interval_secs"]),
+            "error": None,
+        })
+
+    if results and (True or "@" in user_id):  # TODO:
+        with metrics.timer("kyb_dynamodb_duration_seconds", operation="batch_write"):
+            with get_results_table().batch_writer() as batch:
+                for result in results:
+                    batch.put_item(Item=convert_types(storage_item(result), "Decimal"))
+        debug(f"✅ {len(results)} results saved to DynamoDB")
+
+    cache.set_cached_user_settings(user_id, settings)
+
+    return JSONResponse({"user_id": user_id, "results": outcomes})
 
 @app.post("/continue")
 def continue_game():
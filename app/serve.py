@@ -0,0 +1,40 @@
+"""
+Run the app with several uvicorn workers sharing one read-only corpus.
+
+The Bible text, verse counts, TSK and harmony data are built once here into a
+flat file (in /dev/shm when available) and every worker maps it zero-copy, so
+memory no longer grows with the worker count.
+
+Usage (from the repository root):
+    python -m app.serve --workers 4 --port 10000
+"""
+
+import os
+import sys
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import uvicorn
+import app.utils.corpus as corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--corpus", type=Path, help="Corpus file path (default: /dev/shm/kyb-corpus-<pid>.bin)")
+    args = parser.parse_args()
+
+    path = corpus.build_corpus(args.corpus)
+    os.environ[corpus.CORPUS_ENV] = str(path)  # Inherited by the workers
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os
+import json
+import time
+import hmac
+import hashlib
+from threading import Lock
+
+## Artifacts written by app/jobs/aggregate_results.py; reloaded when the job rewrites them
+AGGREGATES_DIR = os.path.join("data", "aggregates")
+RELOAD_CHECK_SECS = 60
+
+## Secret for keying user ids in published artifacts; the job and the app must share it
+USER_KEY_SECRET_ENV = "KYB_USER_KEY_SECRET"
+
+_loaded = {}  # name -> {"mtime": float, "checked": float, "data": dict}
+_lock = Lock()
+
+
+def user_key(user_id: str) -> str | None:
+    """
+    Stable key for a user in published artifacts: an HMAC of the user id, so it
+    can't be reversed by hashing candidate emails without the secret. None if
+    the secret isn't set.
+    """
+    secret = os.environ.get(USER_KEY_SECRET_ENV)
+    if not secret:
+        return None
+    return hmac.new(secret.encode("utf-8"), user_id.encode("utf-8"), hashlib.sha256).hexdigest()[:16]
+
+
+def display_name(user_id: str) -> str:
+    """Leaderboard name that doesn't publish the email: 'jo***'."""
+    local = user_id.split("@", 1)[0]
+    return f"{local[:2]}***"
+
+
+def get_aggregate(name: str) -> dict:
+    """
+    Load data/aggregates/{name}.json, re-reading it at most every
+    RELOAD_CHECK_SECS and only if the file changed. Empty if never generated.
+    """
+    now = time.monotonic()
+    entry = _loaded.get(name)
+    if entry and now - entry["checked"] < RELOAD_CHECK_SECS:
+        return entry["data"]
+
+    with _lock:
+        path = os.path.join(AGGREGATES_DIR, f"{name}.json")
+        try:
+            mtime = os.stat(path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        entry = _loaded.get(name)
+        if entry and entry["mtime"] == mtime:
+            entry["checked"] = now
+            return entry["data"]
+
+        data = {}
+        if mtime is not None:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            print(f"[DEBUG] Loaded aggregate {path}")
+        _loaded[name] = {"mtime": mtime, "checked": now, "data": data}
+        return data
+
+
+def get_verse_difficulty(ref: str):
+    return get_aggregate("verse_difficulty").get("verses", {}).get(ref)
+
+
+def get_leaderboard(user_id: str | None = None) -> dict:
+    leaderboard = get_aggregate("leaderboard")
+    ## Anonymous (non-account) ids are never ranked
+    key = user_key(user_id) if user_id and "@" in user_id else None
+    rank = leaderboard.get("ranks", {}).get(key) if key else None
+    return {
+        "generated_at": leaderboard.get("generated_at"),
+        "users": leaderboard.get("users", 0),
+        "all_time": leaderboard.get("all_time", []),
+        "recent": leaderboard.get("recent", []),
+        "your_rank": rank[0] if rank else None,
+    }
@@ -1,6 +1,9 @@
 import json
 from pathlib import Path
+from typing import Iterator
 from datetime import datetime
+import app.utils.warmup as warmup
+import app.utils.corpus as corpus
 
 ## Constants
 
@@ -29,6 +32,8 @@ AVAIL_TRANSLATIONS = {
 def get_bible_translation(translation: str = "esv", bool_counts: bool = True, user_data = []) -> dict:
     """
     Load the specified Bible translation, optionally with verse usage counts.
+    With a shared corpus attached (see app.utils.corpus), the translation it was
+    built from is served as a writable view over it instead of being re-parsed.
 
     Args:
         translation (str): The translation to load (e.g., "esv").
@@ -37,6 +42,13 @@ def get_bible_translation(translation: str = "esv", bool_counts: bool = True, us
     Returns:
         dict: Loaded Bible data.
     """
+    shared = corpus.CORPUS
+    if shared is not None and shared.meta.get("translation") == translation.lower():
+        bible = corpus.BibleView(shared, with_counts=bool_counts, writable=True)
+        if user_data:
+            add_user_data(user_data, bible)
+        return bible
+
     path = Path(f"data/translations/{translation.lower()}.json")
     if not path.exists():
         print(f"[WARNING] Bible file not found: {path}")
@@ -47,27 +59,52 @@ def get_bible_translation(translation: str = "esv", bool_counts: bool = True, us
     print(f"[DEBUG] Loaded Bible from {path}")
 
     if bool_counts:
-        counts_path = Path("data/references/verse_counts.json")
-        if counts_path.exists():
-            with open(counts_path, "r") as f:
-                counts = json.load(f)
-            print(f"[DEBUG] Loaded verse counts from {counts_path}")
-
-            for book, chapters in counts.items():
-                for chapter, verses in chapters.items():
-                    for verse, count_data in verses.items():
-                        try:
-                            bible[book][chapter][verse].update(count_data)
-                        except KeyError:
-                            print(f"[WARNING] Skipping missing verse: {book} {chapter}:{verse}")
-        else:
-            print(f"[WARNING] verse_counts.json not found at {counts_path}")
+        ## Parsed once and shared across loads
+        for book, chapters in get_verse_counts().items():
+            for chapter, verses in chapters.items():
+                for verse, count_data in verses.items():
+                    try:
+                        bible[book][chapter][verse].update(count_data)
+                    except KeyError:
+                        print(f"[WARNING] Skipping missing verse: {book} {chapter}:{verse}")
     
     if user_data:
         add_user_data(user_data, bible)
 
     return bible
 
+## ISO string fields -> epoch-second fields decoded from them once on load.
+## The epoch fields are in-memory only; storage_item drops them before writing.
+EPOCH_FIELDS = {"timestamp": "timestamp_epoch", "due_str": "due_epoch"}
+
+
+def decode_times(item: dict) -> dict:
+    """Set an item's epoch fields from its ISO strings (once), in place."""
+    for iso_key, epoch_key in EPOCH_FIELDS.items():
+        if epoch_key not in item and item.get(iso_key):
+            try:
+                item[epoch_key] = datetime.fromisoformat(item[iso_key]).timestamp()
+            except (TypeError, ValueError):
+                print(f"[WARNING] Unparseable {iso_key}: {item[iso_key]}")
+    return item
+
+
+def storage_item(item: dict) -> dict:
+    """Copy of a result without the in-memory epoch fields."""
+    return {k: v for k, v in item.items() if k not in EPOCH_FIELDS.values()}
+
+
+## Rescheduling keeps a result's card_dict/due_str/interval_secs as they were at
+## review time and stores the recomputed card under "rescheduled" instead
+def card_state(item: dict) -> dict:
+    """A result's current card state: its rescheduled card, if any, over the reviewed one."""
+    rescheduled = item.get("rescheduled")
+    if not rescheduled:
+        return item
+    state = {k: v for k, v in item.items() if k != "due_epoch"} | rescheduled
+    return decode_times(state)
+
+
 def add_user_data(user_data: list, bible: dict):
     """
     Adds user-specific data to the appropriate verse in the Bible structure.
@@ -90,15 +127,12 @@ def add_user_data(user_data: list, bible: dict):
     for item in user_data:
         user_id = item.get("user_id")
         reference = item.get("reference")
-        timestamp = item.get("timestamp")
-        if not (user_id and reference and timestamp):
+        timestamp = decode_times(item).get("timestamp_epoch")
+        if not (user_id and reference and timestamp is not None):
             continue
 
         key = (user_id, reference)
-        dt = datetime.fromisoformat(timestamp)
-
-        if key not in latest_data or dt > latest_data[key]["_dt"]:
-            item["_dt"] = dt  # Temporary for sorting
+        if key not in latest_data or timestamp > latest_data[key]["timestamp_epoch"]:
             latest_data[key] = item
 
     ## Insert into Bible structure
@@ -114,37 +148,79 @@ def add_user_data(user_data: list, bible: dict):
             verse = verse.lstrip("0")
 
             if book in bible and chapter in bible[book] and verse in bible[book][chapter]:
-                bible[book][chapter][verse]["user_data"] = item
+                bible[book][chapter][verse]["user_data"] = card_state(item)
             else:
                 print(f"[WARNING] Verse not found in Bible: {reference}")
         except Exception as e:
             print(f"[ERROR] Failed to insert user data for reference {reference}: {e}")
 
-    ## Clean up temp
-    for record in latest_data.values():
-        record.pop("_dt", None)
 
+def iter_user_data(bible) -> Iterator[tuple]:
+    """
+    (book, chapter, verse, user_data) for every verse with user data, in Bible
+    order. A writable corpus view only visits the verses written to.
+    """
+    if isinstance(bible, corpus.BibleView) and bible.writable:
+        verses = bible.written_verses()
+    else:
+        verses = (
+            (book, chapter, verse, bible[book][chapter][verse])
+            for book in bible for chapter in bible[book] for verse in bible[book][chapter]
+        )
+    for book, chapter, verse, verse_dict in verses:
+        if "user_data" in verse_dict:
+            yield book, chapter, verse, verse_dict["user_data"]
 
-## Global load (without counts by default)
-BIBLE = get_bible_translation()
 
-CHAPTER_COUNTS = {book: len(chapters) for book, chapters in BIBLE.items()}
 BOOK_TO_TESTAMENT = {book: "OT" for book in OT_BOOKS} | {book: "NT" for book in NT_BOOKS}
+VERSE_COUNTS_PATH = Path("data/references/verse_counts.json")
+
 
-## Build list of all authors from verse_counts.json
-AUTHORS = set()
-verse_counts_path = Path("data/references/verse_counts.json")
-if verse_counts_path.exists():
-    with open(verse_counts_path, "r") as f:
-        data = json.load(f)
-        for book_data in data.values():
-            for chapter_data in book_data.values():
-                for verse_data in chapter_data.values():
-                    AUTHORS.update(k for k in verse_data if k != "count")
-else:
-    print("[WARNING] verse_counts.json not found for AUTHORS extraction")
-
-AUTHORS = sorted(AUTHORS)
+def load_verse_counts() -> dict:
+    if not VERSE_COUNTS_PATH.exists():
+        print(f"[WARNING] verse_counts.json not found at {VERSE_COUNTS_PATH}")
+        return {}
+    with open(VERSE_COUNTS_PATH, "r") as f:
+        counts = json.load(f)
+    print(f"[DEBUG] Loaded verse counts from {VERSE_COUNTS_PATH}")
+    return counts
+
+def load_authors() -> list:
+    """All authors appearing in verse_counts.json."""
+    authors = set()
+    for book_data in get_verse_counts().values():
+        for chapter_data in book_data.values():
+            for verse_data in chapter_data.values():
+                authors.update(k for k in verse_data if k != "count")
+    return sorted(authors)
+
+## Global datasets, loaded lazily or during warmup (see app.utils.warmup)
+warmup.register("verse_counts", load_verse_counts)
+warmup.register("bible", get_bible_translation)
+warmup.register("chapter_counts", lambda: {book: len(chapters) for book, chapters in get_bible().items()})
+warmup.register("authors", load_authors)
+
+def get_verse_counts() -> dict:
+    """Shared, read-only verse counts; do not mutate."""
+    return warmup.get("verse_counts")
+
+def get_bible() -> dict:
+    """Shared, read-only ESV Bible with counts; do not mutate."""
+    return warmup.get("bible")
+
+def get_chapter_counts() -> dict:
+    return warmup.get("chapter_counts")
+
+def get_authors() -> list:
+    return warmup.get("authors")
+
+## Backwards-compatible module attributes (loaded on first access)
+_LAZY_ATTRS = {"BIBLE": get_bible, "CHAPTER_COUNTS": get_chapter_counts, "AUTHORS": get_authors}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRS:
+        return _LAZY_ATTRS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_top_n(n=10, authors=["all"], counts_file="data/references/verse_counts.json"):
@@ -1,14 +1,46 @@
-from cachetools import TTLCache
+from cachetools import TTLCache, LRUCache
 from threading import Lock
 
 ## Caches per user_id with 1-hour TTL
 user_cache = TTLCache(maxsize=1000, ttl=3600)
 cache_lock = Lock()
 
+## Per-verse enrichment shared across users (no TTL; payloads never change)
+verse_cache = LRUCache(maxsize=4096)
+verse_cache_lock = Lock()
+verse_cache_stats = {"hits": 0, "misses": 0}
+
 def get_cached_user_settings(user_id: str):
     with cache_lock:
         return user_cache.get(user_id)
 
 def set_cached_user_settings(user_id: str, settings: dict):
     with cache_lock:
-        user_cache[user_id] = settings
\ No newline at end of file
+        user_cache[user_id] = settings
+
+def get_cached_verse(key):
+    with verse_cache_lock:
+        value = verse_cache.get(key)
+        verse_cache_stats["hits" if value is not None else "misses"] += 1
+        return value
+
+def set_cached_verse(key, value):
+    with verse_cache_lock:
+        verse_cache[key] = value
+
+def record_verse_hit():
+    """Count a hit served outside the LRU (e.g. from precomputed payloads)."""
+    with verse_cache_lock:
+        verse_cache_stats["hits"] += 1
+
+def get_verse_cache_stats() -> dict:
+    with verse_cache_lock:
+        hits = verse_cache_stats["hits"]
+        misses = verse_cache_stats["misses"]
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+            "size": len(verse_cache),
+            "maxsize": verse_cache.maxsize,
+        }
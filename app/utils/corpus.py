@@ -0,0 +1,474 @@
+import os
+import json
+import mmap
+import tempfile
+import numpy as np
+from pathlib import Path
+from collections.abc import Mapping, MutableMapping, Sequence
+
+import app.utils.warmup as warmup
+
+## Read-only datasets packed into one flat file that every worker maps zero-copy.
+## A parent process builds it once (see app/serve.py) and passes the path in KYB_CORPUS.
+CORPUS_ENV = "KYB_CORPUS"
+MAGIC = b"KYBCORP1"
+ALIGN = 8
+
+SHARED_DATASETS = ("bible", "verse_counts", "tsk", "harmony")
+
+## Set once attached in this process
+CORPUS = None
+
+
+def _tsk_key(book_key, chapter, verse) -> int:
+    return (int(book_key) * 1000 + int(chapter)) * 1000 + int(verse)
+
+
+def _pack_strings(strings) -> tuple:
+    """(offsets, blob) for a list of strings, UTF-8 encoded back to back."""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def build_corpus_arrays(bible: dict, verse_counts: dict, tsk_lookup: dict, harmony: list) -> tuple:
+    """
+    Flatten the datasets into (meta, arrays). Verses are numbered by ordinal in
+    Bible order; counts and TSK entries are stored in CSR form (indptr + values).
+    """
+    books = list(bible)
+    book_idx, chapters, verses, texts = [], [], [], []
+    count_keys = {}
+    count_indptr, count_key_idx, count_values = [0], [], []
+
+    for b, book in enumerate(books):
+        for chapter, chapter_verses in bible[book].items():
+            for verse, verse_data in chapter_verses.items():
+                book_idx.append(b)
+                chapters.append(int(chapter))
+                verses.append(int(verse))
+                texts.append(verse_data.get("text", ""))
+
+                counts = verse_counts.get(book, {}).get(chapter, {}).get(verse, {})
+                for key, value in counts.items():
+                    count_key_idx.append(count_keys.setdefault(key, len(count_keys)))
+                    count_values.append(value)
+                count_indptr.append(len(count_values))
+
+    text_offsets, text_blob = _pack_strings(texts)
+
+    tsk_keys = sorted(tsk_lookup)
+    tsk_indptr, tsk_words, tsk_refs = [0], [], []
+    for key in tsk_keys:
+        for word, refs in tsk_lookup[key]:
+            tsk_words.append(word)
+            tsk_refs.append(refs)
+        tsk_indptr.append(len(tsk_words))
+    tsk_word_offsets, tsk_word_blob = _pack_strings(tsk_words)
+    tsk_ref_offsets, tsk_ref_blob = _pack_strings(tsk_refs)
+    harmony_offsets, harmony_blob = _pack_strings([json.dumps(entry) for entry in harmony])
+
+    meta = {"books": books, "count_keys": list(count_keys)}
+    arrays = {
+        "verse_book": np.array(book_idx, dtype=np.uint8),
+        "verse_chapter": np.array(chapters, dtype=np.uint16),
+        "verse_verse": np.array(verses, dtype=np.uint16),
+        "text_offsets": text_offsets,
+        "text": text_blob,
+        "count_indptr": np.array(count_indptr, dtype=np.int64),
+        "count_keys": np.array(count_key_idx, dtype=np.uint16),
+        "count_values": np.array(count_values, dtype=np.int32),
+        "tsk_keys": np.array([_tsk_key(*key) for key in tsk_keys], dtype=np.int64),
+        "tsk_indptr": np.array(tsk_indptr, dtype=np.int64),
+        "tsk_word_offsets": tsk_word_offsets,
+        "tsk_word": tsk_word_blob,
+        "tsk_ref_offsets": tsk_ref_offsets,
+        "tsk_ref": tsk_ref_blob,
+        "harmony_offsets": harmony_offsets,
+        "harmony": harmony_blob,
+    }
+    return meta, arrays
+
+
+def write_corpus(path, meta: dict, arrays: dict):
+    """
+    Layout: MAGIC, header length (uint64), JSON header, then each array at an
+    8-byte aligned offset recorded in the header.
+    """
+    sections = {}
+    offset = 0
+    for name, arr in arrays.items():
+        sections[name] = {"dtype": arr.dtype.str, "count": len(arr), "offset": offset}
+        offset += -(-arr.nbytes // ALIGN) * ALIGN
+
+    header = json.dumps({"meta": meta, "sections": sections}).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.seek(data_start + sections[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)  # Workers never see a half-written corpus
+
+
+def default_corpus_path() -> Path:
+    shm = Path("/dev/shm")
+    base = shm if shm.is_dir() else Path(tempfile.gettempdir())
+    return base / f"kyb-corpus-{os.getpid()}.bin"
+
+
+def build_corpus(path=None, translation: str = "esv") -> Path:
+    """Load the datasets from disk once and write the shared corpus file."""
+    from app.utils.bible import get_bible_translation, load_verse_counts
+    from app.utils.tsk import load_tsk_data
+    from app.utils.harmony import load_harmony_data
+
+    path = Path(path or default_corpus_path())
+    meta, arrays = build_corpus_arrays(
+        get_bible_translation(translation, bool_counts=False), load_verse_counts(), load_tsk_data(), load_harmony_data()
+    )
+    meta["translation"] = translation.lower()  # Per-user loads of this translation map the corpus too
+    write_corpus(path, meta, arrays)
+    print(f"[DEBUG] Wrote shared corpus ({path.stat().st_size / 1e6:.1f} MB) to {path}")
+    return path
+
+
+class Corpus:
+    """Zero-copy views over a mapped corpus file."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a corpus file: {path}")
+
+        header_len = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], "little")
+        header = json.loads(self._mmap[len(MAGIC) + 8:len(MAGIC) + 8 + header_len])
+        data_start = -(-(len(MAGIC) + 8 + header_len) // ALIGN) * ALIGN
+
+        self.meta = header["meta"]
+        self.arrays = {
+            name: np.frombuffer(self._mmap, dtype=s["dtype"], count=s["count"], offset=data_start + s["offset"])
+            for name, s in header["sections"].items()
+        }
+
+        ## Verse numbers and count key positions are small and looked up on every
+        ## verse access, so kept per process as plain Python objects
+        self.verse_numbers = self.arrays["verse_verse"].tolist()
+        numbers = [str(v) for v in range(max(self.verse_numbers, default=0) + 1)]
+        self.verse_keys = [numbers[v] for v in self.verse_numbers]  # Shared "1", "2", ... strings
+        self.count_key_index = {key: i for i, key in enumerate(self.meta["count_keys"])}
+        self._count_columns = {}
+        self._base_weights = {}
+
+        ## Chapter -> ordinal range; small (~1.2k entries) so kept per process
+        self.chapters = {book: {} for book in self.meta["books"]}
+        a = self.arrays
+        boundaries = np.flatnonzero(
+            (np.diff(a["verse_book"].astype(np.int32)) != 0) | (np.diff(a["verse_chapter"].astype(np.int32)) != 0)
+        ) + 1
+        starts = np.concatenate([[0], boundaries])
+        ends = np.concatenate([boundaries, [len(a["verse_book"])]])
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            book = self.meta["books"][a["verse_book"][start]]
+            self.chapters[book][str(a["verse_chapter"][start])] = (start, end)
+
+    def text(self, ordinal: int) -> str:
+        offsets = self.arrays["text_offsets"]
+        return self.arrays["text"][offsets[ordinal]:offsets[ordinal + 1]].tobytes().decode("utf-8")
+
+    def counts(self, ordinal: int) -> dict:
+        a = self.arrays
+        start, end = a["count_indptr"][ordinal], a["count_indptr"][ordinal + 1]
+        keys = self.meta["count_keys"]
+        return dict(zip([keys[k] for k in a["count_keys"][start:end].tolist()], a["count_values"][start:end].tolist()))
+
+    def count_column(self, key: str) -> list:
+        """
+        One count for every verse (-1 where it has none), built on first use. Only
+        keys looked up one at a time (e.g. the upweighted authors in get_weight)
+        get a column, so verse weights never decode whole count dicts.
+        """
+        column = self._count_columns.get(key)
+        if column is None:
+            a = self.arrays
+            column = np.full(len(a["verse_verse"]), -1, dtype=np.int64)
+            hits = np.flatnonzero(a["count_keys"] == self.count_key_index[key])
+            column[np.searchsorted(a["count_indptr"], hits, side="right") - 1] = a["count_values"][hits]
+            column = self._count_columns[key] = column.tolist()
+        return column
+
+    def base_weights(self, keys: tuple) -> list:
+        """
+        get_weight for every verse before any review: 1 plus its counts for keys,
+        built once per process for each set of keys.
+        """
+        weights = self._base_weights.get(keys)
+        if weights is None:
+            total = np.ones(len(self.verse_numbers), dtype=np.int64)
+            for key in keys:
+                if key in self.count_key_index:
+                    total += np.maximum(np.array(self.count_column(key)), 0)
+            weights = self._base_weights[keys] = total.tolist()
+        return weights
+
+    def has_counts(self, ordinal: int) -> bool:
+        return self.arrays["count_indptr"][ordinal + 1] > self.arrays["count_indptr"][ordinal]
+
+    def tsk_entries(self, key) -> list:
+        a = self.arrays
+        packed = _tsk_key(*key)
+        pos = np.searchsorted(a["tsk_keys"], packed)
+        if pos == len(a["tsk_keys"]) or a["tsk_keys"][pos] != packed:
+            return None
+        entries = []
+        for i in range(a["tsk_indptr"][pos], a["tsk_indptr"][pos + 1]):
+            word = a["tsk_word"][a["tsk_word_offsets"][i]:a["tsk_word_offsets"][i + 1]].tobytes().decode("utf-8")
+            refs = a["tsk_ref"][a["tsk_ref_offsets"][i]:a["tsk_ref_offsets"][i + 1]].tobytes().decode("utf-8")
+            entries.append((word, refs))
+        return entries
+
+    def harmony_entry(self, i: int) -> dict:
+        offsets = self.arrays["harmony_offsets"]
+        return json.loads(self.arrays["harmony"][offsets[i]:offsets[i + 1]].tobytes())
+
+
+_MISSING = object()
+
+
+class _Verse(MutableMapping):
+    """
+    One verse: "text" and counts are read from the corpus on access. Keys written
+    to (e.g. "user_data") are held here, and the verse is kept in its bible's
+    overlay (if writable) so later lookups return it.
+    """
+
+    __slots__ = ("_corpus", "_ordinal", "_with_text", "_with_counts", "_overlay", "_own")
+
+    def __init__(self, corpus: Corpus, ordinal: int, with_text: bool, with_counts: bool, overlay: dict):
+        self._corpus, self._ordinal, self._overlay = corpus, ordinal, overlay
+        self._with_text, self._with_counts = with_text, with_counts
+        self._own = {}
+
+    def get(self, key, default=None):
+        ## Hot path (get_weight): no exception, and a count is one list lookup
+        if key in self._own:
+            return self._own[key]
+        if key == "text" and self._with_text:
+            return self._corpus.text(self._ordinal)
+        if not self._with_counts or key not in self._corpus.count_key_index:
+            return default
+        count = self._corpus.count_column(key)[self._ordinal]
+        return default if count < 0 else count
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._own[key] = value
+        if self._overlay is not None:
+            self._overlay[self._ordinal] = self
+
+    def __delitem__(self, key):
+        del self._own[key]  # Corpus fields are read-only
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __iter__(self):
+        counts = self._corpus.counts(self._ordinal) if self._with_counts else {}
+        keys = (["text"] if self._with_text else []) + list(counts)
+        yield from (key for key in keys if key not in self._own)
+        yield from self._own
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _ChapterView(Mapping):
+    """verse -> {"text", counts...} (or counts only), built on access."""
+
+    def __init__(self, corpus: Corpus, start: int, end: int, with_text: bool, with_counts: bool, overlay: dict):
+        self._corpus, self._start, self._end = corpus, start, end
+        self._with_text, self._with_counts, self._overlay = with_text, with_counts, overlay
+
+    def _ordinal(self, verse):
+        try:
+            v = int(verse)
+        except (TypeError, ValueError):
+            return None
+        numbers = self._corpus.verse_numbers
+        ordinal = self._start + v - 1  # Verses are almost always 1..n
+        if not (self._start <= ordinal < self._end and numbers[ordinal] == v):
+            try:
+                ordinal = numbers.index(v, self._start, self._end)
+            except ValueError:
+                return None
+        if str(v) != str(verse) or not (self._with_text or self._corpus.has_counts(ordinal)):
+            return None
+        return ordinal
+
+    def _ordinals(self):
+        for ordinal in range(self._start, self._end):
+            if self._with_text or self._corpus.has_counts(ordinal):
+                yield ordinal
+
+    def __getitem__(self, verse):
+        ordinal = self._ordinal(verse)
+        if ordinal is None:
+            raise KeyError(verse)
+        if self._overlay is not None and ordinal in self._overlay:
+            return self._overlay[ordinal]
+        return _Verse(self._corpus, ordinal, self._with_text, self._with_counts, self._overlay)
+
+    def __contains__(self, verse):
+        return self._ordinal(verse) is not None
+
+    def __iter__(self):
+        keys = self._corpus.verse_keys
+        if self._with_text:
+            return iter(keys[self._start:self._end])
+        return (keys[ordinal] for ordinal in self._ordinals())
+
+    def __len__(self):
+        return self._end - self._start if self._with_text else sum(1 for _ in self._ordinals())
+
+
+class _BookView(Mapping):
+    def __init__(self, corpus: Corpus, book: str, with_text: bool, with_counts: bool, overlay: dict):
+        self._views = {
+            chapter: _ChapterView(corpus, start, end, with_text, with_counts, overlay)
+            for chapter, (start, end) in corpus.chapters[book].items()
+            if with_text or any(corpus.has_counts(o) for o in range(start, end))
+        }
+
+    def __getitem__(self, chapter):
+        return self._views[chapter]
+
+    def __iter__(self):
+        return iter(self._views)
+
+    def __len__(self):
+        return len(self._views)
+
+
+class BibleView(Mapping):
+    """
+    Stand-in for the nested book -> chapter -> verse dicts. With
+    with_text=False it mirrors verse_counts.json (only verses with counts);
+    with_counts=False leaves the counts out of each verse.
+
+    With writable=True it serves as a per-user bible: a verse written to (e.g.
+    its "user_data" set) is kept in a small per-view overlay, while every other
+    verse is still read from the shared corpus.
+    """
+
+    def __init__(self, corpus: Corpus, with_text: bool = True, with_counts: bool = True, writable: bool = False):
+        self.writable = writable
+        self._corpus, self._with_counts, self._overlay = corpus, with_counts, {} if writable else None
+        self._books = {
+            book: _BookView(corpus, book, with_text, with_counts, self._overlay) for book in corpus.meta["books"]
+        }
+        if not with_text:
+            self._books = {book: view for book, view in self._books.items() if len(view)}
+
+    def base_weights(self, upweight) -> list:
+        """Per-ordinal weights of unreviewed verses (shared by every view of the corpus)."""
+        return self._corpus.base_weights(tuple(upweight) if self._with_counts else ())
+
+    def written_ordinals(self) -> list:
+        return sorted(self._overlay or ())
+
+    def written_verses(self):
+        """(book, chapter, verse, verse_dict) for each verse written to, in Bible order."""
+        a, books = self._corpus.arrays, self._corpus.meta["books"]
+        for ordinal in sorted(self._overlay):
+            book = books[int(a["verse_book"][ordinal])]
+            yield book, str(a["verse_chapter"][ordinal]), str(a["verse_verse"][ordinal]), self._overlay[ordinal]
+
+    def __getitem__(self, book):
+        return self._books[book]
+
+    def __iter__(self):
+        return iter(self._books)
+
+    def __len__(self):
+        return len(self._books)
+
+
+class TskView(Mapping):
+    """(book_key, chapter, verse) -> [(word, references), ...] like load_tsk_data()."""
+
+    def __init__(self, corpus: Corpus):
+        self._corpus = corpus
+
+    def __getitem__(self, key):
+        entries = self._corpus.tsk_entries(key)
+        if entries is None:
+            raise KeyError(key)
+        return entries
+
+    def __iter__(self):
+        for packed in self._corpus.arrays["tsk_keys"].tolist():
+            yield (packed // 1_000_000, packed // 1000 % 1000, packed % 1000)
+
+    def __len__(self):
+        return len(self._corpus.arrays["tsk_keys"])
+
+
+class HarmonyView(Sequence):
+    """Harmony entries like load_harmony_data(), each decoded on access."""
+
+    def __init__(self, corpus: Corpus):
+        self._corpus = corpus
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(len(self))[i]]
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return self._corpus.harmony_entry(i % len(self))
+
+    def __len__(self):
+        return len(self._corpus.arrays["harmony_offsets"]) - 1
+
+
+def attach_shared_corpus(path=None) -> bool:
+    """
+    Map the corpus named by KYB_CORPUS (if any) and hand its views to warmup,
+    so this worker never loads the raw files. Returns whether a corpus was attached.
+    """
+    global CORPUS
+    path = path or os.environ.get(CORPUS_ENV)
+    if not path:
+        return False
+    try:
+        CORPUS = Corpus(path)
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Could not attach shared corpus {path}, loading datasets from files: {e}")
+        return False
+
+    warmup.provide("bible", BibleView(CORPUS, with_text=True))
+    warmup.provide("verse_counts", BibleView(CORPUS, with_text=False))
+    warmup.provide("tsk", TskView(CORPUS))
+    warmup.provide("harmony", HarmonyView(CORPUS))
+    print(f"[DEBUG] Attached shared corpus {path}")
+    return True
+
+
+if __name__ == "__main__":
+    import sys
+    print(build_corpus(sys.argv[1] if len(sys.argv) > 1 else None))
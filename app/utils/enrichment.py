@@ -0,0 +1,102 @@
+# app/utils/enrichment.py
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Any
+
+## Allow relative imports when running as a standalone script
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import app.utils.cache as cache
+from app.utils.tsk import get_tsk_for_ref
+from app.utils.harmony import get_harmony_entries_for_verse
+
+ENRICHMENT_DIR = os.path.join("data", "enrichment")
+
+## translation -> {reference: payload}, loaded from ENRICHMENT_DIR if precomputed
+PRECOMPUTED = {}
+
+
+def build_verse_enrichment(ref: str, ch_verses: int) -> Dict[str, Any]:
+    """
+    Compute the result-page enrichment for a single verse reference.
+    """
+    return {
+        "tsk_data": get_tsk_for_ref(ref),
+        "harmony_data": get_harmony_entries_for_verse(ref),
+        "ch_verses": ch_verses,
+    }
+
+
+def load_precomputed_enrichment(translation: str = "esv") -> Dict[str, Any]:
+    """
+    Load precomputed enrichment payloads for a translation, if saved to disk.
+    """
+    translation = translation.lower()
+    if translation not in PRECOMPUTED:
+        path = Path(ENRICHMENT_DIR) / f"{translation}.json"
+        if path.exists():
+            with open(path, "r", encoding="utf-8") as f:
+                PRECOMPUTED[translation] = json.load(f)
+            print(f"[DEBUG] Loaded {len(PRECOMPUTED[translation])} precomputed enrichments from {path}")
+        else:
+            PRECOMPUTED[translation] = {}
+    return PRECOMPUTED[translation]
+
+
+def get_verse_enrichment(bible: dict, book: str, chapter: str, verse: str, translation: str = "esv") -> Dict[str, Any]:
+    """
+    Return the enrichment payload (TSK entries, harmony entries, chapter verse count)
+    for a verse, served from precomputed payloads or the shared LRU cache when possible.
+
+    The reference is built from book/chapter/verse, which must exist in bible, so
+    the cached payload always matches its key. The payload is shared between
+    users and must not be mutated by callers.
+    """
+    chapter_verses = bible[book][str(chapter)]
+    if str(verse) not in chapter_verses:
+        raise KeyError(f"{book} {chapter}:{verse}")
+    ref = f"{book} {chapter}:{verse}"
+
+    translation = translation.lower()
+    precomputed = load_precomputed_enrichment(translation).get(ref)
+    if precomputed is not None:
+        cache.record_verse_hit()
+        return precomputed
+
+    key = (translation, ref)
+    payload = cache.get_cached_verse(key)
+    if payload is None:
+        payload = build_verse_enrichment(ref, len(chapter_verses))
+        cache.set_cached_verse(key, payload)
+    return payload
+
+
+def precompute_verse_enrichment(bible: dict, translation: str = "esv") -> Path:
+    """
+    Compute and persist enrichment payloads for every verse in the Bible.
+    """
+    payloads = {}
+    for book, chapters in bible.items():
+        for chapter, verses in chapters.items():
+            for verse in verses:
+                ref = f"{book} {chapter}:{verse}"
+                payloads[ref] = build_verse_enrichment(ref, len(verses))
+
+    os.makedirs(ENRICHMENT_DIR, exist_ok=True)
+    path = Path(ENRICHMENT_DIR) / f"{translation.lower()}.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payloads, f, ensure_ascii=False)
+
+    PRECOMPUTED[translation.lower()] = payloads
+    print(f"[INFO] Wrote {len(payloads)} verse enrichments to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    from app.utils.bible import get_bible_translation
+
+    translation = sys.argv[1] if len(sys.argv) > 1 else "esv"
+    precompute_verse_enrichment(get_bible_translation(translation, bool_counts=False), translation)
@@ -0,0 +1,203 @@
+import re
+import json
+from datetime import datetime
+from decimal import Decimal
+from fsrs import Card
+from boto3.dynamodb.conditions import Key
+
+## Streaming export/import of a user's results (know-your-bible-results items).
+## Exports read one DynamoDB page at a time, so memory stays flat however long
+## the history is; imports write through batch_writer keyed on (user_id, id).
+
+EXPORT_PAGE_SIZE = 500
+ARROW_BATCH_SIZE = 1000
+ARROW_END_OF_STREAM = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+
+## Flat columns for the Arrow export; nested values (card_dict) are JSON strings
+ARROW_COLUMNS = {
+    "id": "string", "user_id": "string", "timestamp": "string", "reference": "string",
+    "submitted": "string", "stars": "int64", "score": "float64", "distance": "float64",
+    "timer": "float64", "rating": "int64", "card_dict": "string", "due_str": "string",
+    "interval_secs": "float64",
+}
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"Not JSON serializable: {type(value).__name__}")
+
+
+def iter_user_results(results_table, user_id: str, page_size: int = EXPORT_PAGE_SIZE):
+    """Yield a user's results page by page, never holding more than one page."""
+    paginator = results_table.meta.client.get_paginator("query")
+    for page in paginator.paginate(
+        TableName=results_table.name,
+        KeyConditionExpression=Key("user_id").eq(user_id),
+        PaginationConfig={"PageSize": page_size},
+    ):
+        yield from page.get("Items", [])
+
+
+def iter_ndjson(items):
+    """One JSON object per line."""
+    for item in items:
+        yield (json.dumps(item, default=_json_default, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _arrow_row(item: dict) -> dict:
+    row = {}
+    for column, kind in ARROW_COLUMNS.items():
+        value = item.get(column)
+        if value is None:
+            row[column] = None
+        elif kind == "string":
+            row[column] = value if isinstance(value, str) else json.dumps(value, default=_json_default)
+        elif kind == "int64":
+            row[column] = int(value)
+        else:
+            row[column] = float(value)
+    return row
+
+
+def iter_arrow(items, batch_size: int = ARROW_BATCH_SIZE):
+    """
+    Arrow IPC stream, one record batch per batch_size results. Parquet needs its
+    footer written last, so the stream format is what can be sent as it is built.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema([(column, getattr(pa, kind)()) for column, kind in ARROW_COLUMNS.items()])
+    yield schema.serialize().to_pybytes()
+
+    rows = []
+    for item in items:
+        rows.append(_arrow_row(item))
+        if len(rows) == batch_size:
+            yield pa.RecordBatch.from_pylist(rows, schema=schema).serialize().to_pybytes()
+            rows = []
+    if rows:
+        yield pa.RecordBatch.from_pylist(rows, schema=schema).serialize().to_pybytes()
+    yield ARROW_END_OF_STREAM
+
+
+def parse_ndjson(lines):
+    """Yield (line_number, item or None) for each non-blank NDJSON line; floats become Decimals."""
+    for i, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield i, json.loads(line, parse_float=Decimal)
+        except ValueError:
+            yield i, None
+
+
+REFERENCE_PATTERN = re.compile(r"^\S.* \d+:\d+$")
+REQUIRED_FIELDS = ("id", "reference", "timestamp")
+
+
+def _text(value) -> str:
+    if isinstance(value, bool) or not isinstance(value, (str, int)) or not str(value).strip():
+        raise ValueError("not a string")
+    return str(value)
+
+
+def _reference(value) -> str:
+    if not isinstance(value, str) or not REFERENCE_PATTERN.match(value):
+        raise ValueError("not a 'Book chapter:verse' reference")
+    return value
+
+
+def _iso_time(value) -> str:
+    if not isinstance(value, str):
+        raise ValueError("not an ISO timestamp")
+    datetime.fromisoformat(value)
+    return value
+
+
+def _number(value) -> Decimal:
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal, str)):
+        raise ValueError("not a number")
+    try:
+        number = Decimal(str(value).strip())
+    except ArithmeticError:
+        raise ValueError("not a number")
+    if not number.is_finite():
+        raise ValueError("not a finite number")
+    return number
+
+
+def _integer(value) -> int:
+    number = _number(value)
+    if number != number.to_integral_value():
+        raise ValueError("not an integer")
+    return int(number)
+
+
+def _rating(value) -> int:
+    rating = _integer(value)
+    if not 1 <= rating <= 4:
+        raise ValueError("not a rating from 1 to 4")
+    return rating
+
+
+def _card(value) -> dict:
+    if not isinstance(value, dict):
+        raise ValueError("not a card")
+    card = Card.from_dict(value)
+    if card.step is not None:
+        card.step = _integer(card.step)
+    return {key: Decimal(str(v)) if isinstance(v, float) else v for key, v in card.to_dict().items()}
+
+
+## The fields a result may be imported with, and how each is checked and coerced
+## (numbers become Decimals for DynamoDB); any other key is dropped
+IMPORT_FIELDS = {
+    "id": _text, "reference": _reference, "submitted": _text, "timestamp": _iso_time,
+    "stars": _integer, "score": _number, "distance": _number, "timer": _number,
+    "rating": _rating, "card_dict": _card, "due_str": _iso_time, "interval_secs": _number,
+}
+
+
+def clean_result(item) -> dict:
+    """A result with only known, well-typed fields; raises ValueError naming the first bad one."""
+    if not isinstance(item, dict):
+        raise ValueError("not a JSON object")
+    for field in REQUIRED_FIELDS:
+        if item.get(field) in (None, ""):
+            raise ValueError(f"missing {field}")
+    cleaned = {}
+    for field, coerce in IMPORT_FIELDS.items():
+        if item.get(field) is None:
+            continue
+        try:
+            cleaned[field] = coerce(item[field])
+        except (ValueError, TypeError, KeyError) as e:
+            raise ValueError(f"invalid {field} ({e})")
+    return cleaned
+
+
+def import_user_results(results_table, user_id: str, lines) -> dict:
+    """
+    Write NDJSON results to the user's history. Every record must carry its id,
+    reference and timestamp, and every known field must have the type the app
+    writes; other lines are skipped. Re-importing the same file overwrites the
+    same items instead of duplicating them. Records are always stored under
+    user_id, whatever the file says.
+    """
+    counts = {"imported": 0, "skipped": 0, "errors": []}
+    with results_table.batch_writer(overwrite_by_pkeys=["user_id", "id"]) as batch:
+        for line_number, item in parse_ndjson(lines):
+            try:
+                if item is None:
+                    raise ValueError("not valid JSON")
+                item = clean_result(item)
+            except ValueError as e:
+                counts["skipped"] += 1
+                if len(counts["errors"]) < 10:
+                    counts["errors"].append(f"line {line_number}: {e}")
+                continue
+            item["user_id"] = user_id
+            batch.put_item(Item=item)
+            counts["imported"] += 1
+    return counts
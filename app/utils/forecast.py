@@ -0,0 +1,45 @@
+import math
+import numpy as np
+from datetime import datetime, timedelta, timezone
+
+## Cards due per UTC day: {"days": {epoch_day: count}}, kept current by /submit
+FORECAST_DAYS = 30
+DAY_SECS = 86400
+
+
+def _epoch_day(due_epoch: float):
+    return None if due_epoch is None or math.isnan(due_epoch) else int(due_epoch // DAY_SECS)
+
+
+def build_forecast(index: dict) -> dict:
+    """Bucket every indexed card's due date by day (once per cold load)."""
+    due = index["due"][:index["size"]]
+    days, counts = np.unique(np.floor(due[~np.isnan(due)] / DAY_SECS).astype(np.int64), return_counts=True)
+    return {"days": dict(zip(days.tolist(), counts.tolist()))}
+
+
+def move_card(forecast: dict, old_due_epoch, new_due_epoch):
+    """Move one card from its old due day (None or NaN if new) to its new one."""
+    days = forecast["days"]
+    old_day, new_day = _epoch_day(old_due_epoch), _epoch_day(new_due_epoch)
+    if old_day is not None and days.get(old_day):
+        days[old_day] -= 1
+        if not days[old_day]:
+            del days[old_day]
+    if new_day is not None:
+        days[new_day] = days.get(new_day, 0) + 1
+
+
+def get_forecast(forecast: dict, now: datetime, n_days: int = FORECAST_DAYS) -> list:
+    """
+    Cards due on each of the next n_days (UTC), starting today; anything
+    already overdue counts as due today.
+    """
+    today = int(now.timestamp() // DAY_SECS)
+    counts = [0] * n_days
+    for day, count in forecast["days"].items():
+        offset = max(0, day - today)
+        if offset < n_days:
+            counts[offset] += count
+    start = datetime.fromtimestamp(today * DAY_SECS, tz=timezone.utc).date()
+    return [{"date": (start + timedelta(days=i)).isoformat(), "due": count} for i, count in enumerate(counts)]
@@ -9,13 +9,23 @@ from typing import List, Dict, Any
 ## Allow relative imports when running as a standalone script
 sys.path.append(str(Path(__file__).resolve().parents[2]))
 
+import app.utils.warmup as warmup
 from data.references.get_resource_references import extract_references
 
 HARMONY_PATH = os.path.join("data", "harmony", "harmony.json")
 
-# Load harmony data globally
-with open(HARMONY_PATH, "r", encoding="utf-8") as f:
-    HARMONY_DATA = json.load(f)
+
+def load_harmony_data() -> List[Dict[str, Any]]:
+    with open(HARMONY_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Load harmony data globally, lazily or during warmup
+warmup.register("harmony", load_harmony_data)
+
+def __getattr__(name):
+    if name == "HARMONY_DATA":
+        return warmup.get("harmony")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 GOSPELS = {"Matthew", "Mark", "Luke", "John"}
 
@@ -54,7 +64,7 @@ def get_harmony_entries_for_verse(actual_ref: str) -> List[Dict[str, Any]]:
         return []
 
     matching_entries = []
-    for entry in HARMONY_DATA:
+    for entry in warmup.get("harmony"):
         for ref in entry.get("references", []):
             if ref_in_range(verse, ref):
                 matching_entries.append({
@@ -0,0 +1,104 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+
+## Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = Lock()
+HELP = {}
+TYPES = {}
+COUNTERS = {}  # (name, labels) -> value
+HISTOGRAMS = {}  # (name, labels) -> {"buckets": [...], "counts": [...], "sum": float, "count": int}
+CALLBACKS = {}  # name -> fn returning a value or {labels: value}
+
+
+def describe(name: str, metric_type: str, help_text: str):
+    HELP[name] = help_text
+    TYPES[name] = metric_type
+
+
+def inc(name: str, value: float = 1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        COUNTERS[key] = COUNTERS.get(key, 0) + value
+
+
+def observe(name: str, value: float, buckets=DEFAULT_BUCKETS, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        hist = HISTOGRAMS.get(key)
+        if hist is None:
+            hist = HISTOGRAMS[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        idx = bisect_left(hist["buckets"], value)
+        if idx < len(hist["counts"]):
+            hist["counts"][idx] += 1
+        hist["sum"] += value
+        hist["count"] += 1
+
+
+@contextmanager
+def timer(name: str, **labels):
+    """Observe the wall time of a block in a histogram."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+
+def register_callback(name: str, metric_type: str, help_text: str, fn):
+    """Export a value computed at scrape time (e.g. a cache size)."""
+    describe(name, metric_type, help_text)
+    CALLBACKS[name] = fn
+
+
+def _format_labels(labels, extra=()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    seen = set()
+
+    def header(name):
+        if name not in seen:
+            seen.add(name)
+            if name in HELP:
+                lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {TYPES[name]}")
+
+    with _lock:
+        counters = sorted(COUNTERS.items())
+        histograms = sorted((key, dict(h, counts=list(h["counts"]))) for key, h in HISTOGRAMS.items())
+
+    for (name, labels), value in counters:
+        header(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), hist in histograms:
+        header(name)
+        cumulative = 0
+        for bound, count in zip(hist["buckets"], hist["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {hist['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {hist['count']}")
+
+    for name, fn in CALLBACKS.items():
+        header(name)
+        value = fn()
+        if isinstance(value, dict):
+            for labels, v in sorted(value.items()):
+                lines.append(f"{name}{_format_labels(labels)} {v}")
+        else:
+            lines.append(f"{name} {value}")
+
+    return "\n".join(lines) + "\n"
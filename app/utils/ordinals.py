@@ -0,0 +1,206 @@
+import re
+import sys
+import json
+import hashlib
+import numpy as np
+from pathlib import Path
+from threading import Lock
+from dataclasses import dataclass
+from cachetools import LRUCache
+
+## Allow relative imports when running as a standalone script
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import app.utils.warmup as warmup
+from app.utils.bible import OT_BOOKS, NT_BOOKS, get_bible, get_bible_translation
+from data.references.get_resource_references import extract_references
+
+## Verse ordinals: every verse of a translation numbered 0..n-1 in Bible order,
+## so verse sets are boolean masks / sorted ordinal arrays instead of tuple lists.
+
+
+def build_ordinal_table(bible) -> dict:
+    refs = []
+    books = {}
+    chapters = {}
+    for book in bible:
+        book_start = len(refs)
+        for chapter in bible[book]:
+            chapter_start = len(refs)
+            refs.extend((book, chapter, verse) for verse in bible[book][chapter])
+            chapters[(book, chapter)] = (chapter_start, len(refs))
+        books[book] = (book_start, len(refs))
+    return {
+        "refs": tuple(refs),
+        "index": {ref: i for i, ref in enumerate(refs)},
+        "books": books,
+        "chapters": chapters,
+        "size": len(refs),
+    }
+
+warmup.register("ordinals", lambda: build_ordinal_table(get_bible()))
+
+## Other translations are only numbered if someone selects them
+_tables = {}
+_tables_lock = Lock()
+
+def get_ordinal_table(translation: str = "esv") -> dict:
+    translation = translation.lower()
+    if translation == "esv":
+        return warmup.get("ordinals")
+    with _tables_lock:
+        if translation not in _tables:
+            _tables[translation] = build_ordinal_table(get_bible_translation(translation, bool_counts=False))
+        return _tables[translation]
+
+
+@dataclass(frozen=True, eq=False)
+class EligibleVerses:
+    """Shared, read-only result of a selection; identical selections get the same object."""
+    key: str
+    ordinals: np.ndarray  # Sorted, read-only
+    refs: tuple  # The translation's (book, chapter, verse) per ordinal
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def __iter__(self):
+        refs = self.refs
+        return (refs[o] for o in self.ordinals.tolist())
+
+
+## Memoized by selection key across all users
+ELIGIBLE_CACHE = LRUCache(maxsize=256)
+_eligible_lock = Lock()
+eligible_stats = {"hits": 0, "misses": 0}
+
+
+def _chapter_key(ch) -> str:
+    """Chapter numbers come back from DynamoDB as floats (3.0); keys are '3'."""
+    return str(int(ch)) if isinstance(ch, float) and ch.is_integer() else str(ch)
+
+
+def selection_key(translation, testaments, books, chapters, verse_ranges) -> str:
+    """Canonical hash of a selection; order and str/int chapter keys don't matter."""
+    canonical = json.dumps({
+        "translation": translation.lower(),
+        "testaments": sorted(testaments),
+        "books": sorted(books),
+        "chapters": {book: sorted({_chapter_key(ch) for ch in chs}) for book, chs in chapters.items() if chs},
+        "verses": None if verse_ranges is None else [[int(start), int(end)] for start, end in verse_ranges],
+    }, sort_keys=True)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def mask_to_ranges(mask: np.ndarray) -> list:
+    """Boolean mask -> merged [start, end) ordinal ranges."""
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.astype(np.int8), [0]])))
+    return [[int(start), int(end)] for start, end in zip(edges[::2], edges[1::2])]
+
+
+def ranges_to_mask(ranges, size: int) -> np.ndarray:
+    mask = np.zeros(size, dtype=bool)
+    for start, end in ranges:
+        mask[int(start):int(end)] = True
+    return mask
+
+
+## Pieces of a verse selection are separated by semicolons or new lines; a piece
+## that is only numbers ("17", "2:8-10") continues the previous piece's book
+SELECTION_SEPARATOR = re.compile(r"[;\n]+")
+CONTINUATION = re.compile(r"^\d+(?::\d+)?[a-zA-Z]?(?:\s*[-–,]\s*\d+(?::\d+)?[a-zA-Z]?)*$")
+
+
+def compile_verse_selection(translation: str, selected_verses: str) -> dict:
+    """
+    Parse a free-text selection like 'John 3:16; Romans 8:28-39' once into
+    merged ordinal ranges. Pieces that name no known verse are listed in "errors".
+    """
+    table = get_ordinal_table(translation)
+    mask = np.zeros(table["size"], dtype=bool)
+    errors = []
+    last_book = last_chapter = None
+
+    for piece in SELECTION_SEPARATOR.split(selected_verses or ""):
+        piece = piece.strip()
+        if not piece:
+            continue
+
+        references = extract_references(piece)
+        if not references and last_book and CONTINUATION.match(piece):
+            prefix = f"{last_book} " if ":" in piece else f"{last_book} {last_chapter}:"
+            references = extract_references(prefix + piece)
+
+        found = False
+        for item in references:
+            for ref in item["verses"]:
+                book, chapter_verse = ref.rsplit(" ", 1)
+                chapter, _, verse = chapter_verse.partition(":")
+                ordinal = table["index"].get((book, chapter, verse))
+                if ordinal is not None:
+                    mask[ordinal] = True
+                    found = True
+                last_book, last_chapter = book, chapter
+        if not found:
+            errors.append(piece)
+
+    return {"ranges": mask_to_ranges(mask), "size": table["size"], "errors": errors}
+
+
+def build_eligible_mask(table, testaments, books, chapters, verse_ranges) -> np.ndarray:
+    mask = np.zeros(table["size"], dtype=bool)
+
+    ## Entire testament(s) and books
+    books = set(books)
+    books |= set(OT_BOOKS if "old" in testaments else [])
+    books |= set(NT_BOOKS if "new" in testaments else [])
+    for book in books:
+        if book in table["books"]:
+            start, end = table["books"][book]
+            mask[start:end] = True
+
+    ## Individual chapters
+    for book, chs in chapters.items():
+        for ch in chs:
+            bounds = table["chapters"].get((book, _chapter_key(ch)))
+            if bounds:
+                mask[bounds[0]:bounds[1]] = True
+            else:
+                print(f"[DEBUG] ⚠️ Chapter {ch} not found in {book}")
+
+    verse_mask = ranges_to_mask(verse_ranges, table["size"]) if verse_ranges is not None else None
+    if verse_mask is not None:
+        mask &= verse_mask
+
+    if not mask.any():
+        print("[DEBUG] ⚠️ No eligible references found, falling back to full bible")
+        mask = verse_mask if verse_mask is not None and verse_mask.any() else np.ones(table["size"], dtype=bool)
+    return mask
+
+
+def get_eligible_verses(translation, testaments, books, chapters, verse_ranges=None) -> EligibleVerses:
+    """
+    Eligible verses for a selection; verse_ranges (from compile_verse_selection)
+    restricts it to a verse selection, None means no verse selection.
+    """
+    key = selection_key(translation, testaments, books, chapters, verse_ranges)
+    with _eligible_lock:
+        eligible = ELIGIBLE_CACHE.get(key)
+        if eligible is not None:
+            eligible_stats["hits"] += 1
+            return eligible
+        eligible_stats["misses"] += 1
+
+    table = get_ordinal_table(translation)
+    ordinals = np.flatnonzero(build_eligible_mask(table, testaments, books, chapters, verse_ranges))
+    ordinals.flags.writeable = False
+    eligible = EligibleVerses(key, ordinals, table["refs"])
+
+    with _eligible_lock:
+        ## Another thread may have built the same selection meanwhile; keep one copy
+        return ELIGIBLE_CACHE.setdefault(key, eligible)
+
+
+def get_eligible_cache_stats() -> dict:
+    with _eligible_lock:
+        return {**eligible_stats, "size": len(ELIGIBLE_CACHE)}
@@ -0,0 +1,231 @@
+import math
+import numpy as np
+from datetime import datetime, timezone
+from fsrs import Card, State
+from fsrs.scheduler import STABILITY_MIN, MIN_DIFFICULTY, MAX_DIFFICULTY, FUZZ_RANGES
+
+from app.utils.bible import card_state
+from app.utils.review_index import update_review_index
+
+## Replays every card's review history under a scheduler's parameters at once:
+## one numpy step per review position instead of one review_card call per review.
+
+DAY_SECS = 86400.0
+LEARNING, REVIEW, RELEARNING = State.Learning.value, State.Review.value, State.Relearning.value
+
+
+def _steps_secs(steps) -> np.ndarray:
+    return np.array([step.total_seconds() for step in steps], dtype=float)
+
+
+def _next_interval_days(scheduler, stability: np.ndarray) -> np.ndarray:
+    """Scheduler._next_interval for an array of stabilities."""
+    interval = stability / scheduler._FACTOR * (scheduler.desired_retention ** (1 / scheduler._DECAY) - 1)
+    return np.clip(np.round(interval), 1, scheduler.maximum_interval)
+
+
+def _fuzz_days(scheduler, days: np.ndarray, rng) -> np.ndarray:
+    """Scheduler._get_fuzzed_interval for an array of whole-day intervals."""
+    delta = np.ones_like(days)
+    for fuzz_range in FUZZ_RANGES:
+        delta += fuzz_range["factor"] * np.maximum(np.minimum(days, fuzz_range["end"]) - fuzz_range["start"], 0.0)
+    max_ivl = np.minimum(np.round(days + delta), scheduler.maximum_interval)
+    min_ivl = np.minimum(np.maximum(2, np.round(days - delta)), max_ivl)
+    fuzzed = np.minimum(np.round(rng.random(len(days)) * (max_ivl - min_ivl + 1) + min_ivl), scheduler.maximum_interval)
+    return np.where(days < 2.5, days, fuzzed)
+
+
+def _step_interval(rating, step, steps_secs) -> tuple:
+    """
+    Learning/relearning step transitions for cards still in steps.
+    Returns (graduate, new_step, interval_secs); interval is NaN where graduating.
+    """
+    n = len(steps_secs)
+    if n == 0:
+        return np.ones(len(rating), dtype=bool), step, np.full(len(rating), np.nan)
+
+    graduate = ((step >= n) & (rating >= 2)) | (rating == 4) | ((rating == 3) & (step + 1 == n))
+    new_step = np.where(rating == 1, 0, np.where(rating == 3, step + 1, step))
+    hard_first = steps_secs[0] * 1.5 if n == 1 else (steps_secs[0] + steps_secs[1]) / 2.0
+    interval = np.where(
+        (rating == 2) & (step == 0), hard_first, steps_secs[np.clip(new_step, 0, n - 1)]
+    )
+    return graduate, np.where(graduate, -1, new_step), np.where(graduate, np.nan, interval)
+
+
+def replay_cards(scheduler, ratings: np.ndarray, times: np.ndarray, lengths: np.ndarray, seed: int | None = None) -> dict:
+    """
+    Replay padded review histories (cards x reviews; ratings 1-4, times in epoch
+    seconds, lengths = reviews per card) as Scheduler.review_card would, starting
+    from new cards. Returns final state, step (-1 for None), stability, difficulty,
+    last_review and due (epoch seconds) arrays.
+    """
+    w = scheduler.parameters
+    n_cards = len(lengths)
+    rng = np.random.default_rng(seed)
+    learning_secs = _steps_secs(scheduler.learning_steps)
+    relearning_secs = _steps_secs(scheduler.relearning_steps)
+    init_d_easy = min(max(w[4] - math.e ** (w[5] * 3) + 1, MIN_DIFFICULTY), MAX_DIFFICULTY)
+
+    state = np.full(n_cards, LEARNING)
+    step = np.zeros(n_cards, dtype=int)
+    stability = np.full(n_cards, np.nan)
+    difficulty = np.full(n_cards, np.nan)
+    last_review = np.full(n_cards, np.nan)
+    due = np.full(n_cards, np.nan)
+
+    for t in range(int(lengths.max(initial=0))):
+        idx = np.flatnonzero(lengths > t)
+        r = ratings[idx, t]
+        now = times[idx, t]
+        s, d, st, sp, last = stability[idx], difficulty[idx], state[idx], step[idx], last_review[idx]
+
+        ## Memory state
+        new = np.isnan(s)
+        days = np.floor((now - last) / DAY_SECS)
+        short_term = ~new & (days < 1)
+        with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+            retrievability = (1 + scheduler._FACTOR * np.maximum(0, np.nan_to_num(days)) / s) ** scheduler._DECAY
+
+            stb_short = s * np.where(
+                r >= 3,
+                np.maximum(np.exp(w[17] * (r - 3 + w[18])) * s ** -w[19], 1.0),
+                np.exp(w[17] * (r - 3 + w[18])) * s ** -w[19],
+            )
+            forget = np.minimum(
+                w[11] * d ** -w[12] * ((s + 1) ** w[13] - 1) * np.exp((1 - retrievability) * w[14]),
+                s / math.e ** (w[17] * w[18]),
+            )
+            recall = s * (
+                1 + math.e ** w[8] * (11 - d) * s ** -w[9] * (np.exp((1 - retrievability) * w[10]) - 1)
+                * np.where(r == 2, w[15], 1) * np.where(r == 4, w[16], 1)
+            )
+            stb_long = np.where(r == 1, forget, recall)
+
+        init_s = np.array(w[:4])[r - 1]
+        init_d = np.clip(w[4] - np.exp(w[5] * (r - 1)) + 1, MIN_DIFFICULTY, MAX_DIFFICULTY)
+        next_d = np.clip(
+            w[7] * init_d_easy + (1 - w[7]) * (d + (10.0 - d) * -(w[6] * (r - 3)) / 9.0),
+            MIN_DIFFICULTY, MAX_DIFFICULTY,
+        )
+        s = np.maximum(np.where(new, init_s, np.where(short_term, stb_short, stb_long)), STABILITY_MIN)
+        d = np.where(new, init_d, next_d)
+
+        ## Next state and interval
+        interval_secs = np.full(len(idx), np.nan)
+        new_state, new_step = st.copy(), sp.copy()
+
+        for steps_state, steps_secs in ((LEARNING, learning_secs), (RELEARNING, relearning_secs)):
+            mask = st == steps_state
+            if mask.any():
+                graduate, moved_step, secs = _step_interval(r[mask], sp[mask], steps_secs)
+                new_state[mask] = np.where(graduate, REVIEW, steps_state)
+                new_step[mask] = moved_step
+                interval_secs[mask] = secs
+
+        lapse = (st == REVIEW) & (r == 1) & (len(relearning_secs) > 0)
+        new_state[lapse] = RELEARNING
+        new_step[lapse] = 0
+        if len(relearning_secs):
+            interval_secs[lapse] = relearning_secs[0]
+
+        ## Everything that ends up in Review gets a whole-day interval
+        in_review = new_state == REVIEW
+        days_interval = _next_interval_days(scheduler, s[in_review])
+        if scheduler.enable_fuzzing:
+            days_interval = _fuzz_days(scheduler, days_interval, rng)
+        interval_secs[in_review] = days_interval * DAY_SECS
+        new_step[in_review] = -1
+
+        stability[idx], difficulty[idx], state[idx], step[idx] = s, d, new_state, new_step
+        last_review[idx] = now
+        due[idx] = now + interval_secs
+
+    return {
+        "state": state, "step": step, "stability": stability,
+        "difficulty": difficulty, "last_review": last_review, "due": due,
+    }
+
+
+def _epoch_to_datetime(secs: float) -> datetime:
+    return datetime.fromtimestamp(secs, tz=timezone.utc)
+
+
+def collect_histories(user_data: list) -> tuple:
+    """
+    Group results by reference into padded (ratings, times, lengths) arrays.
+    Returns (refs, ratings, times, lengths, latest) where latest[i] is the most
+    recent result for refs[i].
+    """
+    histories = {}
+    for result in user_data:
+        reference, rating = result.get("reference"), result.get("rating")
+        card_dict = result.get("card_dict") or {}
+        if card_dict.get("last_review"):
+            reviewed = datetime.fromisoformat(card_dict["last_review"]).timestamp()
+        else:
+            reviewed = result.get("timestamp_epoch")
+        if not (reference and rating and reviewed is not None):
+            continue
+        histories.setdefault(reference, []).append((reviewed, int(rating), result))
+
+    refs = list(histories)
+    lengths = np.array([len(histories[ref]) for ref in refs], dtype=int)
+    width = int(lengths.max(initial=0))
+    ratings = np.ones((len(refs), width), dtype=int)
+    times = np.zeros((len(refs), width))
+    latest = []
+    for i, ref in enumerate(refs):
+        history = sorted(histories[ref], key=lambda x: x[0])
+        times[i, :len(history)] = [h[0] for h in history]
+        ratings[i, :len(history)] = [h[1] for h in history]
+        latest.append(history[-1][2])
+    return refs, ratings, times, lengths, latest
+
+
+def reschedule_user_cards(settings: dict, seed: int | None = None) -> list:
+    """
+    Recompute every reviewed card of a cached user under settings["scheduler"]
+    and apply the new cards and due dates to the cached Bible and review index.
+    Each verse's latest result gets the new card under "rescheduled", leaving the
+    card it was reviewed with as is. Returns those results (one per verse) so the
+    caller can persist them.
+    """
+    scheduler, bible = settings["scheduler"], settings["bible"]
+    refs, ratings, times, lengths, latest = collect_histories(settings["user_data"])
+    if not refs:
+        return []
+
+    cards = replay_cards(scheduler, ratings, times, lengths, seed=seed)
+
+    updated = []
+    for i, ref in enumerate(refs):
+        result = latest[i]
+        card_id = (result.get("card_dict") or {}).get("card_id") or i + 1
+        step = int(cards["step"][i])
+        card = Card(
+            card_id=int(card_id),
+            state=State(int(cards["state"][i])),
+            step=None if step < 0 else step,
+            stability=float(cards["stability"][i]),
+            difficulty=float(cards["difficulty"][i]),
+            due=_epoch_to_datetime(cards["due"][i]),
+            last_review=_epoch_to_datetime(cards["last_review"][i]),
+        )
+        result["rescheduled"] = {
+            "card_dict": card.to_dict(),
+            "due_str": card.due.isoformat(),
+            "interval_secs": (card.due - card.last_review).total_seconds(),
+        }
+        updated.append(result)
+        state = card_state(result)
+
+        book, chapter_verse = ref.rsplit(" ", 1)
+        chapter, _, verse = chapter_verse.partition(":")
+        try:
+            bible[book][chapter][verse]["user_data"] = state | {"card": card}
+        except KeyError:
+            continue
+        update_review_index(settings["review_index"], ref, state, card)
+
+    return updated
@@ -0,0 +1,97 @@
+import numpy as np
+from datetime import datetime
+from app.utils.bible import iter_user_data
+
+## Columns kept per reviewed verse; times are epoch seconds (NaN if unknown)
+COLUMNS = ["stability", "last_review", "due", "score", "timer", "distance"]
+SORT_KEYS = {"due", "score", "timer", "distance", "retrievability"}
+
+
+def _to_epoch(value) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _card_fields(card) -> tuple:
+    """(stability, last_review, due) from a Card object or its to_dict() form."""
+    if isinstance(card, dict):
+        return card.get("stability"), card.get("last_review"), card.get("due")
+    return card.stability, card.last_review, card.due
+
+
+def new_review_index(capacity: int = 64) -> dict:
+    return {
+        "refs": [],
+        "positions": {},
+        "size": 0,
+        **{col: np.full(capacity, np.nan) for col in COLUMNS},
+    }
+
+
+def update_review_index(index: dict, ref: str, verse_data: dict, card):
+    """
+    Insert or replace the row for a verse from its latest result and card.
+    """
+    pos = index["positions"].get(ref)
+    if pos is None:
+        pos = index["size"]
+        if pos == len(index["due"]):
+            for col in COLUMNS:
+                index[col] = np.concatenate([index[col], np.full(len(index[col]), np.nan)])
+        index["refs"].append(ref)
+        index["positions"][ref] = pos
+        index["size"] += 1
+
+    stability, last_review, due = _card_fields(card)
+    index["stability"][pos] = stability if stability else np.nan
+    index["last_review"][pos] = _to_epoch(last_review)
+    if "due_epoch" in verse_data:
+        index["due"][pos] = verse_data["due_epoch"]
+    else:
+        index["due"][pos] = _to_epoch(verse_data.get("due_str") or due)
+    index["score"][pos] = verse_data.get("score", 0)
+    index["timer"][pos] = verse_data.get("timer", 0)
+    index["distance"][pos] = verse_data.get("distance", 0)
+
+
+def build_review_index(bible: dict) -> dict:
+    """
+    Collect every reviewed verse's card and result into column arrays.
+    Runs once per cold load; /submit keeps it current with update_review_index.
+    """
+    index = new_review_index()
+    for book, chapter, verse, verse_data in iter_user_data(bible):
+        card = verse_data.get("card") or verse_data.get("card_dict")
+        if card:
+            update_review_index(index, f"{book} {chapter}:{verse}", verse_data, card)
+    return index
+
+
+def get_retrievability(index: dict, scheduler, now: datetime) -> np.ndarray:
+    """
+    Vectorized Scheduler.get_card_retrievability over every indexed card.
+    """
+    n = index["size"]
+    elapsed_days = np.maximum(0, np.floor((now.timestamp() - index["last_review"][:n]) / 86400))
+    retrievability = (1 + scheduler._FACTOR * elapsed_days / index["stability"][:n]) ** scheduler._DECAY
+    ## Cards without a review (or stability) have zero retrievability, as in fsrs
+    return np.nan_to_num(retrievability, nan=0.0)
+
+
+def get_review_page(index: dict, scheduler, now: datetime, sort: str = "due", descending: bool = False, page: int = 1, per_page: int | None = None):
+    """
+    Sort the indexed cards and return (positions, retrievability, total) for one page.
+    """
+    n = index["size"]
+    retrievability = get_retrievability(index, scheduler, now)
+    values = retrievability if sort == "retrievability" else index[sort if sort in SORT_KEYS else "due"][:n]
+
+    order = np.argsort(-values if descending else values, kind="stable")
+    if per_page:
+        start = (max(1, page) - 1) * per_page
+        order = order[start:start + per_page]
+
+    return order, retrievability, n
@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta
+from app.utils.tsk import parse_standard_ref
+from app.utils.bible import iter_user_data, decode_times
+
+## "Points in the last 30 days": results with timestamp >= now - RECENT_DAYS days
+RECENT_DAYS = 30
+
+
+def get_verse_stars(book: str, chapter: str, verse: str, verse_data: dict) -> int:
+    """
+    Stars stored with a result, or recomputed from its submitted reference for older records.
+    """
+    verse_stars = verse_data.get("stars", None)
+    if not verse_stars:
+        submitted_book, submitted_ch, submitted_v = parse_standard_ref(verse_data["submitted"])
+        verse_stars = int(
+            (book==submitted_book) +
+            (book==submitted_book and chapter==str(submitted_ch)) +
+            (book==submitted_book and chapter==str(submitted_ch) and verse==str(submitted_v))
+        )
+    return int(verse_stars)
+
+
+def get_day_key(timestamp: str) -> str:
+    """UTC day bucket ('YYYY-MM-DD') of an ISO timestamp written by /submit."""
+    return timestamp[:10]
+
+
+def build_user_stats(bible: dict, user_data: list) -> dict:
+    """
+    Build running aggregates from a freshly loaded Bible and result history.
+    Runs once per cold load; /submit keeps them current with update_user_stats.
+    """
+    stats = {
+        "verses_reviewed": 0,
+        "total_stars": 0,
+        "total_score": 0,
+        "total_points": 0,
+        "daily_points": {},
+        "daily_results": {},
+    }
+
+    ## Latest result per verse
+    for book, chapter, verse, verse_data in iter_user_data(bible):
+        if verse_data.get("score", -1) >= 0:
+            stats["verses_reviewed"] += 1
+            stats["total_score"] += verse_data["score"]
+            stats["total_stars"] += get_verse_stars(book, chapter, verse, verse_data)
+
+    ## Every result
+    for item in user_data:
+        add_points(stats, item)
+
+    return stats
+
+
+def add_points(stats: dict, item: dict):
+    """
+    Day totals serve the whole days inside the window; each day also keeps its
+    (epoch, score) pairs for the partial day where the window starts.
+    """
+    score = item.get("score", 0)
+    stats["total_points"] += score
+    if isinstance(item.get("timestamp"), str):
+        day = get_day_key(item["timestamp"])
+        stats["daily_points"][day] = stats["daily_points"].get(day, 0) + score
+        epoch = decode_times(item).get("timestamp_epoch")
+        if epoch is not None:
+            stats["daily_results"].setdefault(day, []).append((epoch, score))
+
+
+def update_user_stats(stats: dict, book: str, chapter: str, verse: str, result: dict, prev_verse_data: dict):
+    """
+    Apply a new /submit result in O(1), replacing the verse's previous result, if any.
+    """
+    if prev_verse_data.get("score", -1) >= 0:
+        stats["total_score"] -= prev_verse_data["score"]
+        stats["total_stars"] -= get_verse_stars(book, chapter, verse, prev_verse_data)
+    else:
+        stats["verses_reviewed"] += 1
+
+    stats["total_score"] += result["score"]
+    stats["total_stars"] += get_verse_stars(book, chapter, verse, result)
+    add_points(stats, result)
+
+
+def summarize_user_stats(stats: dict, now: datetime) -> dict:
+    since = now - timedelta(days=RECENT_DAYS)
+    since_day, since_epoch = since.strftime("%Y-%m-%d"), since.timestamp()
+    points_30days = sum(points for day, points in stats["daily_points"].items() if day > since_day)
+    points_30days += sum(
+        score for epoch, score in stats["daily_results"].get(since_day, []) if epoch >= since_epoch
+    )
+    return {
+        "date_time": now,
+        "verses_reviewed": stats["verses_reviewed"],
+        "total_stars": stats["total_stars"],
+        "total_score": stats["total_score"],
+        "total_points": stats["total_points"],
+        "points_30days": points_30days,
+    }
@@ -1,5 +1,6 @@
 import os
 from collections import defaultdict
+import app.utils.warmup as warmup
 
 TSK_PATH = os.path.join("data", "tskxref.txt")
 
@@ -25,12 +26,10 @@ TSK_BOOKS = {
 # book_key -> full name (for lookup by key)
 BOOK_KEY_TO_NAME = {i + 1: name for i, name in enumerate(TSK_BOOKS.values())}
 
-# (book_key, chapter, verse) -> list of (word, reference_list)
-TSK_LOOKUP = defaultdict(list)
-
-
 def load_tsk_data():
+    """Returns (book_key, chapter, verse) -> list of (word, reference_list)."""
     print("[DEUBG] Loading TSK data from file")
+    tsk_lookup = defaultdict(list)
     with open(TSK_PATH, "r", encoding="latin-1") as f:
         for line in f:
             parts = line.strip().split("\t")
@@ -38,10 +37,16 @@ def load_tsk_data():
                 continue  # Skip malformed lines
             book_key, chapter, verse, _, word, references = parts
             key = (int(book_key), int(chapter), int(verse))
-            TSK_LOOKUP[key].append((word.strip(), references.strip()))
+            tsk_lookup[key].append((word.strip(), references.strip()))
+    return tsk_lookup
+
+# Load once, lazily or during warmup
+warmup.register("tsk", load_tsk_data)
 
-# Load once at module import
-load_tsk_data()
+def __getattr__(name):
+    if name == "TSK_LOOKUP":
+        return warmup.get("tsk")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def parse_standard_ref(ref: str):
@@ -69,7 +74,7 @@ def get_tsk_for_ref(ref: str):
         return []
 
     results = []
-    entries = TSK_LOOKUP.get((book_key, chapter, verse), [])
+    entries = warmup.get("tsk").get((book_key, chapter, verse), [])
     for word, ref_str in entries:
         ref_list = []
         for ref in ref_str.split(";"):
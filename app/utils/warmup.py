@@ -0,0 +1,73 @@
+import time
+from threading import Lock, Thread
+from concurrent.futures import ThreadPoolExecutor
+
+## Lazily loaded, read-only datasets shared by the app (name -> loader)
+LOADERS = {}
+DATASETS = {}
+TIMINGS = {}
+_locks = {}
+
+## Warmup progress, reported by /ready
+STATE = {"started": None, "finished": None, "error": None}
+
+
+def register(name: str, loader):
+    """Register a loader for a dataset; nothing is loaded until get() or warmup()."""
+    LOADERS[name] = loader
+    _locks[name] = Lock()
+
+
+def get(name: str):
+    """Return a dataset, loading it on first use (thread-safe, loaded at most once)."""
+    if name in DATASETS:
+        return DATASETS[name]
+    with _locks[name]:
+        if name not in DATASETS:
+            start = time.perf_counter()
+            DATASETS[name] = LOADERS[name]()
+            TIMINGS[name] = time.perf_counter() - start
+            print(f"[DEBUG] Loaded {name} in {TIMINGS[name]:.3f}s")
+    return DATASETS[name]
+
+
+def provide(name: str, value):
+    """Install an already-built dataset (e.g. a shared corpus view) so it is never loaded."""
+    with _locks[name]:
+        DATASETS[name] = value
+        TIMINGS[name] = 0.0
+
+
+def warmup(max_workers: int | None = None):
+    """Load every registered dataset in parallel threads."""
+    STATE["started"] = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers or len(LOADERS) or 1) as pool:
+            list(pool.map(get, list(LOADERS)))
+    except Exception as e:
+        STATE["error"] = repr(e)
+        print(f"[ERROR] Warmup failed: {e}")
+    STATE["finished"] = time.perf_counter()
+    print(f"[DEBUG] Warmup finished: {get_startup_report()}")
+
+
+def start_warmup(max_workers: int | None = None) -> Thread:
+    """Run warmup in a background thread so the server can accept requests immediately."""
+    thread = Thread(target=warmup, kwargs={"max_workers": max_workers}, daemon=True, name="warmup")
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    return STATE["finished"] is not None and STATE["error"] is None
+
+
+def get_startup_report() -> dict:
+    started, finished = STATE["started"], STATE["finished"]
+    return {
+        "ready": is_ready(),
+        "error": STATE["error"],
+        "warmup_secs": round(finished - started, 3) if started and finished else None,
+        "datasets": {name: round(TIMINGS[name], 3) for name in LOADERS if name in TIMINGS},
+        "pending": [name for name in LOADERS if name not in DATASETS],
+    }
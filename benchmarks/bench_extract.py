@@ -0,0 +1,129 @@
+"""
+Throughput of the article extraction stage (cached HTML -> paragraph text).
+
+Times the original full html.parser parse, then the body-only parse with
+html.parser and lxml serially and lxml in a process pool, over the cached
+data/references/temp_url pages (or synthetic DG/GTY pages if there is no
+cache), and checks that every variant extracts identical text from each file.
+Run it on the real cache after a site redesign: a page whose body-only text
+differs from the full parse is listed, and the full parse (strained=False)
+is what the extractors should use for it.
+
+The synthetic pages include multi-class and nested DG bodies, which a plain
+class_ string strainer used to miss.
+
+Usage (from the repository root):
+    python benchmarks/bench_extract.py
+    python benchmarks/bench_extract.py --limit 500 --workers 8
+    python benchmarks/bench_extract.py --synthetic 400
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "data" / "references"))
+
+from bs4 import BeautifulSoup
+from get_resource_sentences import TEMP_URL_DIR, GTY_BODY, join_paragraphs, extract_paragraphs_from_dg, extract_paragraphs_from_gty
+
+SEED = 1234
+WORDS = "the grace of God in Christ Jesus our Lord see Romans 8:28 and John 3:16 faith hope love".split()
+
+
+def extractor_for(path: str):
+    return extract_paragraphs_from_dg if "desiringgod.org" in os.path.basename(path) else extract_paragraphs_from_gty
+
+
+def extract_text(job: tuple) -> str:
+    path, parser = job
+    return extractor_for(path)(path, parser)
+
+
+def extract_text_full_parse(path: str) -> str:
+    """The extractors as they were: the whole page through html.parser."""
+    with open(path, "r", encoding="utf-8") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    if extractor_for(path) is extract_paragraphs_from_dg:
+        body = soup.select_one("div.resource__body")
+    else:
+        body = soup.find(**GTY_BODY)
+    return join_paragraphs(body) if body else ""
+
+
+def make_synthetic_pages(directory: str, n: int, seed: int = SEED) -> list:
+    """Article pages shaped like the saved DG and GTY HTML."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n):
+        paragraphs = "".join(
+            f"<p>{' '.join(rng.choices(WORDS, k=30))} <em>{rng.choice(WORDS)}</em> "
+            f"<a href='#'>{rng.choice(WORDS)} {rng.randint(1, 20)}:{rng.randint(1, 30)}</a>—{' '.join(rng.choices(WORDS, k=10))}.</p>\n"
+            for _ in range(rng.randint(20, 60))
+        )
+        nav = "<nav>" + "".join(f"<a href='/{j}'>link {j}</a>" for j in range(200)) + "</nav>"
+        if i % 2:
+            name = f"www.desiringgod.org_articles_{i}.html"
+            classes = "resource__body resource__body--article" if i % 3 == 0 else "resource__body"
+            if i % 5 == 0:
+                paragraphs += f"<div class='resource__body'><p>{' '.join(rng.choices(WORDS, k=10))}</p></div><p>end</p>"
+            body = f"<div class='{classes}'>{paragraphs}</div>"
+        else:
+            name = f"www.gty.org_library_sermons-library_{i}.html"
+            body = f"<div data-swiftype-name='body' data-swiftype-type='text'>{paragraphs}</div>"
+        path = os.path.join(directory, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<html><head><title>{i}</title></head><body>{nav}<main>{body}</main></body></html>")
+        paths.append(path)
+    return paths
+
+
+def timed(label: str, fn, n_files: int):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.2f}s  {n_files / elapsed:8.1f} files/s")
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, help="Only the first N cached files")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic pages instead of the cache")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.synthetic or not os.path.isdir(TEMP_URL_DIR):
+            paths = make_synthetic_pages(tmp_dir, args.synthetic or 200)
+        else:
+            paths = sorted(str(path) for path in Path(TEMP_URL_DIR).glob("*.html"))[:args.limit]
+        print(f"[INFO] {len(paths)} files, {sum(os.path.getsize(p) for p in paths) / 1e6:.1f} MB")
+
+        baseline, base_secs = timed("html.parser, full page (serial)", lambda: [extract_text_full_parse(p) for p in paths], len(paths))
+        body_only, _ = timed("html.parser, body only (serial)", lambda: [extract_text((p, "html.parser")) for p in paths], len(paths))
+        fast, fast_secs = timed("lxml, body only (serial)", lambda: [extract_text((p, "lxml")) for p in paths], len(paths))
+        full_lxml, _ = timed("lxml, full page (serial)", lambda: [extractor_for(p)(p, "lxml", strained=False) for p in paths], len(paths))
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            pooled, pool_secs = timed(
+                f"lxml, body only ({args.workers} processes)",
+                lambda: list(pool.map(extract_text, [(p, "lxml") for p in paths], chunksize=16)),
+                len(paths),
+            )
+
+    mismatches = [p for p, *texts in zip(paths, baseline, body_only, fast, pooled, full_lxml) if len(set(texts)) > 1]
+    empty = sum(1 for text in baseline if not text)
+    print(f"[INFO] Speedup: {base_secs / fast_secs:.1f}x serial, {base_secs / pool_secs:.1f}x pooled")
+    print(f"[INFO] Identical output: {len(paths) - len(mismatches)}/{len(paths)} ({empty} without an article body)")
+    for path in mismatches[:10]:
+        print(f"[WARNING] Output differs: {path}")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Microbenchmarks for the scoring, selection and parsing hot paths.
+
+Each benchmark runs a fixed-seed workload against synthetic users for several
+rounds and records min/mean/median/stddev per call. Results are saved as JSON
+(one file per commit by default) and can be compared against a stored baseline.
+
+Timings depend on the machine and on the data files (translations, verse
+counts), so no baseline is committed. Record one with --save-baseline on the
+hardware and data you compare on, then compare your change against it there:
+    git checkout main && python benchmarks/bench_hot_paths.py --save-baseline
+    git checkout my-branch && python benchmarks/bench_hot_paths.py --compare benchmarks/results/baseline.json
+--compare exits 1 if any benchmark is slower than --threshold.
+
+Usage (from the repository root):
+    python benchmarks/bench_hot_paths.py                      # run and save to benchmarks/results/<commit>.json
+    python benchmarks/bench_hot_paths.py --save-baseline      # also store as benchmarks/results/baseline.json
+    python benchmarks/bench_hot_paths.py --compare benchmarks/results/baseline.json
+    python benchmarks/bench_hot_paths.py -k weight            # only benchmarks whose name contains "weight"
+    python benchmarks/bench_hot_paths.py --corpus /tmp/kyb-corpus.bin  # Bibles served from a shared corpus (app/serve.py)
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+from contextlib import redirect_stdout
+from datetime import datetime, timezone, timedelta
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+BASELINE_PATH = RESULTS_DIR / "baseline.json"
+
+SEED = 1234
+USER_SIZES = {"small": 50, "large": 2000}
+
+
+def setup_environment():
+    """Benchmarks never touch AWS or Google; the app only needs the settings to exist."""
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "bench")
+    os.environ.setdefault("GOOGLE_CLIENT_SECRET", "bench")
+
+
+def make_synthetic_user(main, n_reviews: int, seed: int = SEED) -> dict:
+    """
+    Build cached user state the way load_user_settings_from_db would, from
+    n_reviews synthetic results spread over the last 90 days.
+    """
+    from fsrs import Scheduler, Card
+    from app.utils.bible import get_bible_translation, get_bible
+
+    rng = random.Random(seed)
+    scheduler = Scheduler()
+    now = datetime.now(timezone.utc)
+    base_bible = get_bible()
+    all_refs = [(b, c, v) for b in base_bible for c in base_bible[b] for v in base_bible[b][c]]
+    user_id = f"bench-{n_reviews}@example.com"
+
+    user_data = []
+    for i, (book, chapter, verse) in enumerate(rng.sample(all_refs, min(n_reviews, len(all_refs)))):
+        reviewed_at = now - timedelta(days=rng.uniform(0, 90))
+        card = Card(card_id=i + 1, due=reviewed_at)
+        rating = rng.randint(1, 4)
+        card, _ = scheduler.review_card(card, rating, review_datetime=reviewed_at)
+        user_data.append({
+            "user_id": user_id,
+            "id": f"{i:08d}",
+            "timestamp": reviewed_at.isoformat(),
+            "reference": f"{book} {chapter}:{verse}",
+            "submitted": f"{book} {chapter}:{verse}",
+            "stars": rng.randint(0, 3),
+            "score": rng.randint(0, 100),
+            "distance": rng.randint(0, 500),
+            "timer": round(rng.uniform(2, 60), 3),
+            "rating": rating,
+            "card_dict": card.to_dict(),
+            "due_str": card.due.isoformat(),
+            "interval_secs": (card.due - card.last_review).total_seconds(),
+        })
+
+    bible = get_bible_translation(bool_counts=True, user_data=user_data)
+    settings = {
+        "settings": {"user_id": user_id, "translation": "esv", "selector": "random", "priority": "weighted"},
+        "bible": bible,
+        "eligible_references": main.get_eligible_references("esv", {"old", "new"}, set(), {}, None),
+        "user_data": user_data,
+        "scheduler": scheduler,
+    }
+    settings["stats"] = main.build_user_stats(bible, user_data)
+    settings["review_index"] = main.build_review_index(bible)
+    settings["forecast"] = main.build_forecast(settings["review_index"])
+    return settings
+
+
+def build_benchmarks(main) -> dict:
+    """name -> zero-argument callable; inputs are fixed so runs are comparable."""
+    from app.utils.tsk import get_tsk_for_ref
+    from app.utils.harmony import get_harmony_entries_for_verse
+    from app.utils.ordinals import get_ordinal_table, build_eligible_mask, compile_verse_selection
+    from data.references.get_resource_references import extract_references
+
+    users = {size: make_synthetic_user(main, n) for size, n in USER_SIZES.items()}
+    small = users["small"]
+    bible = small["bible"]
+    weighted = main.update_weights(bible, small["eligible_references"])
+    verse_ranges = compile_verse_selection("esv", "Romans 8:28-39; John 3:16; Ephesians 2:8-10")["ranges"]
+    sentence = "As Paul says in Romans 8:28-30 and again in Ephesians 1:3-14; 2:8-10, compare John 3:16."
+
+    benchmarks = {
+        "get_eligible_references[all]": lambda: main.get_eligible_references("esv", {"old", "new"}, set(), {}, None),
+        "get_eligible_references[books+chapters]": lambda: main.get_eligible_references(
+            "esv", set(), {"Psalms", "Proverbs"}, {"John": [1, 3, 17]}, None),
+        "get_eligible_references[verse_selection]": lambda: main.get_eligible_references(
+            "esv", {"new"}, set(), {}, verse_ranges),
+        "build_eligible_mask[uncached]": lambda: build_eligible_mask(
+            get_ordinal_table(), {"new"}, {"Psalms"}, {"John": [1, 3, 17]}, None),
+        "compile_verse_selection": lambda: compile_verse_selection(
+            "esv", "Romans 8:28-39; John 3:16; Ephesians 1:3-14; 2:8-10"),
+        "weighted_sample": lambda: main.weighted_sample(weighted),
+        "match_book_name": lambda: main.match_book_name(bible, "first cor"),
+        "parse_natural_reference[colon]": lambda: main.parse_natural_reference(bible, "1 corinthians 13:4"),
+        "parse_natural_reference[verbose]": lambda: main.parse_natural_reference(bible, "First John one verse nine"),
+        "calculate_score[near]": lambda: main.calculate_score(bible, "Romans", "8", "28", "Romans", "8", "30", 12.5),
+        "calculate_score[far]": lambda: main.calculate_score(bible, "Genesis", "1", "1", "Revelation", "22", "21", 12.5),
+        "get_surrounding_verses": lambda: main.get_surrounding_verses(bible, "John", "3", "16"),
+        "extract_references": lambda: extract_references(sentence),
+        "get_tsk_for_ref": lambda: get_tsk_for_ref("John 3:16"),
+        "get_harmony_entries_for_verse": lambda: get_harmony_entries_for_verse("Matthew 5:15"),
+    }
+    for size, settings in users.items():
+        benchmarks[f"update_weights[{size}]"] = lambda s=settings: main.update_weights(s["bible"], s["eligible_references"])
+        benchmarks[f"get_random_reference[{size}]"] = lambda s=settings: main.get_random_reference(s)
+        benchmarks[f"get_user_stats[{size}]"] = lambda s=settings: main.get_user_stats(s)
+        benchmarks[f"reschedule_user_cards[{size}]"] = lambda s=settings: main.reschedule_user_cards(s, seed=SEED)
+        benchmarks[f"get_review_data[{size}]"] = lambda s=settings: main.get_review_data(s, per_page=main.REVIEW_PAGE_SIZE)
+    return benchmarks
+
+
+def run_benchmark(fn, rounds: int, min_round_secs: float) -> dict:
+    """Calibrate calls per round so each round takes at least min_round_secs."""
+    fn()  # Warm up caches
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_round_secs or iterations >= 1_000_000:
+            break
+        iterations *= 10 if elapsed < min_round_secs / 10 else 2
+
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - start) / iterations)
+
+    return {
+        "rounds": rounds,
+        "iterations": iterations,
+        "min": min(per_call),
+        "max": max(per_call),
+        "mean": statistics.fmean(per_call),
+        "median": statistics.median(per_call),
+        "stddev": statistics.stdev(per_call) if rounds > 1 else 0.0,
+        "ops": 1 / statistics.fmean(per_call),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).resolve().parents[1], text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print median change per benchmark; returns names slower than the threshold."""
+    regressions = []
+    print(f"\nComparison against baseline {baseline.get('commit', '?')} (median per call)")
+    print("-" * 86)
+    print(f"{'Benchmark':<46}{'Baseline':>12}{'Current':>12}{'Change':>10}")
+    for name, stats in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name)
+        if not base:
+            print(f"{name:<46}{'-':>12}{format_secs(stats['median']):>12}{'new':>10}")
+            continue
+        change = stats["median"] / base["median"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<46}{format_secs(base['median']):>12}{format_secs(stats['median']):>12}{change:>+10.1%}{flag}")
+    print("-" * 86)
+    return regressions
+
+
+def format_secs(secs: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if secs >= scale:
+            return f"{secs / scale:.2f}{unit}"
+    return f"{secs / 1e-9:.0f}ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="keyword", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--min-round-secs", type=float, default=0.05)
+    parser.add_argument("--output", type=Path, help="Results JSON (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative slowdown reported as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help=f"Also save results to {BASELINE_PATH}")
+    parser.add_argument("--corpus", type=Path, help="Build this shared corpus file and attach it, as under app/serve.py")
+    args = parser.parse_args()
+
+    setup_environment()
+    random.seed(SEED)
+
+    ## Keep the app's debug output out of the timings
+    with redirect_stdout(open(os.devnull, "w")):
+        import app.main as app_main
+        app_main.DEBUG_MODE = False
+        if args.corpus:
+            app_main.corpus.attach_shared_corpus(app_main.corpus.build_corpus(args.corpus))
+        benchmarks = build_benchmarks(app_main)
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "seed": SEED,
+        "corpus": bool(args.corpus),
+        "benchmarks": {},
+    }
+    for name, fn in benchmarks.items():
+        if args.keyword and args.keyword not in name:
+            continue
+        random.seed(SEED)
+        with redirect_stdout(open(os.devnull, "w")):
+            stats = run_benchmark(fn, args.rounds, args.min_round_secs)
+        results["benchmarks"][name] = stats
+        print(f"{name:<46}{format_secs(stats['median']):>12}  (±{format_secs(stats['stddev'])}, {stats['iterations']} x {stats['rounds']})")
+
+    output = args.output or RESULTS_DIR / f"{results['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    for path in [output] + ([BASELINE_PATH] if args.save_baseline else []):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"[INFO] Wrote results to {path}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"[WARN] {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+End-to-end load test for app.main:app with no network access.
+
+Simulates N concurrent logged-in users going through
+/review -> /submit -> /continue (and periodically /settings) against an
+in-process DynamoDB stand-in (moto) and a stubbed Google login, then reports
+throughput, p50/p95/p99 latency per route and cache hit rates.
+
+Usage (from the repository root; requires `pip install moto`):
+    python benchmarks/loadtest.py --users 20 --iterations 25
+    python benchmarks/loadtest.py --users 50 --output loadtest.json
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+RESULTS_TABLE = "know-your-bible-results"
+SETTINGS_TABLE = "know-your-bible-settings"
+REGION = "us-east-1"
+
+HIDDEN_FIELD = re.compile(r'<input type="hidden" name="(\w+)"[^>]*value="([^"]*)"')
+
+
+def setup_environment():
+    """Fake credentials so neither boto3 nor OAuth can reach the network."""
+    os.environ.setdefault("AWS_REGION", REGION)
+    os.environ.setdefault("AWS_DEFAULT_REGION", REGION)
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "loadtest")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "loadtest")
+    os.environ.setdefault("GOOGLE_CLIENT_ID", "loadtest")
+    os.environ.setdefault("GOOGLE_CLIENT_SECRET", "loadtest")
+
+
+def start_local_dynamodb():
+    """Start moto's in-process DynamoDB and create the app's tables."""
+    try:
+        from moto import mock_aws
+    except ImportError:
+        sys.exit("[ERROR] moto is required for the load test: pip install moto")
+    import boto3
+
+    mock = mock_aws()
+    mock.start()
+
+    dynamodb = boto3.resource("dynamodb", region_name=os.environ["AWS_REGION"])
+    dynamodb.create_table(
+        TableName=RESULTS_TABLE,
+        KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"}, {"AttributeName": "id", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"}, {"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName=SETTINGS_TABLE,
+        KeySchema=[{"AttributeName": "user_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "user_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    return mock
+
+
+def stub_oauth(main):
+    """Replace the Google round trip: /auth logs in whoever is named in ?email=."""
+    async def authorize_access_token(request):
+        return {"email": request.query_params.get("email")}
+
+    async def parse_id_token(request, token):
+        return {"email": token["email"]}
+
+    main.oauth.google.authorize_access_token = authorize_access_token
+    main.oauth.google.parse_id_token = parse_id_token
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    idx = min(len(values) - 1, max(0, round(q / 100 * (len(values) - 1))))
+    return values[idx]
+
+
+async def run_user(client_factory, user_idx, args, latencies, rng):
+    email = f"loadtest-{user_idx}@example.com"
+
+    async with client_factory() as client:
+        async def timed(route, method, url, **kwargs):
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.setdefault(route, []).append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {url} returned {response.status_code}")
+            return response
+
+        await timed("/auth", "GET", f"/auth?email={email}")
+        client.cookies.set("user_id", email)
+
+        for iteration in range(args.iterations):
+            response = await timed("/review", "GET", "/review")
+            fields = dict(HIDDEN_FIELD.findall(response.text))
+
+            ## Guess the right verse half the time, otherwise a nearby one
+            if rng.random() < 0.5:
+                submitted = fields["actual_ref"]
+            else:
+                submitted = f"{fields['book']} {fields['chapter']}:1"
+
+            await timed("/submit", "POST", "/submit", data={
+                "submitted_ref": submitted,
+                "actual_ref": fields["actual_ref"],
+                "book": fields["book"],
+                "chapter": fields["chapter"],
+                "verse": fields["verse"],
+                "timer": f"{rng.uniform(2, 30):.2f}",
+            })
+            await timed("/continue", "POST", "/continue")
+
+            if args.settings_every and (iteration + 1) % args.settings_every == 0:
+                await timed("/settings", "GET", "/settings")
+                await timed("/review_data", "GET", "/review_data")
+
+
+async def run_load(main, args):
+    import httpx
+
+    transport = httpx.ASGITransport(app=main.app)
+    client_factory = lambda: httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+
+    latencies = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_user(client_factory, i, args, latencies, random.Random(args.seed + i))
+        for i in range(args.users)
+    ])
+    return latencies, time.perf_counter() - start
+
+
+def build_report(main, latencies, elapsed, args) -> dict:
+    phase_counts = {
+        dict(labels).get("phase"): hist["count"]
+        for (name, labels), hist in main.metrics.HISTOGRAMS.items()
+        if name == "kyb_phase_duration_seconds"
+    }
+    lookups = phase_counts.get("cache_lookup", 0)
+    loads = phase_counts.get("dynamodb_load", 0)
+
+    total_requests = sum(len(v) for v in latencies.values())
+    return {
+        "users": args.users,
+        "iterations": args.iterations,
+        "elapsed_secs": round(elapsed, 3),
+        "requests": total_requests,
+        "throughput_rps": round(total_requests / elapsed, 2) if elapsed else 0.0,
+        "routes": {
+            route: {
+                "requests": len(values),
+                "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for route, values in sorted(latencies.items())
+        },
+        "user_cache_hit_rate": round(1 - loads / lookups, 4) if lookups else 0.0,
+        "verse_cache": main.cache.get_verse_cache_stats(),
+        "startup": main.warmup.get_startup_report(),
+    }
+
+
+def print_report(report: dict):
+    print(f"\nUsers: {report['users']}  Iterations: {report['iterations']}  "
+          f"Requests: {report['requests']}  Elapsed: {report['elapsed_secs']}s  "
+          f"Throughput: {report['throughput_rps']} req/s")
+    print("-" * 72)
+    print(f"{'Route':<16}{'Requests':>10}{'req/s':>10}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for route, stats in report["routes"].items():
+        print(f"{route:<16}{stats['requests']:>10}{stats['rps']:>10}{stats['p50_ms']:>12}{stats['p95_ms']:>12}{stats['p99_ms']:>12}")
+    print("-" * 72)
+    print(f"User cache hit rate:  {report['user_cache_hit_rate']:.2%}")
+    print(f"Verse cache hit rate: {report['verse_cache']['hit_rate']:.2%}")
+    print(f"Warmup: {report['startup']['warmup_secs']}s {report['startup']['datasets']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=20, help="Review cycles per user")
+    parser.add_argument("--settings-every", type=int, default=10, help="Visit /settings every N cycles (0 to disable)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's debug output")
+    args = parser.parse_args()
+
+    setup_environment()
+    mock = start_local_dynamodb()
+    try:
+        import app.main as app_main
+        app_main.DEBUG_MODE = args.verbose
+        stub_oauth(app_main)
+        app_main.warmup.warmup()
+
+        latencies, elapsed = asyncio.run(run_load(app_main, args))
+        report = build_report(app_main, latencies, elapsed, args)
+    finally:
+        mock.stop()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[INFO] Wrote report to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
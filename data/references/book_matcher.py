@@ -0,0 +1,124 @@
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.utils.bible import OT_BOOKS, NT_BOOKS
+
+## Finds every Bible book name (and common abbreviation) in a string in one pass.
+## Uses an Aho-Corasick automaton when pyahocorasick is installed, otherwise a
+## single precompiled regex; both return the same matches.
+
+## Abbreviations people write in articles. Matched case-sensitively (so "Am",
+## "Job" and "Mark" as ordinary words are not books unless written as names);
+## each is also accepted with a trailing period.
+BOOK_ALIASES = {
+    "Genesis": ["Gen", "Gn"], "Exodus": ["Exod", "Ex"], "Leviticus": ["Lev"], "Numbers": ["Num"],
+    "Deuteronomy": ["Deut", "Dt"], "Joshua": ["Josh"], "Judges": ["Judg"], "Ruth": [],
+    "1 Samuel": ["1 Sam"], "2 Samuel": ["2 Sam"], "1 Kings": ["1 Kgs", "1 Kin"], "2 Kings": ["2 Kgs", "2 Kin"],
+    "1 Chronicles": ["1 Chron", "1 Chr"], "2 Chronicles": ["2 Chron", "2 Chr"], "Ezra": [], "Nehemiah": ["Neh"],
+    "Esther": ["Esth"], "Job": [], "Psalms": ["Psalm", "Pss", "Psa", "Ps"], "Proverbs": ["Prov", "Prv"],
+    "Ecclesiastes": ["Eccles", "Eccl", "Qoh"], "Song of Solomon": ["Song of Songs", "Song", "Cant"],
+    "Isaiah": ["Isa"], "Jeremiah": ["Jer"], "Lamentations": ["Lam"], "Ezekiel": ["Ezek"], "Daniel": ["Dan"],
+    "Hosea": ["Hos"], "Joel": [], "Amos": [], "Obadiah": ["Obad"], "Jonah": ["Jon"], "Micah": ["Mic"],
+    "Nahum": ["Nah"], "Habakkuk": ["Hab"], "Zephaniah": ["Zeph"], "Haggai": ["Hag"], "Zechariah": ["Zech"],
+    "Malachi": ["Mal"], "Matthew": ["Matt", "Mt"], "Mark": ["Mk"], "Luke": ["Lk"], "John": ["Jn"],
+    "Acts": [], "Romans": ["Rom"], "1 Corinthians": ["1 Cor"], "2 Corinthians": ["2 Cor"], "Galatians": ["Gal"],
+    "Ephesians": ["Eph"], "Philippians": ["Phil"], "Colossians": ["Col"], "1 Thessalonians": ["1 Thess", "1 Thes"],
+    "2 Thessalonians": ["2 Thess", "2 Thes"], "1 Timothy": ["1 Tim"], "2 Timothy": ["2 Tim"], "Titus": ["Tit"],
+    "Philemon": ["Philem", "Phlm"], "Hebrews": ["Heb"], "James": ["Jas"], "1 Peter": ["1 Pet"], "2 Peter": ["2 Pet"],
+    "1 John": ["1 Jn"], "2 John": ["2 Jn"], "3 John": ["3 Jn"], "Jude": [], "Revelation": ["Rev"],
+}
+
+
+def build_keys() -> dict:
+    """Lowercased pattern -> (book, exact spelling required, or None for any case)."""
+    keys = {book.lower(): (book, None) for book in OT_BOOKS + NT_BOOKS}
+    for book, aliases in BOOK_ALIASES.items():
+        for alias in aliases:
+            for spelling in (alias, f"{alias}."):
+                keys.setdefault(spelling.lower(), (book, spelling))
+    return keys
+
+
+BOOK_KEYS = build_keys()
+
+try:
+    import ahocorasick
+
+    _automaton = ahocorasick.Automaton()
+    for _key in BOOK_KEYS:
+        _automaton.add_word(_key, _key)
+    _automaton.make_automaton()
+except ImportError:
+    import re
+
+    _automaton = None
+    ## Zero-width, so every start position reports its longest key
+    _key_regex = re.compile(
+        "(?=(" + "|".join(re.escape(key) for key in sorted(BOOK_KEYS, key=len, reverse=True)) + "))"
+    )
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+def _longest_keys(lowered: str) -> dict:
+    """Start position -> longest key found there."""
+    if _automaton is not None:
+        longest = {}
+        for end, key in _automaton.iter(lowered):
+            start = end - len(key) + 1
+            if len(key) > len(longest.get(start, "")):
+                longest[start] = key
+        return longest
+    return {m.start(): m.group(1) for m in _key_regex.finditer(lowered)}
+
+
+def _lowered(text: str) -> str:
+    lowered = text.lower()
+    if len(lowered) != len(text):
+        ## Lowercasing changed some character's length; positions would drift
+        lowered = "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    return lowered
+
+
+def _accepts(text: str, start: int, key: str, ignore_case: bool) -> bool:
+    """Word-bounded, and spelled as required for this key."""
+    end = start + len(key)
+    if start > 0 and _is_word_char(text[start - 1]):
+        return False
+    if end < len(text) and text[end].isalpha():
+        return False
+    book, spelling = BOOK_KEYS[key]
+    exact = spelling if spelling is not None else (None if ignore_case else book)
+    return exact is None or text[start:end] == exact
+
+
+def find_books(text: str, ignore_case: bool = False, overlapping: bool = False) -> list:
+    """
+    (start, end, book) for every book name or alias in text, left to right;
+    the longest one at each start, and only non-overlapping ones unless
+    overlapping (e.g. "John" inside "1 John"). Matches must start at a word
+    boundary and must not run into a following letter. With ignore_case, full
+    names match in any case (as in extract_references); aliases always need
+    their exact spelling.
+    """
+    matches = []
+    last_end = 0
+    for start, key in sorted(_longest_keys(_lowered(text)).items()):
+        if start < last_end and not overlapping:
+            continue
+        if not _accepts(text, start, key, ignore_case):
+            continue
+        matches.append((start, start + len(key), BOOK_KEYS[key][0]))
+        last_end = start + len(key)
+    return matches
+
+
+def contains_book(text: str) -> bool:
+    """Whether any book name or alias appears (case-sensitively); stops at the first."""
+    lowered = _lowered(text)
+    if _automaton is not None:
+        return any(_accepts(text, end - len(key) + 1, key, False) for end, key in _automaton.iter(lowered))
+    return any(_accepts(text, m.start(), m.group(1), False) for m in _key_regex.finditer(lowered))
@@ -1,15 +1,24 @@
 import re
 import sys
-import json
+import time
+import hashlib
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 from difflib import get_close_matches
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append(str(Path(__file__).resolve().parents[2]))
-from data.references.example_cases import example_cases
-from app.utils.bible import BIBLE
+from app.utils.bible import get_bible, OT_BOOKS, NT_BOOKS
+from data.references.book_matcher import find_books
 
-BIBLE_BOOKS = set(BIBLE.keys())
+## Book names are constants; the Bible itself is loaded on first parse
+BIBLE_BOOKS = set(OT_BOOKS + NT_BOOKS)
+
+## Chapter/verse list that must follow a book name (e.g. " 3:16-18; 4:2"), compiled once
+REF_TAIL = re.compile(
+    r'\s+((?:\d+(?::\d+)?(?:[-–]\d+(?::\d+)?)?[a-zA-Z]?'
+    r'(?:\s*[;,]\s*\d+(?::\d+)?(?:[-–]\d+(?::\d+)?)?[a-zA-Z]?)*))'
+)
 
 ## Default replacement corrections
 replacements = {
@@ -54,6 +63,7 @@ def get_book_and_rest(match: str) -> Tuple[str, str]:
     return '', match  # Shouldn't happen if regex is good
 
 def parse_verse_range(book: str, ref: str) -> List[str]:
+    bible = get_bible()
     result = []
     parts = [s.strip() for s in re.split(r'[;,]', ref)]
     last_chapter = None
@@ -87,7 +97,7 @@ def parse_verse_range(book: str, ref: str) -> List[str]:
             ## Skip if backward range
             if (start_chap_i > end_chap_i) or (start_chap_i == end_chap_i and start_verse_i > end_verse_i):
                 print(f"[WARN] backward range {start_str}-{end_str} in {book} {ref}. Using only {start_str}.")
-                if str(start_chap) in BIBLE[book] and str(start_verse) in BIBLE[book][str(start_chap)]:
+                if str(start_chap) in bible[book] and str(start_verse) in bible[book][str(start_chap)]:
                     result.append(f"{book} {start_chap}:{start_verse}")
                 continue
 
@@ -95,14 +105,14 @@ def parse_verse_range(book: str, ref: str) -> List[str]:
                 verse_start = start_verse_i if chap == start_chap_i else 1
                 try:
                     verse_end = (
-                        end_verse_i if chap == end_chap_i else max(map(int, BIBLE[book][str(chap)].keys()))
+                        end_verse_i if chap == end_chap_i else max(map(int, bible[book][str(chap)].keys()))
                     )
                 except KeyError:
                     print(f"[WARN] {book} {chap} not found in BIBLE")
                     continue
 
                 for v in range(verse_start, verse_end + 1):
-                    if str(chap) in BIBLE[book] and str(v) in BIBLE[book][str(chap)]:
+                    if str(chap) in bible[book] and str(v) in bible[book][str(chap)]:
                         result.append(f"{book} {chap}:{v}")
                     else:
                         if chap not in [None, "None"] and v not in [None, "None"]:
@@ -111,7 +121,7 @@ def parse_verse_range(book: str, ref: str) -> List[str]:
         else:
             chap, verse, suffix = parse_chapter_verse(part, last_chapter, book)
             try:
-                if str(chap) in BIBLE[book] and str(verse) in BIBLE[book][str(chap)]:
+                if str(chap) in bible[book] and str(verse) in bible[book][str(chap)]:
                     result.append(f"{book} {chap}:{verse}{suffix}")
                 else:
                     if chap not in [None, "None"] and verse not in [None, "None"]:
@@ -128,11 +138,12 @@ def parse_chapter_verse(ref: str, fallback_chapter=None, book=None) -> Tuple[str
     Separates verse number from trailing letters like '26a' -> ('26', 'a').
     Returns (chapter, verse_number), suffix separately if needed.
     """
+    bible = get_bible()
     if ':' in ref:
         chapter, verse = ref.split(':', 1)
     else:
         ## Single-chapter book fallback
-        if book and len(BIBLE[book]) == 1:
+        if book and len(bible[book]) == 1:
             chapter = '1'
             verse = ref
         else:
@@ -154,24 +165,28 @@ def extract_references(sentence: str) -> List[Dict[str, Any]]:
     # print(f"[INFO] parsing sentence: {sentence}")
 
     sentence = apply_replacements(sentence)
-    book_pattern = '|'.join(sorted(BIBLE_BOOKS, key=lambda x: -len(x)))
-    regex = re.compile(
-        rf'\b({book_pattern})\s+'
-        r'((?:\d+(?::\d+)?(?:[-–]\d+(?::\d+)?)?[a-zA-Z]?'
-        r'(?:\s*[;,]\s*\d+(?::\d+)?(?:[-–]\d+(?::\d+)?)?[a-zA-Z]?)*))',
-        re.IGNORECASE
-    )
 
+    ## Only try the chapter/verse pattern right after a book name (or alias)
     references = []
-    for match in regex.finditer(sentence):
-        book, ref_str = match.groups()
-        book = normalize_book_name(book.strip())
+    last_end = 0
+    for start, end, book in find_books(sentence, ignore_case=True, overlapping=True):
+        if start < last_end:
+            continue
+        match = REF_TAIL.match(sentence, end)
+        if not match:
+            continue
+        ref_str = match.group(1)
 
         ## Fix edge case: remove letters accidentally attached to numbers
         clean_ref_str = re.sub(r'([0-9]+)[a-zA-Z]', r'\1', ref_str)
 
         full_reference = f"{book} {clean_ref_str}".strip()
         verse_list = parse_verse_range(book, clean_ref_str)
+
+        ## A full book name consumes its numbers even if they aren't verses; an
+        ## abbreviation only does if they are (e.g. "Phil 1 Timothy 2:3")
+        if verse_list or sentence[start:end].lower() == book.lower():
+            last_end = match.end()
         if not verse_list:
             continue
 
@@ -220,72 +235,77 @@ def sort_and_compress_references(references):
     compressed_references = references
     return compressed_references
 
-def update_references_from_sentences(input_path: str):
-    with open(input_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+def sentence_key(sentence: str) -> bytes:
+    return hashlib.blake2b(sentence.encode("utf-8"), digest_size=16).digest()
 
-    for url, entry in data.items():
-        all_refs = []
-        for sentence in entry.get("sentences", []) or []:
-            refs = extract_references(sentence)
-            all_refs.extend(refs)
+def extract_references_batch(sentences: List[str]) -> List[List[Dict[str, Any]]]:
+    return [extract_references(sentence) for sentence in sentences]
 
-        entry["references"] = all_refs  # Overwrite or add references key
+def parse_unique_sentences(sentences: Dict[bytes, str], workers=None, chunk_size: int = 200) -> Dict[bytes, List[Dict[str, Any]]]:
+    """References for each distinct sentence, across a process pool (or in this process with workers=1)."""
+    keys = list(sentences)
+    chunks = [[sentences[key] for key in keys[i:i + chunk_size]] for i in range(0, len(keys), chunk_size)]
+    if workers == 1:
+        results = map(extract_references_batch, chunks)
+        return dict(zip(keys, (refs for chunk in results for refs in chunk)))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(extract_references_batch, chunks)
+        return dict(zip(keys, (refs for chunk in results for refs in chunk)))
 
-    with open(input_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-
-    print(f"✅ Updated references in {input_path}")
-
-def compile_verse_counts(input_path: Path, output_path: Path):
-    print(f"[INFO] Compiling nested verse_counts.json by book > chapter > verse...")
-
-    with input_path.open("r", encoding="utf-8") as f:
-        data = json.load(f)
+def update_references_from_sentences(store, workers=None):
+    """
+    Parse every resource's sentences into references. Sentences repeat across
+    articles (quoted verses, boilerplate), so each distinct one is parsed once
+    and its references reused; the result is the same as parsing each in turn.
+    Only resources whose references changed are written back.
+    """
+    start = time.perf_counter()
+
+    ## Resource -> its sentences' keys, and each distinct sentence once
+    plan = []
+    unique = {}
+    total = 0
+    for url, entry in store.items():
+        keys = []
+        for sentence in entry.get("sentences", []) or []:
+            key = sentence_key(sentence)
+            unique.setdefault(key, sentence)
+            keys.append(key)
+        plan.append((url, keys, entry.get("references")))
+        total += len(keys)
 
-    verse_counts = {}
+    parsed = parse_unique_sentences(unique, workers=workers)
 
-    for url, entry in data.items():
-        author = entry.get("author", "Unknown")
-        references = entry.get("references")
+    references = {}
+    for url, keys, previous in plan:
+        all_refs = []
+        for key in keys:
+            all_refs.extend(parsed[key])
 
-        if not isinstance(references, list):
-            continue
+        ## The store appends every write, so leave unchanged resources alone
+        if all_refs != previous:
+            references[url] = {"references": all_refs}  # Overwrite or add references key
 
-        for ref_obj in references:
-            for verse in ref_obj.get("verses", []):
-                try:
-                    ## Expect format: "Book Chapter:Verse"
-                    book_part, verse_part = verse.rsplit(" ", 1)
-                    chapter, verse_num = verse_part.split(":")
-                    book = book_part.strip()
-                    chapter = chapter.strip()
-                    verse_num = verse_num.strip()
-                except ValueError:
-                    print(f"[WARN] Skipping malformed verse: {verse}")
-                    continue
+    store.upsert_many(references)
 
-                ## Initialize nested structure
-                if book not in verse_counts:
-                    verse_counts[book] = {}
-                if chapter not in verse_counts[book]:
-                    verse_counts[book][chapter] = {}
-                if verse_num not in verse_counts[book][chapter]:
-                    verse_counts[book][chapter][verse_num] = {}
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] Parsed {len(unique)} distinct of {total} sentences "
+          f"({1 - len(unique) / total if total else 0:.1%} cache hits) in {elapsed:.1f}s "
+          f"({total / elapsed if elapsed else 0:.0f} sentences/s)")
+    print(f"✅ Updated references for {len(references)} of {len(plan)} resources in {store.path}")
 
-                ## Count per author
-                verse_entry = verse_counts[book][chapter][verse_num]
-                verse_entry[author] = verse_entry.get(author, 0) + 1
+def compile_verse_counts(store, output_path: Path, full: bool = False, workers=None):
+    """
+    Nested verse_counts.json by book > chapter > verse, updated from only the
+    resources that changed since the last run (see verse_counter).
+    """
+    from data.references.verse_counter import update_verse_counts
 
-    ## Add total count per verse
-    for book_data in verse_counts.values():
-        for chapter_data in book_data.values():
-            for verse_data in chapter_data.values():
-                total = sum(count for k, count in verse_data.items() if k != "count")
-                verse_data["count"] = total
+    print(f"[INFO] Compiling nested verse_counts.json by book > chapter > verse...")
 
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(verse_counts, f, indent=2)
+    verse_counts = update_verse_counts(store, output_path, full=full, workers=workers)
+    if verse_counts is None:
+        return
 
     print(f"[INFO] Wrote nested verse usage counts to {output_path}")
     print(f"[INFO] Total books: {len(verse_counts)}")
@@ -293,11 +313,20 @@ def compile_verse_counts(input_path: Path, output_path: Path):
 
 ## Run tests first
 if __name__ == "__main__":
+    import argparse
+    from data.references.example_cases import example_cases
+    from data.references.resource_store import ResourceStore
+
+    parser = argparse.ArgumentParser(description="Parse references from resource sentences and compile verse counts.")
+    parser.add_argument("--full", action="store_true", help="Recount every resource instead of only changed ones")
+    parser.add_argument("--workers", type=int, help="Processes for parsing sentences and for a full recount (default: one per CPU)")
+    args = parser.parse_args()
+
     test_cases(example_cases)  # This will raise AssertionError if a test fails
 
     ## If all tests passed
-    resources_path = Path("data/references/resources.json")
-    update_references_from_sentences(resources_path)
+    with ResourceStore() as store:
+        update_references_from_sentences(store, workers=args.workers)
 
-    verse_counts_path = Path("data/references/verse_counts.json")
-    compile_verse_counts(resources_path, verse_counts_path)
+        verse_counts_path = Path("data/references/verse_counts.json")
+        compile_verse_counts(store, verse_counts_path, full=args.full, workers=args.workers)
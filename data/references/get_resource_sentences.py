@@ -1,27 +1,39 @@
 import os
 import sys
-import json
 import re
 import nltk
+import time
+import asyncio
+import argparse
+import importlib.util
 import multiprocessing
 from pathlib import Path
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urlparse
 from playwright.sync_api import sync_playwright
-from get_resource_urls import url_to_filename
 
-## Adjust path to import BIBLE
+## Adjust path to import the other pipeline modules
 sys.path.append(str(Path(__file__).resolve().parents[2]))
-from app.utils.bible import BIBLE
+from data.references.book_matcher import contains_book
+from data.references.resource_store import ResourceStore
+from data.references.get_resource_urls import url_to_filename, fetch_pages, SCRAPE_CONTEXTS, SCRAPE_PER_DOMAIN, SCRAPE_RETRIES
 
-## Setup
-nltk.download("punkt", quiet=True)
+## Setup (once, not again in every extraction worker)
+if multiprocessing.parent_process() is None:
+    nltk.download("punkt", quiet=True)
 from nltk.tokenize import sent_tokenize
 
 ## Constants
-BIBLE_BOOKS = set(BIBLE.keys())
 TEMP_URL_DIR = 'data/references/temp_url'
-RESOURCE_JSON = 'data/references/resources.json'
+
+## Article bodies; only these subtrees are built, not the page chrome around them.
+## lxml builds the same tree as html.parser from saved (browser-serialized) pages, faster.
+HTML_PARSER = "lxml" if importlib.util.find_spec("lxml") else "html.parser"
+## A plain class_ string only matches the whole attribute, missing e.g. class="resource__body x"
+DG_BODY = {"name": "div", "class_": lambda c: c is not None and "resource__body" in c.split()}
+GTY_BODY = {"name": "div", "attrs": {"data-swiftype-name": "body", "data-swiftype-type": "text"}}
+EXTRACT_CHUNKSIZE = 16  # Articles per task sent to an extraction worker
 
 os.makedirs(TEMP_URL_DIR, exist_ok=True)
 
@@ -30,7 +42,14 @@ def ensure_dirs():
     os.makedirs(TEMP_URL_DIR, exist_ok=True)
 
 def contains_bible_book(sentence: str) -> bool:
-    return any(book in sentence for book in BIBLE_BOOKS)
+    """Whether a book name or abbreviation appears as a word (one automaton pass)."""
+    return contains_book(sentence)
+
+def article_html_path(url: str) -> str:
+    return os.path.join(TEMP_URL_DIR, f"{url_to_filename(url)}.html")
+
+def is_skipped_resource(url: str) -> bool:
+    return "www.desiringgod.org/labs" in url or "www.desiringgod.org/light-and-truth" in url
 
 
 def download_and_save_article(url: str, domain: str) -> str:
@@ -39,7 +58,7 @@ def download_and_save_article(url: str, domain: str) -> str:
     - DG requires headful mode
     - GTY uses networkidle wait in headless
     """
-    html_path = os.path.join(TEMP_URL_DIR, f"{url_to_filename(url)}.html")
+    html_path = article_html_path(url)
 
     if os.path.exists(html_path):
         print(f"[DEBUG] Using cached file {html_path}")
@@ -62,20 +81,32 @@ def download_and_save_article(url: str, domain: str) -> str:
 
     return html_path
 
+def download_articles(urls, contexts=SCRAPE_CONTEXTS, per_domain=SCRAPE_PER_DOMAIN, retries=SCRAPE_RETRIES) -> dict:
+    """
+    Download every uncached article concurrently through the pooled scraper
+    (DG headful, everything else headless). Returns {url: html_path or None}.
+    """
+    ensure_dirs()
+    ## DG requires headful mode
+    jobs = [
+        (url, article_html_path(url), not ("desiringgod.org" in urlparse(url).netloc))
+        for url in dict.fromkeys(urls)
+        if not os.path.exists(article_html_path(url))
+    ]
+    if not jobs:
+        print("[INFO] No downloads needed; all HTML files cached.")
+        return {}
+
+    print(f"[INFO] Downloading {len(jobs)} HTML files ({contexts} contexts per browser, {per_domain} per domain)...")
+    return asyncio.run(fetch_pages(jobs, contexts=contexts, per_domain=per_domain, retries=retries))
+
 def normalize_text(text: str) -> str:
     text = re.sub(r"[–—−‒―]", "-", text)
     text = re.sub(r"[\n\r\t]", " ", text)
     text = re.sub(r"\s+", " ", text)
     return text.strip()
 
-def extract_paragraphs_from_dg(html_path: str) -> str:
-    with open(html_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
-
-    body = soup.select_one("div.resource__body")
-    if not body:
-        return ""
-
+def join_paragraphs(body) -> str:
     paragraphs = []
     for p in body.find_all('p'):
         text_parts = [t.get_text(" ", strip=True) for t in p.contents if hasattr(t, 'get_text')]
@@ -84,140 +115,171 @@ def extract_paragraphs_from_dg(html_path: str) -> str:
 
     return " ".join(paragraphs)
 
-def extract_paragraphs_from_gty(html_path: str) -> str:
+def find_article_body(html_path: str, parser: str, body_filter: dict, strained: bool = True):
+    """
+    The first tag matching body_filter. With strained, only matching subtrees are
+    built; if that finds nothing, the full page is parsed as before.
+    """
     with open(html_path, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+        html = f.read()
+
+    if strained:
+        body = BeautifulSoup(html, parser, parse_only=SoupStrainer(**body_filter)).find(**body_filter)
+        if body:
+            return body
+    return BeautifulSoup(html, parser).find(**body_filter)
 
-    body = soup.find("div", attrs={"data-swiftype-name": "body", "data-swiftype-type": "text"})
+def extract_paragraphs_from_dg(html_path: str, parser: str = HTML_PARSER, strained: bool = True) -> str:
+    body = find_article_body(html_path, parser, DG_BODY, strained)
     if not body:
         return ""
 
-    paragraphs = []
-    for p in body.find_all('p'):
-        text_parts = [t.get_text(" ", strip=True) for t in p.contents if hasattr(t, 'get_text')]
-        paragraph_text = normalize_text(" ".join(text_parts))
-        paragraphs.append(paragraph_text)
+    return join_paragraphs(body)
 
-    return " ".join(paragraphs)
+def extract_paragraphs_from_gty(html_path: str, parser: str = HTML_PARSER, strained: bool = True) -> str:
+    body = find_article_body(html_path, parser, GTY_BODY, strained)
+    if not body:
+        return ""
 
-def process_all_resources(retry_empty=False):
-    ensure_dirs()
+    return join_paragraphs(body)
 
-    if not os.path.exists(RESOURCE_JSON):
-        print(f"[ERROR] File not found: {RESOURCE_JSON}")
-        return
+def get_extractor(url: str):
+    """The paragraph extractor for a URL's domain, or None if unsupported."""
+    domain = urlparse(url).netloc
+    if 'desiringgod.org' in domain:
+        return extract_paragraphs_from_dg
+    if 'gty.org' in domain:
+        return extract_paragraphs_from_gty
+    return None
 
-    with open(RESOURCE_JSON, 'r', encoding='utf-8') as f:
-        resources = json.load(f)
+def extract_bible_sentences(url: str, parser: str = HTML_PARSER) -> list:
+    """Sorted sentences of a cached article that mention a Bible book."""
+    article_text = get_extractor(url)(article_html_path(url), parser)
+    sentences = sent_tokenize(article_text)
+    return sorted(s.strip() for s in sentences if contains_bible_book(s))
 
-    save_every = 100
-    processed_since_save = 0
+def extract_worker(url: str) -> tuple:
+    try:
+        return url, extract_bible_sentences(url), None
+    except Exception as e:
+        return url, None, str(e)
+
+def extract_all_articles(urls, workers=None, chunksize=EXTRACT_CHUNKSIZE) -> dict:
+    """
+    Extract cached articles in a process pool. Returns {url: (sentences, error)};
+    sentences is None where extraction failed.
+    """
+    if not urls:
+        return {}
+
+    start = time.perf_counter()
+    extracted = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for url, sentences, error in pool.map(extract_worker, urls, chunksize=chunksize):
+            extracted[url] = (sentences, error)
+    elapsed = time.perf_counter() - start
+    print(f"[INFO] Extracted {len(urls)} articles with {HTML_PARSER} in {elapsed:.1f}s "
+          f"({len(urls) / elapsed if elapsed else 0:.1f} files/s)")
+    return extracted
+
+def process_all_resources(retry_empty=False, workers=None, **scrape_kwargs):
+    ensure_dirs()
+
+    with ResourceStore() as store:
+        if not len(store):
+            print(f"[ERROR] No resources in {store.path}")
+            return
+        process_store_resources(store, retry_empty, workers, **scrape_kwargs)
 
-    for idx, (url, meta) in enumerate(sorted(resources.items()), 1):
+def process_store_resources(store, retry_empty=False, workers=None, **scrape_kwargs):
+    """Extract sentences for every resource without them; each result is upserted as it is made."""
+    pending = []
+    for idx, (url, meta) in enumerate(sorted(store.items()), 1):
         if 'sentences' in meta:
             if retry_empty and not meta['sentences']:
                 print(f"[{idx}] Retrying already-processed: {url}")
 
                 ## Delete cached HTML to retry
-                html_path = os.path.join(TEMP_URL_DIR, f"{url_to_filename(url)}.html")
+                html_path = article_html_path(url)
                 if os.path.exists(html_path):
                     os.remove(html_path)
             else:
                 print(f"[{idx}] Skipping already-processed: {url}")
                 continue
+        pending.append((idx, url))
 
+    ## Fetch all pending articles concurrently; the loop below then reads the cache
+    download_articles([url for _, url in pending if not is_skipped_resource(url)], **scrape_kwargs)
+
+    ## Extract every cached article in parallel; anything not cached falls back to the serial path below
+    extracted = extract_all_articles([
+        url for _, url in pending
+        if not is_skipped_resource(url) and get_extractor(url) and os.path.exists(article_html_path(url))
+    ], workers=workers)
+
+    for idx, url in pending:
         print(f"[{idx}] Processing: {url}")
 
-        if "www.desiringgod.org/labs" in url or "www.desiringgod.org/light-and-truth" in url:
+        if is_skipped_resource(url):
             print(f"[DEBUG] Skipping labs resource: {url}")
-            resources[url]['sentences'] = []
-            processed_since_save += 1
+            store.upsert(url, {'sentences': []})
             continue
 
         try:
             domain = urlparse(url).netloc
-            html_path = download_and_save_article(url, domain)
-
-            if 'desiringgod.org' in domain:
-                article_text = extract_paragraphs_from_dg(html_path)
-            elif 'gty.org' in domain:
-                article_text = extract_paragraphs_from_gty(html_path)
-            else:
+            if not get_extractor(url):
                 print(f"[ERROR] Unsupported domain: {domain}")
-                resources[url]['sentences'] = None
-                processed_since_save += 1
+                store.upsert(url, {'sentences': None})
                 continue
 
-            sentences = sent_tokenize(article_text)
-            bible_sentences = [s.strip() for s in sentences if contains_bible_book(s)]
-            resources[url]['sentences'] = sorted(bible_sentences)
+            if url in extracted:
+                bible_sentences, error = extracted[url]
+                if error is not None:
+                    raise RuntimeError(error)
+            else:
+                download_and_save_article(url, domain)
+                bible_sentences = extract_bible_sentences(url)
+            store.upsert(url, {'sentences': bible_sentences})
 
             print(f"[DEBUG] Added {len(bible_sentences)} sentence(s) from {url}")
 
         except Exception as e:
             print(f"❌ Error processing {url}: {e}")
-            resources[url]['sentences'] = None
-
-        processed_since_save += 1
-
-        if processed_since_save >= save_every:
-            with open(RESOURCE_JSON, 'w', encoding='utf-8') as f:
-                json.dump(resources, f, ensure_ascii=False, indent=2)
-            print(f"[INFO] Saved progress after {processed_since_save} resources.")
-            processed_since_save = 0
+            store.upsert(url, {'sentences': None})
 
-    ## Final save if any remaining
-    if processed_since_save > 0:
-        with open(RESOURCE_JSON, 'w', encoding='utf-8') as f:
-            json.dump(resources, f, ensure_ascii=False, indent=2)
-        print(f"[INFO] Final save of remaining {processed_since_save} resources.")
+    print(f"[INFO] Saved sentences for {len(pending)} resources.")
 
-def download_worker(url_domain_tuple):
-    url, domain = url_domain_tuple
-    try:
-        return download_and_save_article(url, domain)
-    except Exception as e:
-        print(f"[ERROR] Failed to download {url}: {e}")
-        return None
-
-def prerun_download_articles():
+def prerun_download_articles(**scrape_kwargs):
     """
-    Pre-download all article HTMLs using all but 1 CPU core (Windows-safe).
+    Pre-download all article HTMLs through the pooled async scraper.
     """
     ensure_dirs()
 
-    if not os.path.exists(RESOURCE_JSON):
-        print(f"[ERROR] File not found: {RESOURCE_JSON}")
-        return
-
-    with open(RESOURCE_JSON, 'r', encoding='utf-8') as f:
-        resources = json.load(f)
-
-    # Prepare (url, domain) pairs for resources that need downloading
-    jobs = []
-    for url, meta in resources.items():
-        if "sentences" in meta:
-            continue
-        if "www.desiringgod.org/labs" in url:
-            continue
-        filename = os.path.join(TEMP_URL_DIR, f"{url_to_filename(url)}.html")
-        if not os.path.exists(filename):
-            jobs.append((url, urlparse(url).netloc))
-
-    if not jobs:
-        print("[INFO] No downloads needed; all HTML files cached.")
-        return
-
-    print(f"[INFO] Downloading {len(jobs)} HTML files using parallel processing...\n")
-
-    max_workers = max(1, multiprocessing.cpu_count() - 1)
-    with multiprocessing.get_context("spawn").Pool(processes=max_workers) as pool:
-        results = pool.map(download_worker, jobs)
-
-    print(f"[INFO] Finished downloading {len(results)} articles.")
+    with ResourceStore() as store:
+        urls = [
+            url for url, meta in store.items()
+            if "sentences" not in meta and not is_skipped_resource(url)
+        ]
+    results = download_articles(urls, **scrape_kwargs)
+    print(f"[INFO] Finished downloading {sum(1 for path in results.values() if path)} articles.")
 
 
 if __name__ == "__main__":
-    # prerun_download_articles()
-    process_all_resources(retry_empty=False)
-    # process_all_resources(retry_empty=True)
+    parser = argparse.ArgumentParser(description="Download resource articles and extract sentences that mention a Bible book.")
+    parser.add_argument("--prerun", action="store_true", help="Only download uncached article HTML")
+    parser.add_argument("--retry-empty", action="store_true", help="Re-download and re-extract resources with no sentences")
+    parser.add_argument("--urls", help="Only download the URLs in this file (one per line), e.g. from a local fixture server")
+    parser.add_argument("--contexts", type=int, default=SCRAPE_CONTEXTS, help="Browser contexts per Chromium")
+    parser.add_argument("--per-domain", type=int, default=SCRAPE_PER_DOMAIN, help="Pages in flight per domain")
+    parser.add_argument("--retries", type=int, default=SCRAPE_RETRIES)
+    parser.add_argument("--workers", type=int, help="Extraction processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    scrape_kwargs = {"contexts": args.contexts, "per_domain": args.per_domain, "retries": args.retries}
+    if args.urls:
+        with open(args.urls, encoding="utf-8") as f:
+            download_articles([line.strip() for line in f if line.strip()], **scrape_kwargs)
+    elif args.prerun:
+        prerun_download_articles(**scrape_kwargs)
+    else:
+        process_all_resources(retry_empty=args.retry_empty, workers=args.workers, **scrape_kwargs)
@@ -1,11 +1,20 @@
 import os
+import sys
 import json
 import re
+import time
+import asyncio
+import argparse
+from pathlib import Path
 from datetime import datetime
+from contextlib import asynccontextmanager
 from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 from playwright.sync_api import sync_playwright
 
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from data.references.resource_store import ResourceStore
+
 #==================================================
 # Constants and Setup
 #==================================================
@@ -14,9 +23,16 @@ DG_URL = "https://www.desiringgod.org"
 GTY_URL = "https://www.gty.org"
 START_YEAR = datetime.now().year
 END_YEAR = 1969
-RESOURCES_JSON = "data/references/resources.json"
 DATA_DIR = "data/references/temp_year_page"
 
+## Pooled scraping (fetch_pages)
+SCRAPE_CONTEXTS = 4  # Reused browser contexts per Chromium
+SCRAPE_PER_DOMAIN = 2  # Pages in flight per domain
+SCRAPE_RETRIES = 3
+SCRAPE_BACKOFF_SECS = 2.0  # Doubles after every failed attempt
+SCRAPE_TIMEOUT_MS = 60000
+CRAWL_YEARS_IN_FLIGHT = 4  # Years crawled concurrently per site
+
 os.makedirs("data", exist_ok=True)
 os.makedirs(DATA_DIR, exist_ok=True)
 
@@ -24,27 +40,113 @@ os.makedirs(DATA_DIR, exist_ok=True)
 # Utilities
 #==================================================
 
-def load_existing_resources():
-    if os.path.exists(RESOURCES_JSON):
-        with open(RESOURCES_JSON, encoding="utf-8") as f:
-            return json.load(f)
-    return {}
-
-def save_resources(resources):
-    with open(RESOURCES_JSON, "w", encoding="utf-8") as f:
-        json.dump(dict(sorted(resources.items())), f, indent=2, ensure_ascii=False)
-
 def url_to_filename(url):
     parsed = urlparse(url)
     base = parsed.netloc + parsed.path + ('?' + parsed.query if parsed.query else '')
     filename = re.sub(r'[<>:"/\\|?*\s]+', '_', base)
     return filename[:255]
 
+def write_html(path, html):
+    """Write via a temp file so an interrupted run never leaves a truncated cache file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp_path, path)
+
+#==================================================
+# Pooled Async Fetcher
+#==================================================
+
+@asynccontextmanager
+async def page_fetcher(headless_modes, contexts=SCRAPE_CONTEXTS, per_domain=SCRAPE_PER_DOMAIN, retries=SCRAPE_RETRIES):
+    """
+    Yield fetch(url, html_path, headless) -> html_path (None if it failed), which
+    saves a page's HTML to html_path.
+
+    Launches one Chromium per headless mode and reuses a pool of its browser
+    contexts for every page, with at most per_domain pages in flight per domain.
+    Failed pages (errors, timeouts, 5xx) are retried with exponential backoff;
+    4xx responses are not. fetch.report() prints progress and pages/min.
+    """
+    from playwright.async_api import async_playwright
+
+    stats = {"done": 0, "failed": 0, "retries": 0}
+    domain_limits = {}
+    start = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        finished = stats["done"] + stats["failed"]
+        print(f"[{'INFO' if final else 'DEBUG'}] Fetched {stats['done']} pages "
+              f"({stats['failed']} failed, {stats['retries']} retries) in {elapsed:.1f}s, "
+              f"{finished / elapsed * 60 if elapsed else 0:.1f} pages/min")
+
+    async with async_playwright() as p:
+        browsers, pools = {}, {}
+        for headless in sorted(set(headless_modes)):
+            browsers[headless] = await p.chromium.launch(headless=headless)
+            pools[headless] = asyncio.Queue()
+            for _ in range(contexts):
+                pools[headless].put_nowait(await browsers[headless].new_context())
+
+        async def fetch(url, html_path, headless):
+            limit = domain_limits.setdefault(urlparse(url).netloc, asyncio.Semaphore(per_domain))
+            for attempt in range(retries + 1):
+                async with limit:
+                    context = await pools[headless].get()
+                    try:
+                        page = await context.new_page()
+                        try:
+                            print(f"[DEBUG] Visiting {url}")
+                            response = await page.goto(url, timeout=SCRAPE_TIMEOUT_MS)
+                            status = response.status if response else 0
+                            html = await page.content()
+                        finally:
+                            await page.close()
+                        if status < 400:
+                            write_html(html_path, html)
+                            print(f"[DEBUG] Saved HTML to {html_path}")
+                            stats["done"] += 1
+                            if stats["done"] % 50 == 0:
+                                report()
+                            return html_path
+                        error = f"HTTP {status}"
+                    except Exception as e:
+                        status, error = 0, e
+                    finally:
+                        pools[headless].put_nowait(context)
+
+                if 400 <= status < 500 or attempt == retries:
+                    break
+                stats["retries"] += 1
+                delay = SCRAPE_BACKOFF_SECS * 2 ** attempt
+                print(f"[WARNING] {url}: {error}; retrying in {delay:.0f}s")
+                await asyncio.sleep(delay)
+
+            print(f"[ERROR] Failed to fetch {url}: {error}")
+            stats["failed"] += 1
+            return None
+
+        fetch.report = report
+        try:
+            yield fetch
+        finally:
+            for browser in browsers.values():
+                await browser.close()
+            report(final=True)
+
+async def fetch_pages(jobs, **fetcher_kwargs):
+    """Fetch (url, html_path, headless) jobs concurrently; returns {url: html_path or None}."""
+    async with page_fetcher({job[2] for job in jobs}, **fetcher_kwargs) as fetch:
+        paths = await asyncio.gather(*(fetch(*job) for job in jobs))
+    return {job[0]: path for job, path in zip(jobs, paths)}
+
 #==================================================
 # Shared Scraper Handler
 #==================================================
 
-def save_and_parse_year_page(site, year=2000, page=1, overwrite=False):
+def year_page_path(site, year=2000, page=1):
+    """(URL, cached HTML path) of one page of a site's listing for a year."""
     if site == 'dg':
         base_url = f"{DG_URL}/dates/{year}?page={page}"
     elif site == 'gty':
@@ -52,7 +154,10 @@ def save_and_parse_year_page(site, year=2000, page=1, overwrite=False):
     else:
         raise ValueError("Unsupported site")
 
-    filename = os.path.join(DATA_DIR, f"{url_to_filename(base_url)}.html")
+    return base_url, os.path.join(DATA_DIR, f"{url_to_filename(base_url)}.html")
+
+def save_and_parse_year_page(site, year=2000, page=1, overwrite=False):
+    base_url, filename = year_page_path(site, year, page)
 
     if not overwrite and os.path.exists(filename):
         print(f"[DEBUG] Using cached file {filename}")
@@ -68,6 +173,9 @@ def save_and_parse_year_page(site, year=2000, page=1, overwrite=False):
             print(f"[DEBUG] Saved HTML to {filename}")
             browser.close()
 
+    return parse_year_page(site, filename, year, page)
+
+def parse_year_page(site, filename, year=2000, page=1):
     with open(filename, encoding="utf-8") as f:
         soup = BeautifulSoup(f.read(), "html.parser")
 
@@ -122,8 +230,7 @@ def save_and_parse_year_page(site, year=2000, page=1, overwrite=False):
 # Site Resource Collectors
 #==================================================
 
-def get_site_resources(site, overwrite=False):
-    resources = load_existing_resources()
+def get_site_resources(site, store, overwrite=False):
 
     for year in range(START_YEAR if site == "dg" else min(START_YEAR, 2024), END_YEAR - 1, -1):
         print(f"\n--- Processing {site.upper()} year {year} ---")
@@ -138,22 +245,84 @@ def get_site_resources(site, overwrite=False):
             if not articles:
                 break
 
-            new_articles = {k: v for k, v in articles.items() if k not in resources}
+            new_articles = {k: v for k, v in articles.items() if k not in store}
             if not new_articles:
                 break
 
-            resources.update(new_articles)
-            save_resources(resources)
+            store.upsert_many(new_articles)
             print(f"[DEBUG] Saved {len(new_articles)} {site.upper()} articles.")
 
             page_num += 1
 
+async def crawl_site_resources(site, store, fetch, years_in_flight=CRAWL_YEARS_IN_FLIGHT, overwrite=False):
+    """
+    get_site_resources with up to years_in_flight years crawled at once through
+    a shared page_fetcher. Pages within a year stay sequential, since each year
+    stops at the first page with nothing new.
+    """
+    limit = asyncio.Semaphore(years_in_flight)
+
+    async def crawl_year(year):
+        async with limit:
+            print(f"\n--- Processing {site.upper()} year {year} ---")
+            page_num = 1
+            while True:
+                base_url, filename = year_page_path(site, year, page_num)
+                if not overwrite and os.path.exists(filename):
+                    print(f"[DEBUG] Using cached file {filename}")
+                elif not await fetch(base_url, filename, False):
+                    break
+
+                try:
+                    articles = await asyncio.to_thread(parse_year_page, site, filename, year, page_num)
+                except Exception as e:
+                    print(f"[ERROR] {site.upper()} {year} page {page_num}: {e}")
+                    break
+
+                new_articles = {k: v for k, v in articles.items() if k not in store}
+                if not new_articles:
+                    break
+
+                store.upsert_many(new_articles)
+                print(f"[DEBUG] Saved {len(new_articles)} {site.upper()} articles.")
+
+                page_num += 1
+
+    await asyncio.gather(*(
+        crawl_year(year)
+        for year in range(START_YEAR if site == "dg" else min(START_YEAR, 2024), END_YEAR - 1, -1)
+    ))
+
+async def crawl_resources(sites, store, years_in_flight=CRAWL_YEARS_IN_FLIGHT, overwrite=False, **fetcher_kwargs):
+    """Crawl every site's year listings with one (headful) browser."""
+    async with page_fetcher({False}, **fetcher_kwargs) as fetch:
+        await asyncio.gather(*(
+            crawl_site_resources(site, store, fetch, years_in_flight, overwrite)
+            for site in sites
+        ))
+
 #==================================================
 # Main
 #==================================================
 
 if __name__ == "__main__":
-    get_site_resources('dg', overwrite=False)
-    get_site_resources('gty', overwrite=False)
-    all_resources = load_existing_resources()
-    print(f"\n✅ Total unified resources collected: {len(all_resources)}")
+    parser = argparse.ArgumentParser(description="Collect DG and GTY resource URLs from their year listings.")
+    parser.add_argument("--sites", nargs="+", default=["dg", "gty"], choices=["dg", "gty"])
+    parser.add_argument("--sequential", action="store_true", help="One browser per page, one page at a time")
+    parser.add_argument("--overwrite", action="store_true", help="Re-download cached listing pages")
+    parser.add_argument("--years-in-flight", type=int, default=CRAWL_YEARS_IN_FLIGHT, help="Years crawled concurrently per site")
+    parser.add_argument("--contexts", type=int, default=SCRAPE_CONTEXTS, help="Browser contexts in the shared Chromium")
+    parser.add_argument("--per-domain", type=int, default=SCRAPE_PER_DOMAIN, help="Pages in flight per domain")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ResourceStore() as store:
+        if args.sequential:
+            for site in args.sites:
+                get_site_resources(site, store, overwrite=args.overwrite)
+        else:
+            asyncio.run(crawl_resources(
+                args.sites, store, args.years_in_flight, args.overwrite,
+                contexts=args.contexts, per_domain=args.per_domain,
+            ))
+        print(f"\n✅ Total unified resources collected: {len(store)} in {time.perf_counter() - start:.0f}s")
@@ -0,0 +1,244 @@
+import os
+import json
+
+## Append-only resource store: one JSON record per line ({"url": ..., **fields}),
+## where the last line for a URL wins. Writing a resource appends one line
+## instead of rewriting every resource, and an index of each URL's latest line
+## means reading one doesn't parse the rest. compact() drops superseded lines;
+## export_json() writes the familiar resources.json.
+
+RESOURCE_STORE = "data/references/resources.jsonl"
+RESOURCE_JSON = "data/references/resources.json"
+SYNC_EVERY = 100  # Upserts between fsyncs (and index saves)
+
+
+class ResourceStore:
+    """
+    Usage:
+        with ResourceStore() as store:
+            store.upsert(url, {"sentences": [...]})  # Merged into the existing record
+            meta = store.get(url)
+
+    A crash can lose at most the upserts since the last sync; a half-written
+    last line is dropped when the store is next opened.
+    """
+
+    def __init__(self, path: str = RESOURCE_STORE, legacy_json: str = RESOURCE_JSON):
+        self.path = path
+        self.index_path = f"{path}.idx"
+        self.offsets = {}  # url -> byte offset of its latest line
+        self.pending = 0
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            open(path, "ab").close()
+            if legacy_json and os.path.exists(legacy_json):
+                self._import_json(legacy_json)
+
+        self._load_index()
+        self.writer = open(path, "ab")
+        self.reader = open(path, "rb")
+        self.size = os.path.getsize(path)  # Bytes written, including any not yet flushed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __contains__(self, url):
+        return url in self.offsets
+
+    #==================================================
+    # Index
+    #==================================================
+
+    def _load_index(self):
+        """Load the saved index, then scan whatever was appended after it."""
+        size = os.path.getsize(self.path)
+        start = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if saved.get("size", 0) <= size:
+                self.offsets = saved["offsets"]
+                start = saved["size"]
+        if start < size:
+            self._scan(start)
+
+    def _scan(self, start: int):
+        good_end = start
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            offset = start
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    url = json.loads(line)["url"]
+                except (ValueError, KeyError):
+                    break
+                self.offsets[url] = offset
+                offset += len(line)
+                good_end = offset
+
+        if good_end < os.path.getsize(self.path):
+            print(f"[WARNING] Dropping {os.path.getsize(self.path) - good_end} bytes of a partial write from {self.path}")
+            with open(self.path, "r+b") as f:
+                f.truncate(good_end)
+
+    def _save_index(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"size": os.path.getsize(self.path), "offsets": self.offsets}, f)
+        os.replace(tmp_path, self.index_path)
+
+    #==================================================
+    # Records
+    #==================================================
+
+    def get(self, url: str):
+        offset = self.offsets.get(url)
+        if offset is None:
+            return None
+        if self.pending:
+            self.writer.flush()
+        self.reader.seek(offset)
+        record = json.loads(self.reader.readline())
+        record.pop("url")
+        return record
+
+    def urls(self) -> list:
+        return sorted(self.offsets)
+
+    def items(self):
+        """(url, record) for every resource, in file order; one sequential read.
+        Upserts made while iterating are not revisited."""
+        if self.pending:
+            self.writer.flush()
+        end = self.size
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if offset >= end:
+                    break
+                record = json.loads(line)
+                url = record.pop("url")
+                if self.offsets.get(url) == offset:
+                    yield url, record
+                offset += len(line)
+
+    def raw_items(self):
+        """(url, line bytes) for every resource, in file order, without parsing the records."""
+        if self.pending:
+            self.writer.flush()
+        end = self.size
+        latest = {offset: url for url, offset in self.offsets.items()}
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                if offset >= end:
+                    break
+                if offset in latest:
+                    yield latest[offset], line
+                offset += len(line)
+
+    def to_dict(self) -> dict:
+        return dict(sorted(self.items()))
+
+    def _append(self, record: dict) -> int:
+        """Write one line; returns its offset."""
+        offset = self.size
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        self.writer.write(line)
+        self.size += len(line)
+        self.pending += 1
+        if self.pending >= SYNC_EVERY:
+            self.sync()
+        return offset
+
+    def upsert(self, url: str, fields: dict, merge: bool = True):
+        """Write a resource; with merge, fields update its existing record instead of replacing it."""
+        record = (self.get(url) or {}) if merge else {}
+        record.update(fields)
+        self.offsets[url] = self._append({"url": url, **record})
+
+    def upsert_many(self, records: dict, merge: bool = True):
+        for url, fields in records.items():
+            self.upsert(url, fields, merge)
+        self.sync()
+
+    def sync(self):
+        """Make every upsert so far durable and save the index."""
+        self.writer.flush()
+        os.fsync(self.writer.fileno())
+        self._save_index()
+        self.pending = 0
+
+    def close(self):
+        if not self.writer.closed:
+            self.sync()
+            self.writer.close()
+            self.reader.close()
+
+    #==================================================
+    # Maintenance
+    #==================================================
+
+    def compact(self):
+        """Rewrite the store with only the latest line per resource (sorted by URL)."""
+        self.sync()
+        before = os.path.getsize(self.path)
+        tmp_path = f"{self.path}.tmp"
+        offsets = {}
+        with open(tmp_path, "wb") as f:
+            for url, record in sorted(self.items()):
+                offsets[url] = f.tell()
+                f.write((json.dumps({"url": url, **record}, ensure_ascii=False) + "\n").encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+
+        self.writer.close()
+        self.reader.close()
+        os.replace(tmp_path, self.path)
+        self.offsets = offsets
+        self._save_index()
+        self.writer = open(self.path, "ab")
+        self.reader = open(self.path, "rb")
+        self.size = os.path.getsize(self.path)
+        print(f"[INFO] Compacted {self.path}: {before / 1e6:.1f} MB -> {os.path.getsize(self.path) / 1e6:.1f} MB")
+
+    def export_json(self, path: str = RESOURCE_JSON):
+        """Write every resource to one JSON file, as resources.json used to be kept."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        print(f"[INFO] Exported {len(self)} resources to {path}")
+
+    def _import_json(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            resources = json.load(f)
+        with open(self.path, "ab") as f:
+            for url, record in resources.items():
+                f.write((json.dumps({"url": url, **record}, ensure_ascii=False) + "\n").encode("utf-8"))
+        print(f"[INFO] Imported {len(resources)} resources from {path} into {self.path}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain the append-only resource store.")
+    parser.add_argument("--compact", action="store_true", help="Drop superseded lines")
+    parser.add_argument("--export", nargs="?", const=RESOURCE_JSON, help=f"Write all resources as JSON (default: {RESOURCE_JSON})")
+    args = parser.parse_args()
+
+    with ResourceStore() as store:
+        print(f"[INFO] {len(store)} resources in {store.path}")
+        if args.compact:
+            store.compact()
+        if args.export:
+            store.export_json(args.export)
@@ -0,0 +1,322 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import numpy as np
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from app.utils.bible import OT_BOOKS, NT_BOOKS
+from data.references.resource_store import ResourceStore
+
+## Verse usage counts kept up to date from per-resource contributions.
+## Every counted resource has a contribution record: the digest of its stored
+## line, its author, and (verse, count) rows for the verses it references. A
+## resource whose line has not changed since it was counted is only hashed;
+## an added, changed or removed one swaps its rows in the contribution table
+## and the per-author totals are re-summed from the table with numpy.
+##
+## Files, next to verse_counts.json:
+##   verse_counts.npz         - the totals as sparse (verse, author, count) triples
+##   verse_contributions.npz  - the contribution table, reloaded for the next delta
+
+CONTRIBUTIONS_PATH = Path("data/references/verse_contributions.npz")
+BOOK_ORDER = {book: i for i, book in enumerate(OT_BOOKS + NT_BOOKS)}
+
+
+def line_digest(line: bytes) -> str:
+    return hashlib.blake2b(line, digest_size=16).hexdigest()
+
+
+def resource_verses(entry: dict) -> Counter:
+    """"Book Chapter:Verse" -> mentions in one resource's references."""
+    references = entry.get("references")
+    verses = Counter()
+    for ref_obj in references if isinstance(references, list) else []:
+        for verse in ref_obj.get("verses", []):
+            try:
+                ## Expect format: "Book Chapter:Verse"
+                book_part, verse_part = verse.rsplit(" ", 1)
+                chapter, verse_num = verse_part.split(":")
+            except ValueError:
+                print(f"[WARN] Skipping malformed verse: {verse}")
+                continue
+            verses[f"{book_part.strip()} {chapter.strip()}:{verse_num.strip()}"] += 1
+    return verses
+
+
+def split_verse(key: str) -> tuple:
+    book, chapter_verse = key.rsplit(" ", 1)
+    chapter, verse = chapter_verse.split(":")
+    return book, chapter, verse
+
+
+def _numeric(value: str) -> tuple:
+    return (0, int(value), "") if value.isdigit() else (1, 0, value)
+
+
+def verse_sort_key(key: str) -> tuple:
+    """Bible order; books not in the canon after it, by name."""
+    book, chapter, verse = split_verse(key)
+    return (BOOK_ORDER.get(book, len(BOOK_ORDER)), book, _numeric(chapter), _numeric(verse))
+
+
+#==================================================
+# Contribution tables
+#==================================================
+## {"urls", "digests", "authors": one per resource,
+##  "verses": verse keys,
+##  "res", "verse", "count": one row per (resource, verse) pair, as indices into the above}
+
+TABLE_NAMES = ("urls", "digests", "authors", "verses")
+TABLE_ROWS = ("res", "verse", "count")
+
+
+def build_table(records) -> dict:
+    """Contribution table for (url, digest, entry) records."""
+    table = {name: [] for name in TABLE_NAMES}
+    verse_ids = {}
+    res, verse, count = [], [], []
+    for i, (url, digest, entry) in enumerate(records):
+        table["urls"].append(url)
+        table["digests"].append(digest)
+        table["authors"].append(entry.get("author", "Unknown"))
+        for key, n in resource_verses(entry).items():
+            res.append(i)
+            verse.append(verse_ids.setdefault(key, len(verse_ids)))
+            count.append(n)
+    table["verses"] = list(verse_ids)
+    table["res"] = np.array(res, dtype=np.uint32)
+    table["verse"] = np.array(verse, dtype=np.uint32)
+    table["count"] = np.array(count, dtype=np.uint32)
+    return table
+
+
+def merge_tables(tables: list) -> dict:
+    """One table with the resources of all the given tables (which must not share URLs)."""
+    merged = {name: [] for name in TABLE_NAMES}
+    verse_ids = {}
+    rows = {name: [] for name in TABLE_ROWS}
+    for table in tables:
+        lookup = np.array([verse_ids.setdefault(key, len(verse_ids)) for key in table["verses"]], dtype=np.uint32)
+        rows["res"].append(table["res"] + np.uint32(len(merged["urls"])))
+        rows["verse"].append(lookup[table["verse"]] if len(lookup) else table["verse"])
+        rows["count"].append(table["count"])
+        for name in ("urls", "digests", "authors"):
+            merged[name].extend(table[name])
+    merged["verses"] = list(verse_ids)
+    for name, parts in rows.items():
+        merged[name] = np.concatenate(parts) if parts else np.array([], dtype=np.uint32)
+    return merged
+
+
+def select_resources(table: dict, keep: np.ndarray) -> dict:
+    """The table with only the resources where keep is True (and only the verses they use)."""
+    rows = keep[table["res"]]
+    new_index = (np.cumsum(keep) - 1).astype(np.uint32)
+    used, verse = np.unique(table["verse"][rows], return_inverse=True)
+    selected = {name: [value for value, k in zip(table[name], keep) if k] for name in ("urls", "digests", "authors")}
+    selected["verses"] = [table["verses"][i] for i in used.tolist()]
+    selected["res"] = new_index[table["res"][rows]]
+    selected["verse"] = verse.astype(np.uint32)
+    selected["count"] = table["count"][rows]
+    return selected
+
+
+def _pack_names(names) -> np.ndarray:
+    return np.frombuffer("\n".join(names).encode("utf-8"), dtype=np.uint8)
+
+
+def _unpack_names(packed: np.ndarray) -> list:
+    text = packed.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+
+def save_table(table: dict, path: Path):
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            **{name: _pack_names(table[name]) for name in TABLE_NAMES},
+            **{name: table[name] for name in TABLE_ROWS},
+        )
+    os.replace(tmp_path, path)
+
+
+def load_table(path: Path):
+    """The saved contribution table, or None if there is none."""
+    if not path.exists():
+        return None
+    with np.load(path) as data:
+        table = {name: _unpack_names(data[name]) for name in TABLE_NAMES}
+        table.update({name: data[name] for name in TABLE_ROWS})
+    return table
+
+
+#==================================================
+# Totals
+#==================================================
+
+def sum_table(table: dict) -> tuple:
+    """
+    Per-author totals as (verse keys, authors, verse ids, author ids, counts),
+    in Bible order with authors alphabetical within each verse, so a delta
+    update and a full rebuild write identical files.
+    """
+    verses = table["verses"]
+    authors = sorted(set(table["authors"]))
+    author_index = {author: i for i, author in enumerate(authors)}
+    resource_author = np.array([author_index[author] for author in table["authors"]], dtype=np.int64)
+
+    n_authors = max(len(authors), 1)
+    keys = table["verse"].astype(np.int64) * n_authors + resource_author[table["res"]]
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    counts = np.zeros(len(unique_keys), dtype=np.int64)
+    np.add.at(counts, inverse, table["count"])
+    verse_ids, author_ids = unique_keys // n_authors, unique_keys % n_authors
+
+    verse_rank = np.empty(len(verses), dtype=np.int64)
+    verse_rank[sorted(range(len(verses)), key=lambda i: verse_sort_key(verses[i]))] = np.arange(len(verses))
+    order = np.lexsort((author_ids, verse_rank[verse_ids])) if len(verses) else np.array([], dtype=np.int64)
+    return verses, authors, verse_ids[order], author_ids[order], counts[order]
+
+
+def nest_totals(verses, authors, verse_ids, author_ids, counts) -> dict:
+    """book > chapter > verse > {author: n, ..., "count": total}, in the order given."""
+    verse_counts = {}
+    verse_entry, previous = None, None
+    for verse_id, author_id, n in zip(verse_ids.tolist(), author_ids.tolist(), counts.tolist()):
+        if verse_id != previous:
+            if verse_entry is not None:
+                verse_entry["count"] = sum(verse_entry.values())
+            book, chapter, verse = split_verse(verses[verse_id])
+            verse_entry = {}
+            verse_counts.setdefault(book, {}).setdefault(chapter, {})[verse] = verse_entry
+            previous = verse_id
+        verse_entry[authors[author_id]] = n
+    if verse_entry is not None:
+        verse_entry["count"] = sum(verse_entry.values())
+    return verse_counts
+
+
+def save_totals(path: Path, verses, authors, verse_ids, author_ids, counts):
+    """
+    Compact binary twin of verse_counts.json: the names of the verses with
+    counts and of the authors, and sparse (row, col, count) triples into them.
+    """
+    starts = np.r_[True, verse_ids[1:] != verse_ids[:-1]] if len(verse_ids) else np.array([], dtype=bool)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            verses=_pack_names(verses[i] for i in verse_ids[starts].tolist()),
+            authors=_pack_names(authors),
+            rows=(np.cumsum(starts) - 1).astype(np.uint32),
+            cols=author_ids.astype(np.uint32),
+            counts=counts.astype(np.uint32),
+        )
+    os.replace(tmp_path, path)
+
+
+#==================================================
+# Full rebuild
+#==================================================
+
+def contributions_worker(job: tuple) -> dict:
+    """Contribution table for the latest lines at the given offsets of one stretch of the store."""
+    path, targets = job
+    wanted = dict(targets)
+    last = targets[-1][0]
+
+    def records():
+        with open(path, "rb") as f:
+            f.seek(targets[0][0])
+            offset = targets[0][0]
+            for line in f:
+                if offset in wanted:
+                    yield wanted[offset], line_digest(line), json.loads(line)
+                if offset >= last:
+                    break
+                offset += len(line)
+
+    return build_table(records())
+
+
+def rebuild_table(store: ResourceStore, workers=None, chunk_size: int = 500) -> dict:
+    """Count every resource, splitting the store file across a process pool (or in this process with workers=1)."""
+    store.sync()
+    targets = sorted((offset, url) for url, offset in store.offsets.items())
+    jobs = [(store.path, targets[i:i + chunk_size]) for i in range(0, len(targets), chunk_size)]
+    if workers == 1:
+        return merge_tables([contributions_worker(job) for job in jobs])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_tables(list(pool.map(contributions_worker, jobs)))
+
+
+#==================================================
+# Incremental update
+#==================================================
+
+def update_table(store: ResourceStore, table: dict, stats: dict) -> dict:
+    """
+    The table with the rows of every added, changed or removed resource
+    replaced. Unchanged resources are only hashed, never parsed.
+    """
+    index = {url: i for i, url in enumerate(table["urls"])}
+    keep = np.zeros(len(index), dtype=bool)
+
+    def changed_records():
+        for url, line in store.raw_items():
+            i = index.get(url)
+            digest = line_digest(line)
+            if i is not None and table["digests"][i] == digest:
+                keep[i] = True
+                stats["unchanged"] += 1
+                continue
+            stats["changed"] += 1
+            yield url, digest, json.loads(line)
+
+    changed = build_table(changed_records())
+    stats["removed"] = len(index) - stats["unchanged"] - sum(1 for url in changed["urls"] if url in index)
+    return merge_tables([select_resources(table, keep), changed])
+
+
+def update_verse_counts(store: ResourceStore, output_path: Path, full: bool = False, workers=None):
+    """
+    Bring output_path (JSON) and its .npz twin up to date with the store. Only
+    resources that changed since the last run are re-counted unless full, which
+    recounts everything in parallel. Returns the nested verse counts, or None if
+    they were already up to date.
+    """
+    start = time.perf_counter()
+    totals_path = output_path.with_suffix(".npz")
+    table = None if full else load_table(CONTRIBUTIONS_PATH)
+
+    if table is None:
+        table = rebuild_table(store, workers=workers)
+        print(f"[INFO] Counted all {len(table['urls'])} resources in {time.perf_counter() - start:.2f}s")
+    else:
+        stats = {"changed": 0, "removed": 0, "unchanged": 0}
+        table = update_table(store, table, stats)
+        print(f"[INFO] Verse counts: {stats['changed']} resources added or changed, "
+              f"{stats['removed']} removed, {stats['unchanged']} unchanged")
+        if not stats["changed"] and not stats["removed"] and output_path.exists() and totals_path.exists():
+            print(f"[INFO] Verse counts already up to date ({time.perf_counter() - start:.2f}s)")
+            return None
+
+    totals = sum_table(table)
+    verse_counts = nest_totals(*totals)
+
+    ## Outputs before the table: if interrupted in between, the next run redoes the same delta
+    tmp_path = output_path.with_name(f"{output_path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(verse_counts, f, indent=2)
+    os.replace(tmp_path, output_path)
+    save_totals(totals_path, *totals)
+    save_table(table, CONTRIBUTIONS_PATH)
+
+    print(f"[INFO] Updated verse counts in {time.perf_counter() - start:.2f}s")
+    return verse_counts